@@ -4,16 +4,19 @@ from setuptools import setup, Extension, find_packages
 
 tomoc = Extension(
     name='lib.libtomopy',
-    extra_compile_args=['-std=c99'],
+    extra_compile_args=['-std=c99', '-O3'],
     sources=[
         'src/corr.c',
+        'src/center.c',
         'src/utils.c',
         'src/project.c',
         'src/gridrec.c',
         'src/fft.c',
+        'src/filter.c',
         'src/art.c',
         'src/bart.c',
         'src/fbp.c',
+        'src/hbp.c',
         'src/mlem.c',
         'src/osem.c',
         'src/ospml_hybrid.c',
@@ -44,6 +44,62 @@
 #include "corr.h"
 
 
+static float 
+log_normal(float x)
+{
+    // Natural logarithm of a positive normal number from its exponent 
+    // and an odd series in s = (m-1)/(m+1) of its mantissa m, accurate 
+    // to float precision. It has no branches so that loops over it 
+    // are vectorized by the compiler.
+
+    int b, e, h;
+    float m, s, s2;
+
+    memcpy(&b, &x, sizeof(float));
+    e = ((b >> 23) & 0xff) - 127;
+    b = (b & 0x007fffff) | 0x3f800000;
+    memcpy(&m, &b, sizeof(float));
+
+    // Mantissa in [sqrt(1/2), sqrt(2)).
+    h = (m > 1.41421356f);
+    m = m - 0.5f * (float)h * m;
+    e += h;
+
+    s = (m - 1.f) / (m + 1.f);
+    s2 = s * s;
+    return e * 0.693147181f + 2.f * s * (1.f + s2 * (0.333333333f + 
+        s2 * (0.2f + s2 * (0.142857143f + s2 * 0.111111111f))));
+}
+
+
+static void 
+minus_log_row(float* val, float* out, int n)
+{
+    // Minus log of a row of values. Zero, negative, subnormal and 
+    // non-finite values are rare, so they are redone with logf only 
+    // when the row has any.
+
+    int i, nbad = 0;
+
+    for (i = 0; i < n; i++) 
+    {
+        out[i] = -log_normal(val[i]);
+        nbad += (val[i] < FLT_MIN) | (val[i] > FLT_MAX) | 
+            (val[i] != val[i]);
+    }
+    if (nbad > 0) 
+    {
+        for (i = 0; i < n; i++) 
+        {
+            if (!(val[i] >= FLT_MIN && val[i] <= FLT_MAX)) 
+            {
+                out[i] = -logf(val[i]);
+            }
+        }
+    }
+}
+
+
 DLL void 
 correct_air(
     float* data, int dx, int dy, int dz, int nair, int istart, int iend) 
@@ -87,3 +143,549 @@ correct_air(
         }
     }
 }
+
+
+DLL void 
+normalize(
+    float* data, int dx, int dy, int dz, float* flat, float* dark, 
+    float cutoff, float minval, int mlog, int istart, int iend) 
+{
+    // Dark subtraction, flat division, clamping into [minval, cutoff] 
+    // and optionally the minus log, in a single pass over the data. 
+    // NaN values are set to minval when it is finite.
+
+    int m, n, k, i;
+    int fixnan = isfinite(minval);
+    float *denom, *row, val;
+
+    denom = (float *)malloc(dy * dz * sizeof(float));
+    row = (float *)malloc(dz * sizeof(float));
+    for (i = 0; i < dy * dz; i++) 
+    {
+        denom[i] = flat[i] - dark[i];
+        if (denom[i] == 0.) 
+        {
+            denom[i] = 1e-6;
+        }
+    }
+
+    for (m = istart; m < iend; m++) 
+    {
+        for (n = 0; n < dy; n++) 
+        {
+            i = (m * dy + n) * dz;
+            for (k = 0; k < dz; k++) 
+            {
+                val = (data[i+k] - dark[n*dz+k]) / denom[n*dz+k];
+                val = (val > cutoff) ? cutoff : val;
+                val = (val < minval || (fixnan && val != val)) ? 
+                    minval : val;
+                row[k] = val;
+            }
+            if (mlog) 
+            {
+                minus_log_row(row, data+i, dz);
+            }
+            else
+            {
+                memcpy(data+i, row, dz * sizeof(float));
+            }
+        }
+    }
+    free(denom);
+    free(row);
+}
+
+
+DLL void 
+minus_log(
+    float* data, int dx, int dy, int dz, float minval, float* out, 
+    int istart, int iend) 
+{
+    // Values below minval, and NaN values when minval is finite, are 
+    // set to minval before the minus log. The output may be the input.
+
+    int m, n, k, i;
+    int fixnan = isfinite(minval);
+    float *row, val;
+
+    row = (float *)malloc(dz * sizeof(float));
+    for (m = istart; m < iend; m++) 
+    {
+        for (n = 0; n < dy; n++) 
+        {
+            i = (m * dy + n) * dz;
+            for (k = 0; k < dz; k++) 
+            {
+                val = data[i+k];
+                val = (val < minval || (fixnan && val != val)) ? 
+                    minval : val;
+                row[k] = val;
+            }
+            minus_log_row(row, out+i, dz);
+        }
+    }
+    free(row);
+}
+
+
+static int 
+reflect_index(int i, int n)
+{
+    // Mirrors indices outside [0, n) about the edges, repeating the 
+    // edge sample like the 'reflect' mode of scipy.ndimage.
+
+    i = i % (2 * n);
+    if (i < 0) 
+    {
+        i += 2 * n;
+    }
+    return (i < n) ? i : 2 * n - i - 1;
+}
+
+
+static float 
+window_value(float val)
+{
+    // NaN values are ordered above all others in the sorted windows.
+    
+    return (val == val) ? val : FLT_MAX;
+}
+
+
+static int 
+sorted_position(float* win, int n, float val)
+{
+    // First position in the sorted window that is not less than val.
+
+    int lo = 0, hi = n, mid;
+
+    while (lo < hi) 
+    {
+        mid = (lo + hi) / 2;
+        if (win[mid] < val) 
+        {
+            lo = mid + 1;
+        }
+        else 
+        {
+            hi = mid;
+        }
+    }
+    return lo;
+}
+
+
+static void 
+sorted_replace(float* win, int n, float old, float val)
+{
+    // Removes old from the sorted window and inserts val, keeping 
+    // the window sorted.
+
+    int i = sorted_position(win, n, old);
+    int j;
+
+    memmove(win+i, win+i+1, (n-i-1) * sizeof(float));
+    j = sorted_position(win, n-1, val);
+    memmove(win+j+1, win+j, (n-j-1) * sizeof(float));
+    win[j] = val;
+}
+
+
+static void 
+sort_window(float* win, int n)
+{
+    int i, j;
+    float val;
+
+    for (i = 1; i < n; i++) 
+    {
+        val = win[i];
+        for (j = i; j > 0 && win[j-1] > val; j--) 
+        {
+            win[j] = win[j-1];
+        }
+        win[j] = val;
+    }
+}
+
+
+static float 
+median3(float a, float b, float c)
+{
+    return fmaxf(fminf(a, b), fminf(fmaxf(a, b), c));
+}
+
+
+static void 
+median3x3_row(
+    float* prev, float* row, float* next, int dz, float* lo, float* mid, 
+    float* hi, float* med)
+{
+    // Medians of the 3 x 3 windows along a row. The three values of 
+    // each column are sorted once and the median of nine is the 
+    // median of the largest minimum, the median of the medians and 
+    // the smallest maximum of three neighbouring columns.
+
+    int k, c;
+    float a, b, d;
+
+    for (k = 0; k < dz + 2; k++) 
+    {
+        c = (k > 0 && k <= dz) ? k - 1 : reflect_index(k-1, dz);
+        a = window_value(prev[c]);
+        b = window_value(row[c]);
+        d = window_value(next[c]);
+        lo[k] = fminf(fminf(a, b), d);
+        hi[k] = fmaxf(fmaxf(a, b), d);
+        mid[k] = median3(a, b, d);
+    }
+    for (k = 0; k < dz; k++) 
+    {
+        med[k] = median3(
+            fmaxf(fmaxf(lo[k], lo[k+1]), lo[k+2]), 
+            median3(mid[k], mid[k+1], mid[k+2]), 
+            fminf(fminf(hi[k], hi[k+1]), hi[k+2]));
+    }
+}
+
+
+DLL void 
+remove_zinger(
+    float* data, int dx, int dy, int dz, float dif, int size, int nproj, 
+    float* out, int istart, int iend) 
+{
+    // Replaces values that exceed the median of the size x size window 
+    // around them by at least dif with that median. The median is kept 
+    // in a sorted window that slides along each row, so each step only 
+    // swaps one column of values, and 3 x 3 windows use sorted columns 
+    // instead. With nproj > 0, values must also 
+    // exceed the median over the nproj neighbouring projections on 
+    // each side, which keeps features that persist in time.
+
+    int m, n, k, a, b, i, nwin, lo, hi;
+    int ntime = 2 * nproj + 1;
+    float *win, *twin, *rmed, *proj, val, med;
+
+    nwin = size * size;
+    lo = -(size / 2);
+    hi = size - 1 + lo;
+    win = (float *)malloc(nwin * sizeof(float));
+    twin = (float *)malloc(ntime * sizeof(float));
+    rmed = (float *)malloc(4 * (dz + 2) * sizeof(float));
+
+    for (m = istart; m < iend; m++) 
+    {
+        proj = data + m * dy * dz;
+        for (n = 0; n < dy; n++) 
+        {
+            if (size == 3) 
+            {
+                median3x3_row(
+                    proj + reflect_index(n-1, dy) * dz, proj + n * dz, 
+                    proj + reflect_index(n+1, dy) * dz, dz, 
+                    rmed + dz + 2, rmed + 2 * (dz + 2), 
+                    rmed + 3 * (dz + 2), rmed);
+            }
+            else 
+            {
+                // Window of the first value in the row.
+                for (a = 0, i = 0; a < size; a++) 
+                {
+                    for (b = 0; b < size; b++, i++) 
+                    {
+                        win[i] = window_value(proj[
+                            reflect_index(n+lo+a, dy) * dz + 
+                            reflect_index(lo+b, dz)]);
+                    }
+                }
+                sort_window(win, nwin);
+            }
+
+            for (k = 0; k < dz; k++) 
+            {
+                if (size == 3) 
+                {
+                    med = rmed[k];
+                }
+                else 
+                {
+                    if (k > 0) 
+                    {
+                        for (a = 0; a < size; a++) 
+                        {
+                            i = reflect_index(n+lo+a, dy) * dz;
+                            sorted_replace(win, nwin, window_value(
+                                proj[i+reflect_index(k-1+lo, dz)]), 
+                                window_value(proj[i+reflect_index(k+hi, dz)]));
+                        }
+                    }
+                    med = win[nwin/2];
+                }
+                val = proj[n*dz+k];
+                if (nproj > 0 && val - med >= dif) 
+                {
+                    for (a = 0; a < ntime; a++) 
+                    {
+                        twin[a] = window_value(data[
+                            (reflect_index(m-nproj+a, dx) * dy + n) * dz + k]);
+                    }
+                    sort_window(twin, ntime);
+                    if (val - twin[nproj] < dif) 
+                    {
+                        med = val;
+                    }
+                }
+                out[(m*dy+n)*dz+k] = (val - med >= dif) ? med : val;
+            }
+        }
+    }
+    free(win);
+    free(twin);
+    free(rmed);
+}
+
+
+DLL void 
+correlate_axis(
+    float* data, int nouter, int n, int ninner, float* weights, int nw, 
+    int nblock, int istart, int iend) 
+{
+    // Correlates the lines of length n along the middle axis of the 
+    // data seen as (nouter, n, ninner) with nw weights centered on each 
+    // value, in place and with reflected edges. Lines are read in 
+    // panels of nblock neighbouring lines, so that strided axes are 
+    // read in contiguous runs. Work unit u is the panel (u % npanel) 
+    // of the outer index u / npanel. Contiguous lines (ninner = 1) are 
+    // grouped by panels of nblock outer indices instead.
+
+    int u, o, i0, w, x, i, j, src, npanel, sym;
+    int r = nw / 2;
+    int nlane = ninner, step = ninner, lane = 1;
+    double *buf, *acc, *lo, *hi;
+    float *base;
+
+    if (ninner == 1) 
+    {
+        nlane = nouter;
+        nouter = 1;
+        step = 1;
+        lane = n;
+    }
+    npanel = (nlane + nblock - 1) / nblock;
+
+    // Even and odd weights share products of mirrored values.
+    sym = 1;
+    for (j = 0; j < r; j++) 
+    {
+        if (weights[j] != weights[nw - 1 - j]) sym = 0;
+    }
+    if (!sym) 
+    {
+        sym = -1;
+        for (j = 0; j < r; j++) 
+        {
+            if (weights[j] != -weights[nw - 1 - j]) sym = 0;
+        }
+    }
+    if (nw % 2 == 0) sym = 0;
+
+    buf = (double *)malloc((n + 2 * r) * nblock * sizeof(double));
+    acc = (double *)malloc(nblock * sizeof(double));
+
+    for (u = istart; u < iend; u++) 
+    {
+        o = u / npanel;
+        i0 = (u % npanel) * nblock;
+        w = (nlane - i0 < nblock) ? nlane - i0 : nblock;
+        base = data + (size_t)o * n * ninner + (size_t)i0 * lane;
+
+        for (x = -r; x < n + r; x++) 
+        {
+            src = reflect_index(x, n);
+            for (i = 0; i < w; i++) 
+            {
+                buf[(x + r) * nblock + i] = 
+                    base[(size_t)src * step + (size_t)i * lane];
+            }
+        }
+        for (x = 0; x < n; x++) 
+        {
+            lo = buf + (size_t)x * nblock;
+            hi = buf + (size_t)(x + nw - 1) * nblock;
+            for (i = 0; i < w; i++) 
+            {
+                acc[i] = weights[r] * lo[r * nblock + i];
+            }
+            if (sym) 
+            {
+                for (j = 0; j < r; j++) 
+                {
+                    for (i = 0; i < w; i++) 
+                    {
+                        acc[i] += weights[j] * 
+                            (lo[i] + sym * hi[i]);
+                    }
+                    lo += nblock;
+                    hi -= nblock;
+                }
+            }
+            else 
+            {
+                for (j = 0; j < nw; j++) 
+                {
+                    if (j == r) continue;
+                    for (i = 0; i < w; i++) 
+                    {
+                        acc[i] += weights[j] * lo[j * nblock + i];
+                    }
+                }
+            }
+            for (i = 0; i < w; i++) 
+            {
+                base[(size_t)x * step + (size_t)i * lane] = (float)acc[i];
+            }
+        }
+    }
+    free(buf);
+    free(acc);
+}
+
+
+DLL void 
+median_box(
+    float* data, int dx, int dy, int dz, int sx, int sy, int sz, 
+    float* out, int istart, int iend) 
+{
+    // Median over a box of sx x sy x sz values around each value with 
+    // reflected edges, for the planes istart to iend of the first axis. 
+    // A sorted window slides along the last axis, swapping one 
+    // sx x sy column of values per step. Boxes of 3 x 3 values across 
+    // the last axis use the sorted columns of median3x3_row instead.
+
+    int m, n, k, a, b, c, i, nwin;
+    int lx = -(sx / 2), ly = -(sy / 2), lz = -(sz / 2);
+    int hz = sz - 1 + lz;
+    float *win, *rmed, *prev, *next, *row;
+
+    nwin = sx * sy * sz;
+    win = (float *)malloc(nwin * sizeof(float));
+    rmed = (float *)malloc(4 * (dz + 2) * sizeof(float));
+
+    for (m = istart; m < iend; m++) 
+    {
+        for (n = 0; n < dy; n++) 
+        {
+            row = data + ((size_t)m * dy + n) * dz;
+            if (sz == 3 && sx * sy == 3 && (sx == 1 || sy == 1)) 
+            {
+                // Rows above and below in the plane or in the stack.
+                if (sx == 1) 
+                {
+                    prev = row + (reflect_index(n-1, dy) - n) * dz;
+                    next = row + (reflect_index(n+1, dy) - n) * dz;
+                }
+                else 
+                {
+                    prev = row + (long)(reflect_index(m-1, dx)-m) * dy*dz;
+                    next = row + (long)(reflect_index(m+1, dx)-m) * dy*dz;
+                }
+                median3x3_row(prev, row, next, dz, rmed + dz + 2, 
+                    rmed + 2 * (dz + 2), rmed + 3 * (dz + 2), 
+                    out + ((size_t)m * dy + n) * dz);
+                continue;
+            }
+
+            // Window of the first value in the row.
+            for (a = 0, i = 0; a < sx; a++) 
+            {
+                for (b = 0; b < sy; b++) 
+                {
+                    row = data + ((size_t)reflect_index(m+lx+a, dx) * dy + 
+                        reflect_index(n+ly+b, dy)) * dz;
+                    for (c = 0; c < sz; c++, i++) 
+                    {
+                        win[i] = window_value(row[reflect_index(lz+c, dz)]);
+                    }
+                }
+            }
+            sort_window(win, nwin);
+
+            for (k = 0; k < dz; k++) 
+            {
+                if (k > 0) 
+                {
+                    for (a = 0; a < sx; a++) 
+                    {
+                        for (b = 0; b < sy; b++) 
+                        {
+                            row = data + ((size_t)reflect_index(m+lx+a, dx) * 
+                                dy + reflect_index(n+ly+b, dy)) * dz;
+                            sorted_replace(win, nwin, 
+                                window_value(row[reflect_index(k-1+lz, dz)]), 
+                                window_value(row[reflect_index(k+hz, dz)]));
+                        }
+                    }
+                }
+                out[((size_t)m * dy + n) * dz + k] = win[nwin/2];
+            }
+        }
+    }
+    free(win);
+    free(rmed);
+}
+
+
+DLL void 
+sanitize(
+    float* data, int dx, int dy, float val, int nan, int inf, int neg, 
+    float cutoff, int* counts, int istart, int iend) 
+{
+    // Replaces NaN, infinite and negative values with val and clips 
+    // values above cutoff, in place for the rows istart to iend of 
+    // the data seen as (dx, dy). The numbers of NaN, infinite, negative 
+    // and clipped values of each row are written to counts. Rows are 
+    // first only scanned, since most of them hold no bad values, and 
+    // both loops are free of branches so that they vectorize.
+
+    int m, i, nbad, knan, kinf, kneg, kbig, c0, c1, c2, c3;
+    float lo, hi, big, v, *row;
+    int *cnt;
+
+    lo = neg ? 0.f : (inf ? -FLT_MAX : -INFINITY);
+    hi = (inf && cutoff > FLT_MAX) ? FLT_MAX : cutoff;
+    big = inf ? FLT_MAX : INFINITY;
+
+    for (m = istart; m < iend; m++) 
+    {
+        row = data + (size_t)m * dy;
+        cnt = counts + 4 * m;
+        cnt[0] = cnt[1] = cnt[2] = cnt[3] = 0;
+
+        nbad = 0;
+        for (i = 0; i < dy; i++) 
+        {
+            nbad += (row[i] < lo) | (row[i] > hi) | (row[i] != row[i]);
+        }
+        if (nbad == 0) continue;
+
+        c0 = c1 = c2 = c3 = 0;
+        for (i = 0; i < dy; i++) 
+        {
+            v = row[i];
+            knan = (v != v) & nan;
+            kinf = (v > big) | (v < -big);
+            kneg = (v < lo) & !kinf;
+            kbig = (v > hi) & !kinf;
+            c0 += knan;
+            c1 += kinf;
+            c2 += kneg;
+            c3 += kbig;
+            row[i] = (knan | kinf | kneg) ? val : (kbig ? cutoff : v);
+        }
+        cnt[0] = c0;
+        cnt[1] = c1;
+        cnt[2] = c2;
+        cnt[3] = c3;
+    }
+}
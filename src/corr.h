@@ -47,6 +47,10 @@
 #define _corr_h
 
 #include <stdio.h>
+#include <stdlib.h>
+#include <string.h>
+#include <math.h>
+#include <float.h>
 
 
 #ifdef WIN32
@@ -63,4 +67,51 @@ correct_air(
     int nair,
     int istart, int iend);
 
+DLL void 
+normalize(
+    float* data, 
+    int dx, int dy, int dz,
+    float* flat, float* dark,
+    float cutoff, float minval, int mlog,
+    int istart, int iend);
+
+DLL void 
+minus_log(
+    float* data, 
+    int dx, int dy, int dz,
+    float minval, float* out,
+    int istart, int iend);
+
+DLL void 
+remove_zinger(
+    float* data, 
+    int dx, int dy, int dz,
+    float dif, int size, int nproj,
+    float* out,
+    int istart, int iend);
+
+DLL void 
+correlate_axis(
+    float* data, 
+    int nouter, int n, int ninner,
+    float* weights, int nw,
+    int nblock,
+    int istart, int iend);
+
+DLL void 
+median_box(
+    float* data, 
+    int dx, int dy, int dz,
+    int sx, int sy, int sz,
+    float* out,
+    int istart, int iend);
+
+DLL void 
+sanitize(
+    float* data, 
+    int dx, int dy,
+    float val, int nan, int inf, int neg,
+    float cutoff, int* counts,
+    int istart, int iend);
+
 #endif
\ No newline at end of file
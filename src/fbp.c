@@ -42,126 +42,175 @@
 // POSSIBILITY OF SUCH DAMAGE.
 
 #include "utils.h"
+#include "filter.h"
+#include "fft.h"
+
+// Maximum number of slices back-projected together.
+#define FBP_SLICE_BLOCK 8
 
 
 void 
 fbp(
     float *data, int dx, int dy, int dz, float *center, float *theta,
     float *recon, int ngridx, int ngridy, char *fname, 
-    int istart, int iend)
+    float *fpar, int nfpar, int istart, int iend)
 {
-    float *gridx = (float *)malloc((ngridx+1)*sizeof(float));
-    float *gridy = (float *)malloc((ngridy+1)*sizeof(float));
-    float *coordx = (float *)malloc((ngridy+1)*sizeof(float));
-    float *coordy = (float *)malloc((ngridx+1)*sizeof(float));
-    float *ax = (float *)malloc((ngridx+ngridy)*sizeof(float));
-    float *ay = (float *)malloc((ngridx+ngridy)*sizeof(float));
-    float *bx = (float *)malloc((ngridx+ngridy)*sizeof(float));
-    float *by = (float *)malloc((ngridx+ngridy)*sizeof(float));
-    float *coorx = (float *)malloc((ngridx+ngridy)*sizeof(float));
-    float *coory = (float *)malloc((ngridx+ngridy)*sizeof(float));
-    float *dist = (float *)malloc((ngridx+ngridy)*sizeof(float));
-    int *indi = (int *)malloc((ngridx+ngridy)*sizeof(int));
-
-    assert(coordx != NULL && coordy != NULL &&
-        ax != NULL && ay != NULL && by != NULL && bx != NULL &&
-        coorx != NULL && coory != NULL && dist != NULL && indi != NULL);
-
-    int s, p, d, n;
-    int quadrant;
-    float theta_p, sin_p, cos_p;
-    float mov, xi, yi;
-    int asize, bsize, csize;
-    float* simdata;
-    int ind_data, ind_recon;
-
-    simdata = (float *)calloc((dx*dy*dz), sizeof(float));
-
-    // For each slice
-    for (s=istart; s<iend; s++)
+    int s, ns, k, p, d, j, ix, iy, i0;
+    int pdim, pdim2, nrow, row;
+    float norm, t, w, base;
+    float *src, *dst;
+
+    // Zero-pad the projections to at least twice their width, so
+    // that the filter convolution does not wrap around.
+    pdim = 1;
+    while (pdim < 2*dz)
+    {
+        pdim <<= 1;
+    }
+    pdim2 = pdim >> 1;
+    norm = M_PI/dx/pdim;
+
+    float *fweight = (float *)malloc(pdim2*sizeof(float));
+    float *sino = (float *)malloc(2*pdim*sizeof(float));
+    float *fdata = (float *)malloc(dx*dz*FBP_SLICE_BLOCK*sizeof(float));
+    float *rblock = (float *)malloc(
+        ngridx*ngridy*FBP_SLICE_BLOCK*sizeof(float));
+    float *xsin = (float *)malloc(dx*ngridx*sizeof(float));
+    float *ycos = (float *)malloc(dx*ngridy*sizeof(float));
+
+    assert(fweight != NULL && sino != NULL && fdata != NULL &&
+        rblock != NULL && xsin != NULL && ycos != NULL);
+
+    // Set up table of filter factors.
+    set_filter_weights(fname, fpar, nfpar, pdim, fweight);
+
+    // Detector coordinate of the pixel centers for each angle. The 
+    // pixel (ix, iy) projects to -x*sin+y*cos relative to the 
+    // rotation axis.
+    for (p=0; p<dx; p++)
     {
-        preprocessing(ngridx, ngridy, dz, center[s], 
-            &mov, gridx, gridy); // Outputs: mov, gridx, gridy
-            
-        // For each projection angle 
-        for (p=0; p<dx; p++) 
+        for (ix=0; ix<ngridx; ix++)
+        {
+            xsin[ix+p*ngridx] = -(-ngridx/2.+ix+0.5)*sinf(theta[p]);
+        }
+        for (iy=0; iy<ngridy; iy++)
+        {
+            ycos[iy+p*ngridy] = (-ngridy/2.+iy+0.5)*cosf(theta[p]);
+        }
+    }
+
+    // For each block of slices with the same rotation center.
+    for (s=istart; s<iend; s+=ns)
+    {
+        ns = 1;
+        while (s+ns < iend && ns < FBP_SLICE_BLOCK && 
+            center[s+ns] == center[s])
+        {
+            ns++;
+        }
+
+        // Filter all the projections of the block, two at a time as 
+        // the real and imaginary parts of the FFT input. The filtered 
+        // data is interleaved by slice, fdata[(p*dz+d)*ns+k].
+        nrow = dx*ns;
+        for (row=0; row<nrow; row+=2)
         {
-            // Calculate the sin and cos values 
-            // of the projection angle and find
-            // at which quadrant on the cartesian grid.
-            theta_p = fmod(theta[p], 2*M_PI);
-            quadrant = calc_quadrant(theta_p);
-            sin_p = sinf(theta_p);
-            cos_p = cosf(theta_p);
-
-            // For each detector pixel 
-            for (d=0; d<dz; d++) 
+            for (j=0; j<2; j++)
+            {
+                if (row+j < nrow)
+                {
+                    p = (row+j)/ns;
+                    k = (row+j)%ns;
+                    src = data+(s+k)*dz+p*dy*dz;
+                    for (d=0; d<dz; d++)
+                    {
+                        sino[2*d+j] = src[d];
+                    }
+                }
+                else
+                {
+                    for (d=0; d<dz; d++)
+                    {
+                        sino[2*d+j] = 0;
+                    }
+                }
+            }
+            for (d=2*dz; d<2*pdim; d++)
+            {
+                sino[d] = 0;
+            }
+
+            four1(sino-1, pdim, 1);
+            for (d=0; d<pdim2; d++)
             {
-                // Calculate coordinates
-                xi = -1e6;
-                yi = -(dz-1)/2.0+d+mov;
-                calc_coords(
-                    ngridx, ngridy, xi, yi, sin_p, cos_p, gridx, gridy, 
-                    coordx, coordy);
-
-                // Merge the (coordx, gridy) and (gridx, coordy)
-                trim_coords(
-                    ngridx, ngridy, coordx, coordy, gridx, gridy, 
-                    &asize, ax, ay, &bsize, bx, by);
-
-                // Sort the array of intersection points (ax, ay) and
-                // (bx, by). The new sorted intersection points are 
-                // stored in (coorx, coory). Total number of points 
-                // are csize.
-                sort_intersections(
-                    quadrant, asize, ax, ay, bsize, bx, by, 
-                    &csize, coorx, coory);
-
-                // Calculate the distances (dist) between the 
-                // intersection points (coorx, coory). Find the 
-                // indices of the pixels on the reconstruction grid.
-                calc_dist(
-                    ngridx, ngridy, csize, coorx, coory, 
-                    indi, dist);
-
-                // Calculate simdata 
-                calc_simdata(p, s, d, ngridx, ngridy, dy, dz,
-                    csize, indi, dist, recon,
-                    simdata); // Output: simdata
-
-
-                // Calculate dist*dist
-                float sum_dist2 = 0.0;
-                for (n=0; n<csize-1; n++) 
+                w = fweight[d]*norm;
+                sino[2*d] *= w;
+                sino[2*d+1] *= w;
+                if (d > 0)
                 {
-                    sum_dist2 += dist[n]*dist[n];
+                    sino[2*(pdim-d)] *= w;
+                    sino[2*(pdim-d)+1] *= w;
                 }
+            }
+            sino[pdim] = sino[pdim+1] = 0;
+            four1(sino-1, pdim, -1);
+
+            for (j=0; j<2 && row+j<nrow; j++)
+            {
+                p = (row+j)/ns;
+                k = (row+j)%ns;
+                for (d=0; d<dz; d++)
+                {
+                    fdata[(p*dz+d)*ns+k] = sino[2*d+j];
+                }
+            }
+        }
 
-                // Update
-                if (sum_dist2 != 0.0) 
+        // Pixel-driven back-projection with linear interpolation 
+        // between detector pixels. The interpolation weights are 
+        // shared by all slices of the block.
+        for (j=0; j<ngridx*ngridy*ns; j++)
+        {
+            rblock[j] = 0;
+        }
+        for (p=0; p<dx; p++)
+        {
+            for (ix=0; ix<ngridx; ix++)
+            {
+                base = xsin[ix+p*ngridx]+center[s]-0.5;
+                dst = rblock+ix*ngridy*ns;
+                for (iy=0; iy<ngridy; iy++)
                 {
-                    ind_recon = s*ngridx*ngridy;
-                    ind_data = d+s*dz+p*dy*dz;
-                    for (n=0; n<csize-1; n++) 
+                    t = base+ycos[iy+p*ngridy];
+                    i0 = (int)floorf(t);
+                    if (i0 < 0 || i0 >= dz-1)
+                    {
+                        continue;
+                    }
+                    w = t-i0;
+                    src = fdata+(p*dz+i0)*ns;
+                    for (k=0; k<ns; k++)
                     {
-                        recon[indi[n]+ind_recon] += data[ind_data]*dist[n];
+                        dst[iy*ns+k] += (1-w)*src[k]+w*src[k+ns];
                     }
                 }
             }
         }
+
+        for (k=0; k<ns; k++)
+        {
+            dst = recon+(s+k)*ngridx*ngridy;
+            for (j=0; j<ngridx*ngridy; j++)
+            {
+                dst[j] += rblock[j*ns+k];
+            }
+        }
     }
 
-    free(simdata);
-    free(gridx);
-    free(gridy);
-    free(coordx);
-    free(coordy);
-    free(ax);
-    free(ay);
-    free(bx);
-    free(by);
-    free(coorx);
-    free(coory);
-    free(dist);
-    free(indi);
-}
\ No newline at end of file
+    free(fweight);
+    free(sino);
+    free(fdata);
+    free(rblock);
+    free(xsin);
+    free(ycos);
+}
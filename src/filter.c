@@ -0,0 +1,198 @@
+// Copyright (c) 2015, UChicago Argonne, LLC. All rights reserved.
+
+// Copyright 2015. UChicago Argonne, LLC. This software was produced 
+// under U.S. Government contract DE-AC02-06CH11357 for Argonne National 
+// Laboratory (ANL), which is operated by UChicago Argonne, LLC for the 
+// U.S. Department of Energy. The U.S. Government has rights to use, 
+// reproduce, and distribute this software.  NEITHER THE GOVERNMENT NOR 
+// UChicago Argonne, LLC MAKES ANY WARRANTY, EXPRESS OR IMPLIED, OR 
+// ASSUMES ANY LIABILITY FOR THE USE OF THIS SOFTWARE.  If software is 
+// modified to produce derivative works, such modified software should 
+// be clearly marked, so as not to confuse it with the version available 
+// from ANL.
+
+// Additionally, redistribution and use in source and binary forms, with 
+// or without modification, are permitted provided that the following 
+// conditions are met:
+
+//     * Redistributions of source code must retain the above copyright 
+//       notice, this list of conditions and the following disclaimer. 
+
+//     * Redistributions in binary form must reproduce the above copyright 
+//       notice, this list of conditions and the following disclaimer in 
+//       the documentation and/or other materials provided with the 
+//       distribution. 
+
+//     * Neither the name of UChicago Argonne, LLC, Argonne National 
+//       Laboratory, ANL, the U.S. Government, nor the names of its 
+//       contributors may be used to endorse or promote products derived 
+//       from this software without specific prior written permission. 
+
+// THIS SOFTWARE IS PROVIDED BY UChicago Argonne, LLC AND CONTRIBUTORS 
+// "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT 
+// LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS 
+// FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL UChicago 
+// Argonne, LLC OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, 
+// INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, 
+// BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; 
+// LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER 
+// CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT 
+// LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN 
+// ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE 
+// POSSIBILITY OF SUCH DAMAGE.
+
+#include "filter.h"
+
+
+void 
+set_filter_weights(
+    char *name, float *pars, int npars, int pd, float *W)
+{
+    // Tabulate the real filter factors at the non-negative 
+    // frequencies j/pd (in cycles per pixel), j = 0, ..., pd/2-1.
+    // The table is computed once per call and shared by all slices.
+    //
+    // A "custom" filter is given by its samples, pars, spaced 
+    // uniformly from zero to the Nyquist frequency (0.5) and is 
+    // linearly interpolated to the frequencies of the table. For 
+    // the other filters pars holds the cutoff frequency and the 
+    // order, where they apply.
+
+    int j, k, pd2 = pd >> 1;
+    float x, t;
+    float fpars[2] = {0.5, 2.0}; // Default cutoff and order
+    float (*pf)(float, float*);
+
+    if (!strcmp(name, "custom") && npars > 1)
+    {
+        for (j=0; j<pd2; j++)
+        {
+            t = 2.0*j/pd*(npars-1);
+            k = (int)t;
+            if (k >= npars-1)
+            {
+                W[j] = pars[npars-1];
+            }
+            else
+            {
+                W[j] = pars[k]+(t-k)*(pars[k+1]-pars[k]);
+            }
+        }
+        return;
+    }
+
+    for (j=0; j<npars && j<2; j++)
+    {
+        fpars[j] = pars[j];
+    }
+
+    pf = get_filter(name);
+    for (j=0; j<pd2; j++)
+    {
+        x = (float)j/pd;
+        W[j] = (*pf)(x, fpars);
+    }
+}
+
+
+// No filter
+float 
+filter_none(float x, float *pars)
+{
+    return 1;
+}
+
+
+// Shepp-Logan filter
+float 
+filter_shepp(float x, float *pars)
+{
+    return fabs(sin(PI*x)/PI);
+}
+
+
+// Cosine filter 
+float 
+filter_cosine(float x, float *pars)
+{
+    return fabs(x)*(cos(PI*x));
+}
+
+
+// Hann filter 
+float 
+filter_hann(float x, float *pars)
+{
+    return fabs(x)*0.5*(1.+cos(2*PI*x));
+}
+
+
+// Hamming filter 
+float 
+filter_hamming(float x, float *pars)
+{
+    return fabs(x)*(0.54+0.46*cos(2*PI*x));
+}
+
+
+// Ramlak filter
+float 
+filter_ramlak(float x, float *pars)
+{
+    return fabs(x);
+}
+
+
+// Parzen filter. Ramp apodized by the Parzen window, which falls 
+// to zero at the cutoff frequency pars[0].
+float 
+filter_parzen(float x, float *pars)
+{
+    float r = fabs(x)/pars[0];
+
+    if (r <= 0.5)
+    {
+        return fabs(x)*(1-6*r*r+6*r*r*r);
+    }
+    else if (r <= 1)
+    {
+        return fabs(x)*2*(1-r)*(1-r)*(1-r);
+    }
+    return 0;
+}
+
+
+// Butterworth filter. Ramp apodized by a Butterworth low-pass of 
+// cutoff frequency pars[0] and order pars[1].
+float 
+filter_butterworth(float x, float *pars)
+{
+    return fabs(x)/(1+pow(fabs(x)/pars[0], 2*pars[1]));
+}
+
+
+float (*get_filter(char *name))(float, float*) 
+{
+    struct 
+    {
+        char* name; 
+        float (*fp)(float, float*);
+    } fltbl[] = {
+        {"none", filter_none},
+        {"shepp", filter_shepp}, // Default
+        {"cosine", filter_cosine},
+        {"hann", filter_hann},
+        {"hamming", filter_hamming},
+        {"ramlak", filter_ramlak},
+        {"parzen", filter_parzen},
+        {"butterworth", filter_butterworth}};
+
+    for(int i=0; i<8; i++)
+    {
+        if(!strcmp(name, fltbl[i].name))
+        {
+            return fltbl[i].fp;
+        }
+    }
+    return fltbl[1].fp;   
+}
@@ -49,68 +49,96 @@ void
 gridrec(
     float *data, int dx, int dy, int dz, float *center, float *theta, 
     float *recon, int ngridx, int ngridy, char *fname, 
-    int istart, int iend)
+    float *fpar, int nfpar, float xcoord, float ycoord, float zoom, 
+    char *aname, int istart, int iend)
 {
-    int s, p, iu, iv;
-    float (*filter)(float);
+    int s, p, iu, iv, twocen;
     float ***data3d, ***recon3d;
-    float *sine, *cose, *wtbl, *work, *winv;
-    float C, nt, lambda;
+    float *sine, *cose, *wtbl, *work, *winv, *fweight;
+    pswf_set *pswf;
+    float C;
     float L;
     int ltbl = 512;
-    int itmp, pdim, M02;
-    complex *sino, *filphase, **H;
+    int pdim, M, M02;
+    float scale;
+    complex *sino, *filphase, *filphase2, **H;
 
     data3d = convert(data, dx, dy, dz);
     recon3d = convert(recon, dy, ngridx, ngridy);
 
-    filter = get_filter(fname);
-
-    C = 7.0;
-    nt = 20;
-    lambda = 0.99998546;
-    float coefs[11] = {
-         0.5767616E+02, -0.8931343E+02,  0.4167596E+02,
-        -0.1053599E+02,  0.1662374E+01, -0.1780527E-00,
-         0.1372983E-01, -0.7963169E-03,  0.3593372E-04,
-        -0.1295941E-05,  0.3817796E-07};
+    // Kernel width and padding of the accuracy preset.
+    pswf = get_pswf_set(aname);
+    C = pswf->C;
     
     // Compute pdim = next power of 2 >= dz
-    pdim = 1;
-    itmp = dz-1;
-    while(itmp)
+    pdim = next_pow2(dz);
+
+    // Size of the MxM frequency grid. For the full field of view 
+    // it matches the projection FFT size. A region of interest (ROI) 
+    // is cut from an image whose period is M pixels. The shifted 
+    // projections are periodic with pdim detector pixels, so the grid 
+    // spans at least that period. Otherwise the object outside the 
+    // ROI wraps back into it. Projections are padded further only 
+    // when the ROI itself is larger than that period.
+    M = pdim;
+    if (xcoord != 0 || ycoord != 0 || zoom != 1)
     {
-        pdim <<= 1;
-        itmp >>= 1;
+        M = next_pow2((int)ceil(pdim*zoom));
+        M = max(M, next_pow2(max(ngridx, ngridy)+1));
+        pdim = max(pdim, next_pow2((int)ceil(M/zoom)));
     }
 
-    M02 = pdim/2-1;
+    // Oversampling zero-pads the projections and enlarges the grid 
+    // by the same factor. The object then only covers the central 
+    // part of the field of view, which keeps the aliased tails of the 
+    // convolving function and the filter out of the cropped image.
+    pdim *= pswf->oversampling;
+    M *= pswf->oversampling;
+
+    // Frequency j of the projection FFT lands on grid index j*scale.
+    // Sampling the image at 1/zoom detector pixels shrinks the field 
+    // of view, which is equivalent to a coarser frequency grid.
+    scale = (float)M/pdim/zoom;
+
+    M02 = M/2-1;
     L = (int)2*C/PI;
 
     // Allocate storage for various arrays.
     sino = malloc_vector_c(pdim); 
     filphase = malloc_vector_c(pdim/2);   
-    H = malloc_matrix_c(pdim, pdim);
+    filphase2 = malloc_vector_c(pdim/2);   
+    fweight = malloc_vector_f(pdim/2);
+    H = malloc_matrix_c(M, M);
     wtbl = malloc_vector_f(ltbl+1);
-    winv = malloc_vector_f(pdim-1);
+    winv = malloc_vector_f(M-1);
     work = malloc_vector_f(L+1);
 
+    // Set up table of filter factors.
+    set_filter_weights(fname, fpar, nfpar, pdim, fweight);
+
     // Set up table of sines and cosines.
     set_trig_tables(dx, theta, &sine, &cose);    
 
     // Set up PSWF lookup tables.
-    set_pswf_tables(C, nt, lambda, coefs, ltbl, M02, wtbl, winv);
+    set_pswf_tables(
+        C, pswf->nt, pswf->lambda, pswf->coefs, ltbl, M02, wtbl, winv);
 
     // For each slice.
     for (s=istart; s<iend; s+=2)
     {
-        // Set up table of combined filter-phase factors.
-        set_filter_tables(dx, pdim, center[s], filter, filphase);
+        // Set up table of combined filter-phase factors. The two 
+        // slices of the pair may have different rotation centers.
+        set_filter_tables(dx, pdim, center[s], fweight, filphase);
+        twocen = center[s+1] != center[s];
+        if (twocen)
+        {
+            set_filter_tables(dx, pdim, center[s+1], fweight, filphase2);
+        }
 
         // First clear the array H
-        for(iu=0; iu<pdim; iu++) 
+        for(iu=0; iu<M; iu++) 
         {
-            for(iv=0; iv<pdim; iv++)
+            for(iv=0; iv<M; iv++)
             {
                 H[iu][iv].r = H[iu][iv].i = 0.0;
             }
@@ -159,17 +187,33 @@ gridrec(
         // for carrying out the convolution (step 4 above), but necessitates 
         // an additional correction -- See Phase 3 below.
 
-        complex Cdata1, Cdata2, Ctmp;
+        complex Cdata1, Cdata2, Ctmp, A, B;
         float U, V, rtmp, L2 = (int)C/PI;
         float convolv, tblspcg = 2*ltbl/L;
 
-        int pdim2 = pdim >> 1, M2 = pdim >> 1;
+        int pdim2 = pdim >> 1, M2 = M >> 1;
         int iul, iuh, iu, ivl, ivh, iv;
         int j, k;
 
         // For each projection
         for(p=0; p<dx; p++)
         {
+            // Move the origin to the ROI center. Its projection onto 
+            // the detector depends on angle, so the phase factors are 
+            // set up again for each projection.
+            if (xcoord != 0 || ycoord != 0)
+            {
+                set_filter_tables(dx, pdim, 
+                    center[s]+ycoord*cose[p]-xcoord*sine[p], 
+                    fweight, filphase);
+                if (twocen)
+                {
+                    set_filter_tables(dx, pdim, 
+                        center[s+1]+ycoord*cose[p]-xcoord*sine[p], 
+                        fweight, filphase2);
+                }
+            }
+
             j = 0;
             while(j<dz)  
             {     
@@ -191,22 +235,36 @@ gridrec(
             // For each FFT(projection)
             for(j=1; j<pdim2; j++)
             {    
-                Ctmp.r = filphase[j].r;
-                Ctmp.i = filphase[j].i;
+                if (twocen)
+                {
+                    // Separate the transforms of the two slices 
+                    // to shift each by its own center.
+                    A.r = 0.5*(sino[j].r+sino[pdim-j].r);
+                    A.i = 0.5*(sino[j].i-sino[pdim-j].i);
+                    B.r = 0.5*(sino[j].i+sino[pdim-j].i);
+                    B.i = 0.5*(sino[pdim-j].r-sino[j].r);
+                    set_pair_data(
+                        A, B, filphase[j], filphase2[j], &Cdata1, &Cdata2);
+                }
+                else
+                {
+                    Ctmp.r = filphase[j].r;
+                    Ctmp.i = filphase[j].i;
 
-                Cmult(Cdata1, Ctmp, sino[j])
-                Ctmp.i = -Ctmp.i;
-                Cmult(Cdata2, Ctmp, sino[pdim-j])
+                    Cmult(Cdata1, Ctmp, sino[j])
+                    Ctmp.i = -Ctmp.i;
+                    Cmult(Cdata2, Ctmp, sino[pdim-j])
+                }
 
-                U = (rtmp=j) * cose[p] + M2;
+                U = (rtmp=scale*j) * cose[p] + M2;
                 V = rtmp * sine[p] + M2;
 
                 // Note freq space origin is at (M2,M2), but we
                 // offset the indices U, V, etc. to range from 0 to M-1.
                 iul = ceil(U-L2); iuh=floor(U+L2);
                 ivl = ceil(V-L2); ivh=floor(V+L2);
-                if(iul<1)iul = 1; if(iuh>=pdim)iuh = pdim-1; 
-                if(ivl<1)ivl = 1; if(ivh>=pdim)ivh = pdim-1; 
+                if(iul<1)iul = 1; if(iuh>=M)iuh = M-1; 
+                if(ivl<1)ivl = 1; if(ivh>=M)ivh = M-1; 
 
                 // Note aliasing value (at index=0) is forced to zero.
                 for(iv=ivl, k=0; iv<=ivh; iv++, k++) {
@@ -221,8 +279,8 @@ gridrec(
                         convolv = rtmp*work[k];
                         H[iu][iv].r += convolv*Cdata1.r;
                         H[iu][iv].i += convolv*Cdata1.i;
-                        H[pdim-iu][pdim-iv].r += convolv*Cdata2.r;
-                        H[pdim-iu][pdim-iv].i += convolv*Cdata2.i;
+                        H[M-iu][M-iv].r += convolv*Cdata2.r;
+                        H[M-iu][M-iv].i += convolv*Cdata2.i;
                     }
                 }
             }
@@ -239,7 +297,7 @@ gridrec(
         // (resp. left [X<0]) half of the image.
 
         unsigned long H_size[2];
-        H_size[0] = H_size[1] = pdim;
+        H_size[0] = H_size[1] = M;
         fourn((float*)(*H)-1, H_size-1, 2, -1);  
 
         // Copy the real and imaginary parts of the complex data from H[][],
@@ -275,43 +333,259 @@ gridrec(
         // convert to inverse cm (say), one must divide the data by the detector 
         // spacing in cm.
 
-        int ustart, vstart, ufin, vfin;
         float corrn_u, corrn;
-        int padx = (pdim-ngridx)/2;
-        int pady = (pdim-ngridy)/2;
+        int padx = (M-ngridx)/2;
+        int pady = (M-ngridy)/2;
         int offsetx = M02+1-padx;
         int offsety = M02+1-pady;
 
-        ustart = pdim-offsety;
-        ufin = pdim;
-        j = 0;
-        while(j<ngridy)
+        for(j=0; j<ngridy; j++)
         {
-            for(iu=ustart; iu<ufin; j++, iu++)
+            iu = (j-offsety+M) % M;
+            corrn_u = winv[j+pady];
+            for(k=0; k<ngridx; k++)
             {
-                corrn_u = winv[j+pady];
-                vstart = pdim-offsetx;
-                vfin = pdim;
-                k = 0;
-                while(k<ngridx)
+                iv = (k-offsetx+M) % M;
+                corrn = corrn_u*winv[k+padx]; 
+                recon3d[s][ngridx-1-k][j] = corrn*H[iu][iv].r;
+                recon3d[s+1][ngridx-1-k][j] = corrn*H[iu][iv].i;
+            }
+        }
+    }
+
+    free(sine);
+    free(cose);
+    free(sino);
+    free(wtbl);
+    free(filphase);
+    free(filphase2);
+    free(fweight);
+    free(winv);
+    free(work);
+    free_matrix(H);
+
+    return;
+}
+
+
+void 
+gridrec_sweep(
+    float *data, int dx, int dz, float *center, float *theta, 
+    float *recon, int ngridx, int ngridy, char *fname, 
+    float *fpar, int nfpar, char *aname, int istart, int iend)
+{
+    // Reconstruct a single sinogram, data[dx][dz], once for each of 
+    // the rotation centers center[istart], ..., center[iend-1].
+    //
+    // Only the phase factors depend on the center, so each projection 
+    // is transformed and filtered once. The candidates are gridded in 
+    // pairs as the real and imaginary parts of one frequency grid, and 
+    // the convolving function weights of each data point are shared 
+    // by all pairs in a batch, which is limited by SWEEP_MEM bytes.
+
+    int c, b, nb, b0, nbb, npair, p, j, k, iu, iv;
+    float *sine, *cose, *wtbl, *work, *winv, *fweight, *cw;
+    pswf_set *pswf;
+    float C, L, norm, x;
+    int ltbl = 512;
+    int pdim, pdim2, M, M2, M02, nw;
+    complex *sino, *col, **spec, **ph, *cd1, *cd2, ***H;
+
+    pswf = get_pswf_set(aname);
+    C = pswf->C;
+    pdim = next_pow2(dz)*pswf->oversampling;
+    pdim2 = pdim >> 1;
+    M = pdim;
+    M2 = M >> 1;
+    M02 = M/2-1;
+    L = (int)2*C/PI;
+    norm = PI/pdim/dx;
+
+    float U, V, rtmp, L2 = (int)C/PI;
+    float tblspcg = 2*ltbl/L;
+    int iul, iuh, ivl, ivh;
+
+    npair = (iend-istart+1)/2;
+    nb = SWEEP_MEM/((long)M*M*sizeof(complex));
+    nb = max(1, min(nb, npair));
+
+    sino = malloc_vector_c(pdim);
+    col = malloc_vector_c(M);
+    spec = malloc_matrix_c(dx, pdim2);
+    ph = malloc_matrix_c(2*nb, pdim2);
+    cd1 = malloc_vector_c(nb);
+    cd2 = malloc_vector_c(nb);
+    H = (complex ***)malloc(nb*sizeof(complex **));
+    for (b=0; b<nb; b++)
+    {
+        H[b] = malloc_matrix_c(M, M);
+    }
+    wtbl = malloc_vector_f(ltbl+1);
+    winv = malloc_vector_f(M-1);
+    work = malloc_vector_f(L+1);
+    cw = malloc_vector_f((L+1)*(L+1));
+    fweight = malloc_vector_f(pdim2);
+
+    set_filter_weights(fname, fpar, nfpar, pdim, fweight);
+    set_trig_tables(dx, theta, &sine, &cose);
+    set_pswf_tables(
+        C, pswf->nt, pswf->lambda, pswf->coefs, ltbl, M02, wtbl, winv);
+
+    // Transform and filter the projections, two at a time as the real 
+    // and imaginary parts of the FFT input.
+    for (p=0; p<dx; p+=2)
+    {
+        for (j=0; j<dz; j++)
+        {
+            sino[j].r = data[j+p*dz];
+            sino[j].i = (p+1<dx) ? data[j+(p+1)*dz] : 0;
+        }
+        for (j=dz; j<pdim; j++)
+        {
+            sino[j].r = sino[j].i = 0.0;
+        }
+
+        four1((float*)sino-1, pdim, 1);
+
+        for (j=1; j<pdim2; j++)
+        {
+            x = fweight[j]*norm;
+            spec[p][j].r = 0.5*x*(sino[j].r+sino[pdim-j].r);
+            spec[p][j].i = 0.5*x*(sino[j].i-sino[pdim-j].i);
+            if (p+1 < dx)
+            {
+                spec[p+1][j].r = 0.5*x*(sino[j].i+sino[pdim-j].i);
+                spec[p+1][j].i = 0.5*x*(sino[pdim-j].r-sino[j].r);
+            }
+        }
+    }
+
+    // For each batch of pairs of centers
+    for (b0=0; b0<npair; b0+=nb)
+    {
+        nbb = min(nb, npair-b0);
+
+        // Phase factors of the two centers of each pair. An odd 
+        // center out is paired with itself.
+        for (b=0; b<2*nbb; b++)
+        {
+            c = istart+2*b0+b;
+            if (c >= iend)
+            {
+                c = iend-1;
+            }
+            for (j=0; j<pdim2; j++)
+            {
+                x = 2*PI*center[c]*j/pdim;
+                ph[b][j].r = cosf(x);
+                ph[b][j].i = -sinf(x);
+            }
+        }
+
+        for (b=0; b<nbb; b++)
+        {
+            for (iu=0; iu<M; iu++)
+            {
+                for (iv=0; iv<M; iv++)
+                {
+                    H[b][iu][iv].r = H[b][iu][iv].i = 0.0;
+                }
+            }
+        }
+
+        // For each projection
+        for (p=0; p<dx; p++)
+        {
+            for (j=1; j<pdim2; j++)
+            {
+                for (b=0; b<nbb; b++)
+                {
+                    set_pair_data(
+                        spec[p][j], spec[p][j], ph[2*b][j], ph[2*b+1][j], 
+                        &cd1[b], &cd2[b]);
+                }
+
+                U = (rtmp=j) * cose[p] + M2;
+                V = rtmp * sine[p] + M2;
+
+                iul = ceil(U-L2); iuh=floor(U+L2);
+                ivl = ceil(V-L2); ivh=floor(V+L2);
+                if(iul<1)iul = 1; if(iuh>=M)iuh = M-1; 
+                if(ivl<1)ivl = 1; if(ivh>=M)ivh = M-1; 
+
+                // Weights of the convolving function, shared by all 
+                // pairs of the batch.
+                nw = ivh-ivl+1;
+                for(iv=ivl, k=0; iv<=ivh; iv++, k++) 
+                {
+                    work[k] = Cnvlvnt(abs(V-iv)*tblspcg);
+                }
+                for(iu=iul; iu<=iuh; iu++)
                 {
-                    for(iv=vstart; iv<vfin; k++, iv++)
+                    rtmp = Cnvlvnt(abs(U-iu)*tblspcg);
+                    for(k=0; k<nw; k++)
                     {
-                        corrn = corrn_u*winv[k+padx]; 
-                        recon3d[s][ngridx-1-k][j] = corrn*H[iu][iv].r;
-                        recon3d[s+1][ngridx-1-k][j] = corrn*H[iu][iv].i;
+                        cw[(iu-iul)*nw+k] = rtmp*work[k];
                     }
-                    if(k<ngridx)
+                }
+
+                for (b=0; b<nbb; b++)
+                {
+                    for(iu=iul; iu<=iuh; iu++)
                     {
-                        vstart = 0;
-                        vfin = ngridx-offsetx;
+                        for(iv=ivl, k=(iu-iul)*nw; iv<=ivh; iv++, k++)
+                        {
+                            H[b][iu][iv].r += cw[k]*cd1[b].r;
+                            H[b][iu][iv].i += cw[k]*cd1[b].i;
+                            H[b][M-iu][M-iv].r += cw[k]*cd2[b].r;
+                            H[b][M-iu][M-iv].i += cw[k]*cd2[b].i;
+                        }
                     }
                 }
             }
-            if(j<ngridy) 
+        }
+
+        // Inverse FFT and correction as in gridrec(). The transform 
+        // runs over the rows first, then only over the columns that 
+        // fall inside the reconstructed region, which also keeps each 
+        // 1-D transform in cache.
+        float corrn_u, corrn;
+        int padx = (M-ngridx)/2;
+        int pady = (M-ngridy)/2;
+        int offsetx = M02+1-padx;
+        int offsety = M02+1-pady;
+        float *rec1, *rec2;
+
+        for (b=0; b<nbb; b++)
+        {
+            for (iu=0; iu<M; iu++)
             {
-                ustart = 0;
-                ufin = ngridy-offsety;
+                four1((float*)H[b][iu]-1, M, -1);
+            }
+
+            c = istart+2*(b0+b);
+            rec1 = recon+c*ngridx*ngridy;
+            rec2 = (c+1 < iend) ? rec1+ngridx*ngridy : NULL;
+            for(k=0; k<ngridx; k++)
+            {
+                iv = (k-offsetx+M) % M;
+                for (iu=0; iu<M; iu++)
+                {
+                    col[iu] = H[b][iu][iv];
+                }
+                four1((float*)col-1, M, -1);
+
+                corrn_u = winv[k+padx];
+                for(j=0; j<ngridy; j++)
+                {
+                    iu = (j-offsety+M) % M;
+                    corrn = corrn_u*winv[j+pady]; 
+                    rec1[(ngridx-1-k)*ngridy+j] = corrn*col[iu].r;
+                    if (rec2 != NULL)
+                    {
+                        rec2[(ngridx-1-k)*ngridy+j] = corrn*col[iu].i;
+                    }
+                }
             }
         }
     }
@@ -319,24 +593,54 @@ gridrec(
     free(sine);
     free(cose);
     free(sino);
+    free(col);
+    free_matrix(spec);
+    free_matrix(ph);
+    free(cd1);
+    free(cd2);
+    for (b=0; b<nb; b++)
+    {
+        free_matrix(H[b]);
+    }
+    free(H);
     free(wtbl);
-    free(filphase);
     free(winv);
     free(work);
-    free_matrix(H);
+    free(cw);
+    free(fweight);
+}
 
-    return;
+
+void 
+set_pair_data(
+    complex A, complex B, complex fa, complex fb, 
+    complex *C1, complex *C2)
+{
+    // Combine the transforms, A and B, of two real projections into 
+    // the data gridded at a frequency, C1, and at its mirror image, 
+    // C2, with the filter-phase factors fa and fb applied to each. 
+    // The real and imaginary parts of the reconstructed image then 
+    // hold the two slices.
+
+    complex X1, X2;
+
+    Cmult(X1, fa, A)
+    Cmult(X2, fb, B)
+    C1->r = X1.r-X2.i;
+    C1->i = X1.i+X2.r;
+    C2->r = X1.r+X2.i;
+    C2->i = X2.r-X1.i;
 }
 
 
 void 
 set_filter_tables(
     int dx, int pd, float center, 
-    float(*pf)(float), complex *A)
+    float *W, complex *A)
 { 
     // Set up the complex array, filphase[], each element of which
-    // consists of a real filter factor [obtained from the function,
-    // (*pf)()], multiplying a complex phase factor (derived from the
+    // consists of a real filter factor [obtained from the table,
+    // W[], of set_filter_weights()], multiplying a complex phase factor (derived from the
     // parameter, center}.  See Phase 1 comments.
 
     int j, pd2 = pd >> 1;
@@ -346,7 +650,7 @@ set_filter_tables(
     for(j=0; j<pd2; j++)
     {
         x = j*rtmp1;
-        rtmp2 = (*pf)((float)j/pd)*norm;
+        rtmp2 = W[j]*norm;
         A[j].r = rtmp2*cosf(x);
         A[j].i = -rtmp2*sinf(x);
     }
@@ -409,6 +713,21 @@ set_trig_tables(int dx, float *theta, float **sine, float **cose)
 }
 
 
+int 
+next_pow2(int n)
+{
+    // Smallest power of 2 >= n.
+    int p = 1;
+    n -= 1;
+    while(n > 0)
+    {
+        p <<= 1;
+        n >>= 1;
+    }
+    return p;
+}
+
+
 float 
 legendre(int n, float *coefs, float x)
 {
@@ -505,73 +824,38 @@ malloc_matrix_c(long nr, long nc)
 }
 
 
-// No filter
-float 
-filter_none(float x)
-{
-    return 1;
-}
-
-
-// Shepp-Logan filter
-float 
-filter_shepp(float x)
-{
-    return abs(sin(PI*x)/PI);
-}
-
-
-// Cosine filter 
-float 
-filter_cosine(float x)
-{
-    return abs(x)*(cos(PI*x));
-}
-
-
-// Hann filter 
-float 
-filter_hann(float x)
-{
-    return abs(x)*0.5*(1.+cos(2*PI*x));
-}
-
-
-// Hamming filter 
-float 
-filter_hamming(float x)
+pswf_set*
+get_pswf_set(char *name)
 {
-    return abs(x)*(0.54+0.46*cos(2*PI*x));
-}
-
-// Ramlak filter
-float 
-filter_ramlak(float x)
-{
-    return abs(x);
-}
-
-
-float (*get_filter(char *name))(float) 
-{
-    struct 
-    {
-        char* name; 
-        float (*fp)(float);
-    } fltbl[] = {
-        {"none", filter_none},
-        {"shepp", filter_shepp}, // Default
-        {"cosine", filter_cosine},
-        {"hann", filter_hann},
-        {"hamming", filter_hamming},
-        {"ramlak", filter_ramlak}};
-
-    for(int i=0; i<6; i++)
+    // Precomputed tables of prolate spheroidal wave functions (PSWF) 
+    // for each accuracy preset. The coefficients are those of the 
+    // even Legendre polynomials P(0), P(2), ..., P(nt) in the 
+    // expansion of the PSWF of order zero, normalized to one at the 
+    // kernel edge, and lambda is its concentration eigenvalue. The 
+    // convolving function spans 2C/PI grid points.
+    static pswf_set pstbl[] = {
+        {"fast", 4.0, 0.99588549, 20, {
+             0.5239891E+01, -0.5308499E+01,  0.1184591E+01,
+            -0.1230763E-00,  0.7371622E-02, -0.2864074E-03,
+             0.7789982E-05, -0.1564700E-06,  0.2414647E-08,
+            -0.2951474E-10,  0.2927239E-12}, 1},
+        {"normal", 7.0, 0.99998546, 20, {
+             0.5767616E+02, -0.8931343E+02,  0.4167596E+02,
+            -0.1053599E+02,  0.1662374E+01, -0.1780527E-00,
+             0.1372983E-01, -0.7963169E-03,  0.3593372E-04,
+            -0.1295941E-05,  0.3817796E-07}, 1}, // Default
+        {"high", 10.0, 0.99999996, 20, {
+             0.8001563E+03, -0.1446584E+04,  0.9323841E+03,
+            -0.3656428E+03,  0.9660917E+02, -0.1823065E+02,
+             0.2563784E+01, -0.2778216E-00,  0.2383475E-01,
+            -0.1655435E-02,  0.9460533E-04}, 2}};
+
+    for(int i=0; i<3; i++)
     {
-        if(!strcmp(name, fltbl[i].name))
+        if(!strcmp(name, pstbl[i].name))
         {
-            return fltbl[i].fp;
+            return &pstbl[i];
         }
     }
-    return fltbl[1].fp;   
+    return &pstbl[1];
 }
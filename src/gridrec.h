@@ -51,6 +51,7 @@
 #include <stddef.h>
 #include <time.h>
 #include <sys/stat.h>
+#include "filter.h"
 
 
 #ifdef WIN32
@@ -64,6 +65,7 @@
 #define free_matrix(A) (free(*(A)),free(A))
 #define abs(A) ((A)>0 ?(A):-(A))
 #define PI 3.14159265359
+#define SWEEP_MEM (1<<27)
 #define Cnvlvnt(X) (wtbl[(int)(X+0.5)])    
 #define Cmult(A,B,C) {(A).r=(B).r*(C).r-(B).i*(C).i;\
              (A).i=(B).r*(C).i+(B).i*(C).r;}
@@ -74,6 +76,15 @@ typedef struct {
     float i;
 } complex;
 
+typedef struct {
+    char *name;
+    float C;
+    float lambda;
+    int nt;
+    float coefs[11];
+    int oversampling;
+} pswf_set;
+
 void 
 gridrec(
     float *data,
@@ -83,6 +94,23 @@ gridrec(
     float *recon,
     int ngridx, int ngridy,
     char name[16],
+    float *fpar, int nfpar,
+    float xcoord, float ycoord, float zoom,
+    char aname[16],
+    int istart,
+    int iend);
+
+void 
+gridrec_sweep(
+    float *data,
+    int dx, int dz,
+    float *center,
+    float *theta,
+    float *recon,
+    int ngridx, int ngridy,
+    char name[16],
+    float *fpar, int nfpar,
+    char aname[16],
     int istart,
     int iend);
 
@@ -98,28 +126,18 @@ malloc_vector_c(long n);
 complex**
 malloc_matrix_c(long nr, long nc);
 
-float 
-(*get_filter(char *name))(float);
-
-float 
-filter_none(float);
-
-float 
-filter_shepp(float);
-
-float 
-filter_hann(float);
-
-float 
-filter_hamming(float);
+pswf_set* 
+get_pswf_set(char *name);
 
-float 
-filter_ramlak(float);
+void 
+set_pair_data(
+    complex A, complex B, complex fa, complex fb, 
+    complex *C1, complex *C2);
 
 void 
 set_filter_tables(
     int dx, int pd, 
-    float fac, float(*pf)(float), 
+    float fac, float *W, 
     complex *A);
 
 void 
@@ -132,6 +150,9 @@ set_pswf_tables(
     float C, int nt, float lmbda, float *coefs, 
     int ltbl, int linv, float* wtbl, float* winv);
 
+int 
+next_pow2(int n);
+
 float 
 legendre(int n, float *coefs, float x);
 
@@ -0,0 +1,282 @@
+// Copyright (c) 2015, UChicago Argonne, LLC. All rights reserved.
+
+// Copyright 2015. UChicago Argonne, LLC. This software was produced 
+// under U.S. Government contract DE-AC02-06CH11357 for Argonne National 
+// Laboratory (ANL), which is operated by UChicago Argonne, LLC for the 
+// U.S. Department of Energy. The U.S. Government has rights to use, 
+// reproduce, and distribute this software.  NEITHER THE GOVERNMENT NOR 
+// UChicago Argonne, LLC MAKES ANY WARRANTY, EXPRESS OR IMPLIED, OR 
+// ASSUMES ANY LIABILITY FOR THE USE OF THIS SOFTWARE.  If software is 
+// modified to produce derivative works, such modified software should 
+// be clearly marked, so as not to confuse it with the version available 
+// from ANL.
+
+// Additionally, redistribution and use in source and binary forms, with 
+// or without modification, are permitted provided that the following 
+// conditions are met:
+
+//     * Redistributions of source code must retain the above copyright 
+//       notice, this list of conditions and the following disclaimer. 
+
+//     * Redistributions in binary form must reproduce the above copyright 
+//       notice, this list of conditions and the following disclaimer in 
+//       the documentation and/or other materials provided with the 
+//       distribution. 
+
+//     * Neither the name of UChicago Argonne, LLC, Argonne National 
+//       Laboratory, ANL, the U.S. Government, nor the names of its 
+//       contributors may be used to endorse or promote products derived 
+//       from this software without specific prior written permission. 
+
+// THIS SOFTWARE IS PROVIDED BY UChicago Argonne, LLC AND CONTRIBUTORS 
+// "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT 
+// LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS 
+// FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL UChicago 
+// Argonne, LLC OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, 
+// INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, 
+// BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; 
+// LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER 
+// CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT 
+// LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN 
+// ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE 
+// POSSIBILITY OF SUCH DAMAGE.
+
+#include "utils.h"
+#include "filter.h"
+#include "fft.h"
+
+// Nodes of at most this many pixels on a side are back-projected 
+// directly.
+#define HBP_LEAF 8
+
+// Angles are halved for a child node only while more than this many 
+// angles per pixel of its side length remain.
+#define HBP_ANGLE_RATIO 2
+
+// Detector sampling interval of the filtered projections, in pixels.
+#define HBP_STEP 0.5
+
+
+static void 
+hbp_node(
+    float *sino, int np, int len, float u0, float *theta, 
+    float cx, float cy, int ix0, int iy0, int nx, int ny, 
+    int ngridx, int ngridy, float *recon);
+
+
+void 
+hbp(
+    float *data, int dx, int dy, int dz, float *center, float *theta,
+    float *recon, int ngridx, int ngridy, char *fname, 
+    float *fpar, int nfpar, int istart, int iend)
+{
+    int s, p, j, d, pdim, pdim2, len;
+    float norm, w;
+
+    // Zero-pad the projections to at least twice their width, so
+    // that the filter convolution does not wrap around.
+    pdim = 1;
+    while (pdim < 2*dz)
+    {
+        pdim <<= 1;
+    }
+    pdim2 = pdim >> 1;
+    norm = M_PI/dx/pdim;
+
+    // The filtered projections are resampled on a grid twice as fine 
+    // as the detector by zero-padding their spectrum, which keeps the 
+    // linear interpolations at each level of the hierarchy accurate.
+    len = 2*dz-1;
+
+    float *fweight = (float *)malloc(pdim2*sizeof(float));
+    float *sino = (float *)malloc(4*pdim*sizeof(float));
+    float *fdata = (float *)malloc(dx*len*sizeof(float));
+
+    assert(fweight != NULL && sino != NULL && fdata != NULL);
+
+    // Set up table of filter factors.
+    set_filter_weights(fname, fpar, nfpar, pdim, fweight);
+
+    // For each slice
+    for (s=istart; s<iend; s++)
+    {
+        // Filter the projections, two at a time as the real and 
+        // imaginary parts of the FFT input.
+        for (p=0; p<dx; p+=2)
+        {
+            for (d=0; d<dz; d++)
+            {
+                sino[2*d] = data[d+s*dz+p*dy*dz];
+                sino[2*d+1] = (p+1<dx) ? data[d+s*dz+(p+1)*dy*dz] : 0;
+            }
+            for (j=2*dz; j<4*pdim; j++)
+            {
+                sino[j] = 0;
+            }
+
+            four1(sino-1, pdim, 1);
+
+            // Move the negative frequencies to the end of the twice 
+            // longer spectrum while applying the filter.
+            for (j=pdim2-1; j>0; j--)
+            {
+                w = fweight[j]*norm;
+                sino[2*(2*pdim-j)] = sino[2*(pdim-j)]*w;
+                sino[2*(2*pdim-j)+1] = sino[2*(pdim-j)+1]*w;
+                sino[2*(pdim-j)] = sino[2*(pdim-j)+1] = 0;
+                sino[2*j] *= w;
+                sino[2*j+1] *= w;
+            }
+            sino[0] *= fweight[0]*norm;
+            sino[1] *= fweight[0]*norm;
+            sino[pdim] = sino[pdim+1] = 0;
+
+            four1(sino-1, 2*pdim, -1);
+
+            for (j=0; j<len; j++)
+            {
+                fdata[j+p*len] = sino[2*j];
+                if (p+1 < dx)
+                {
+                    fdata[j+(p+1)*len] = sino[2*j+1];
+                }
+            }
+        }
+
+        // Detector sample j lies at -(center-0.5)+j*HBP_STEP relative 
+        // to the projection of the grid center.
+        hbp_node(
+            fdata, dx, len, -(center[s]-0.5), theta, 
+            0, 0, 0, 0, ngridx, ngridy, ngridx, ngridy, 
+            recon+s*ngridx*ngridy);
+    }
+
+    free(fweight);
+    free(sino);
+    free(fdata);
+}
+
+
+static void 
+hbp_node(
+    float *sino, int np, int len, float u0, float *theta, 
+    float cx, float cy, int ix0, int iy0, int nx, int ny, 
+    int ngridx, int ngridy, float *recon)
+{
+    // Back-project the filtered sinogram, sino[p*len+j], into the 
+    // nx by ny block of the grid starting at (ix0, iy0). Sample j of 
+    // projection p lies at u0+j*HBP_STEP on the detector, relative 
+    // to the projection of the block center (cx, cy).
+    //
+    // Large blocks are split into four. The projections are shifted 
+    // to the center of each sub-block and cropped to its footprint. 
+    // A smaller block needs fewer angles, so adjacent projections 
+    // are summed pairwise, which makes the cost of each level of the 
+    // hierarchy O(N^2) instead of O(N^3).
+
+    int p, q, j, i0, k, ix, iy;
+    int nxc[2], nyc[2], ixc[2], iyc[2];
+    int npc, lenc, decimate;
+    float sin_p, cos_p, u, t, w, rad, u0c, ccx, ccy, shift, x, y;
+    float *sinoc, *thetac;
+
+    if (nx <= HBP_LEAF && ny <= HBP_LEAF)
+    {
+        for (p=0; p<np; p++)
+        {
+            sin_p = sinf(theta[p]);
+            cos_p = cosf(theta[p]);
+            for (ix=0; ix<nx; ix++)
+            {
+                x = -ngridx/2.+ix0+ix+0.5-cx;
+                for (iy=0; iy<ny; iy++)
+                {
+                    y = -ngridy/2.+iy0+iy+0.5-cy;
+                    t = (-x*sin_p+y*cos_p-u0)/HBP_STEP;
+                    i0 = (int)floorf(t);
+                    if (i0 < 0 || i0 >= len-1)
+                    {
+                        continue;
+                    }
+                    w = t-i0;
+                    recon[iy0+iy+(ix0+ix)*ngridy] += 
+                        (1-w)*sino[i0+p*len]+w*sino[i0+1+p*len];
+                }
+            }
+        }
+        return;
+    }
+
+    nxc[0] = nx/2;
+    nxc[1] = nx-nxc[0];
+    ixc[0] = ix0;
+    ixc[1] = ix0+nxc[0];
+    nyc[0] = ny/2;
+    nyc[1] = ny-nyc[0];
+    iyc[0] = iy0;
+    iyc[1] = iy0+nyc[0];
+
+    // For each sub-block
+    for (k=0; k<4; k++)
+    {
+        if (nxc[k/2] == 0 || nyc[k%2] == 0)
+        {
+            continue;
+        }
+
+        // Center and radius of the sub-block. The cropped projections 
+        // cover its footprint with one pixel of margin.
+        ccx = -ngridx/2.+ixc[k/2]+nxc[k/2]/2.;
+        ccy = -ngridy/2.+iyc[k%2]+nyc[k%2]/2.;
+        rad = 0.5*sqrtf(nxc[k/2]*nxc[k/2]+nyc[k%2]*nyc[k%2])+1;
+        lenc = 2*(int)ceilf(rad/HBP_STEP)+1;
+        u0c = -(lenc-1)/2*HBP_STEP;
+
+        decimate = np > HBP_ANGLE_RATIO*nxc[k/2] && 
+            np > HBP_ANGLE_RATIO*nyc[k%2];
+        npc = decimate ? (np+1)/2 : np;
+
+        sinoc = (float *)calloc(npc*lenc, sizeof(float));
+        thetac = (float *)malloc(npc*sizeof(float));
+        assert(sinoc != NULL && thetac != NULL);
+
+        for (q=0; q<npc; q++)
+        {
+            if (decimate && 2*q+1 < np)
+            {
+                thetac[q] = (theta[2*q]+theta[2*q+1])/2;
+            }
+            else
+            {
+                thetac[q] = theta[decimate ? 2*q : q];
+            }
+        }
+
+        for (p=0; p<np; p++)
+        {
+            q = decimate ? p/2 : p;
+            shift = -(ccx-cx)*sinf(theta[p])+(ccy-cy)*cosf(theta[p]);
+            for (j=0; j<lenc; j++)
+            {
+                u = u0c+j*HBP_STEP+shift;
+                t = (u-u0)/HBP_STEP;
+                i0 = (int)floorf(t);
+                if (i0 < 0 || i0 >= len-1)
+                {
+                    continue;
+                }
+                w = t-i0;
+                sinoc[j+q*lenc] += 
+                    (1-w)*sino[i0+p*len]+w*sino[i0+1+p*len];
+            }
+        }
+
+        hbp_node(
+            sinoc, npc, lenc, u0c, thetac, ccx, ccy, 
+            ixc[k/2], iyc[k%2], nxc[k/2], nyc[k%2], 
+            ngridx, ngridy, recon);
+
+        free(sinoc);
+        free(thetac);
+    }
+}
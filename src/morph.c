@@ -106,10 +106,10 @@ apply_pad(
 
 
 DLL void 
-downsample(
+upsample(
     float* data, int dx, int dy, int dz,
-    int level, int axis, float* out) 
-{
+    int level, int axis, float* out) {
+
     int m, n, k, i, j, p, ind;
     int binsize;
     
@@ -117,7 +117,6 @@ downsample(
     
     if (axis == 0)
     {
-        dx /= binsize;
         for (m = 0, ind = 0; m < dx; m++) 
         {
             i = m * (dy * dz);
@@ -128,7 +127,7 @@ downsample(
                     j = n * dz;
                     for (k = 0; k < dz; k++)
                     {
-                        out[i+j+k] += data[ind]/binsize;
+                        out[ind] = data[i+j+k];
                         ind++;
                     }
                 }
@@ -137,7 +136,6 @@ downsample(
     }
     else if (axis == 1)
     {
-        dy /= binsize;
         for (m = 0, ind = 0; m < dx; m++) 
         {
             i = m * (dy * dz);
@@ -148,7 +146,7 @@ downsample(
                 {
                     for (k = 0; k < dz; k++)
                     {
-                        out[i+j+k] += data[ind]/binsize;
+                        out[ind] = data[i+j+k];
                         ind++;
                     }
                 }
@@ -157,7 +155,6 @@ downsample(
     }
     else if (axis == 2)
     {
-        dz /= binsize;
         for (m = 0, ind = 0; m < dx; m++) 
         {
             i = m * (dy * dz);
@@ -168,7 +165,7 @@ downsample(
                 {
                     for (p = 0; p < binsize; p++) 
                     {
-                        out[i+j+k] += data[ind]/binsize;
+                        out[ind] = data[i+j+k];
                         ind++;
                     }
                 }
@@ -179,70 +176,81 @@ downsample(
 
 
 DLL void 
-upsample(
-    float* data, int dx, int dy, int dz,
-    int level, int axis, float* out) {
+binning(
+    float* data, int dx, int dy, int dz, 
+    int fx, int fy, int fz, int method, float* out, 
+    int istart, int iend) 
+{
+    // Bins blocks of fx x fy x fz values into single values with their 
+    // sum (method 0), mean (method 1) or maximum (method 2), for the 
+    // output planes istart to iend of the first axis. Trailing values 
+    // that do not fill a block are dropped. NaN values propagate with 
+    // every method. Each input row is read once and reduced into its 
+    // output row.
 
-    int m, n, k, i, j, p, ind;
-    int binsize;
-    
-    binsize = pow(2, level);
-    
-    if (axis == 0)
+    int m, n, p, q, k, j;
+    int ny = dy / fy, nz = dz / fz;
+    float *row, *orow, v;
+    float scale = 1.f / ((float)fx * fy * fz);
+
+    for (m = istart; m < iend; m++) 
     {
-        for (m = 0, ind = 0; m < dx; m++) 
+        for (n = 0; n < ny; n++) 
         {
-            i = m * (dy * dz);
-            for (p = 0; p < binsize; p++) 
+            orow = out + ((size_t)m * ny + n) * nz;
+            for (k = 0; k < nz; k++) 
             {
-                for (n = 0; n < dy; n++) 
-                {
-                    j = n * dz;
-                    for (k = 0; k < dz; k++)
-                    {
-                        out[ind] = data[i+j+k];
-                        ind++;
-                    }
-                }
+                orow[k] = (method == 2) ? -INFINITY : 0.f;
             }
-        }
-    }
-    else if (axis == 1)
-    {
-        for (m = 0, ind = 0; m < dx; m++) 
-        {
-            i = m * (dy * dz);
-            for (n = 0; n < dy; n++) 
+            for (p = 0; p < fx; p++) 
             {
-                j = n * dz;
-                for (p = 0; p < binsize; p++) 
+                for (q = 0; q < fy; q++) 
                 {
-                    for (k = 0; k < dz; k++)
+                    row = data + 
+                        ((size_t)(m * fx + p) * dy + n * fy + q) * dz;
+                    if (method == 2) 
                     {
-                        out[ind] = data[i+j+k];
-                        ind++;
+                        for (k = 0; k < nz; k++) 
+                        {
+                            v = orow[k];
+                            for (j = 0; j < fz; j++) 
+                            {
+                                // A NaN is taken and then kept.
+                                v = (row[k * fz + j] > v || 
+                                    row[k * fz + j] != row[k * fz + j]) ? 
+                                    row[k * fz + j] : v;
+                            }
+                            orow[k] = v;
+                        }
+                    }
+                    else if (fz == 1) 
+                    {
+                        for (k = 0; k < nz; k++) 
+                        {
+                            orow[k] += row[k];
+                        }
+                    }
+                    else 
+                    {
+                        for (k = 0; k < nz; k++) 
+                        {
+                            v = 0.f;
+                            for (j = 0; j < fz; j++) 
+                            {
+                                v += row[k * fz + j];
+                            }
+                            orow[k] += v;
+                        }
                     }
                 }
             }
-        }
-    }
-    else if (axis == 2)
-    {
-        for (m = 0, ind = 0; m < dx; m++) 
-        {
-            i = m * (dy * dz);
-            for (n = 0; n < dy; n++) 
+            if (method == 1) 
             {
-                j = n * dz;
-                for (k = 0; k < dz; k++) 
+                for (k = 0; k < nz; k++) 
                 {
-                    for (p = 0; p < binsize; p++) 
-                    {
-                        out[ind] = data[i+j+k];
-                        ind++;
-                    }
+                    orow[k] *= scale;
                 }
             }
         }
     }
-}
\ No newline at end of file
+}
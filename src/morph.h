@@ -64,15 +64,16 @@ apply_pad(
     int axis, int npad, float* out);
 
 DLL void 
-downsample(
+upsample(
     float* data, 
     int dx, int dy, int dz,
     int level, int axis, float* out);
 
 DLL void 
-upsample(
+binning(
     float* data, 
     int dx, int dy, int dz,
-    int level, int axis, float* out);
+    int fx, int fy, int fz, int method, float* out,
+    int istart, int iend);
 
 #endif
\ No newline at end of file
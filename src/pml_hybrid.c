@@ -48,7 +48,7 @@ void
 pml_hybrid(
     float *data, int dx, int dy, int dz, float *center, float *theta,
     float *recon, int ngridx, int ngridy, int num_iter, float *reg_pars, 
-    int istart, int iend)
+    float fov, int istart, int iend)
 {
     float *gridx = (float *)malloc((ngridx+1)*sizeof(float));
     float *gridy = (float *)malloc((ngridy+1)*sizeof(float));
@@ -62,6 +62,7 @@ pml_hybrid(
     float *coory = (float *)malloc((ngridx+ngridy)*sizeof(float));
     float *dist = (float *)malloc((ngridx+ngridy)*sizeof(float));
     int *indi = (int *)malloc((ngridx+ngridy)*sizeof(int));
+    char *mask = fov_mask(ngridx, ngridy, fov);
 
     assert(coordx != NULL && coordy != NULL &&
         ax != NULL && ay != NULL && by != NULL && bx != NULL &&
@@ -110,9 +111,15 @@ pml_hybrid(
                 // For each detector pixel 
                 for (d=0; d<dz; d++) 
                 {
+                    // Skip rays that miss the field of view.
+                    yi = -(dz-1)/2.0+d+mov;
+                    if (outside_fov(yi, ngridx, ngridy, fov)) 
+                    {
+                        continue;
+                    }
+
                     // Calculate coordinates
                     xi = -1e6;
-                    yi = -(dz-1)/2.0+d+mov;
                     calc_coords(
                         ngridx, ngridy, xi, yi, sin_p, cos_p, gridx, gridy, 
                         coordx, coordy);
@@ -137,6 +144,9 @@ pml_hybrid(
                         ngridx, ngridy, csize, coorx, coory, 
                         indi, dist);
 
+                    // Drop the segments outside the field of view.
+                    csize = trim_fov(csize, indi, dist, mask);
+
                     // Calculate simdata 
                     calc_simdata(p, s, d, ngridx, ngridy, dy, dz,
                         csize, indi, dist, recon,
@@ -369,7 +379,7 @@ pml_hybrid(
             for (n = 0; n < ngridx; n++) {
                 for (m = 0; m < ngridy; m++) {
                     q = m + n*ngridy;
-                    if (F[q] != 0.0) {
+                    if (F[q] != 0.0 && mask[q]) {
                         ind0 = q + s*ngridx*ngridy;
                         recon[ind0] = (-G[q]+sqrt(G[q]*G[q]-8*E[q]*F[q]))/(4*F[q]);
                     }
@@ -397,4 +407,5 @@ pml_hybrid(
     free(coory);
     free(dist);
     free(indi);
+    free(mask);
 }
\ No newline at end of file
@@ -48,7 +48,7 @@ void
 sirt(
     float *data, int dx, int dy, int dz, float *center, float *theta,
     float *recon, int ngridx, int ngridy, int num_iter, 
-    int istart, int iend)
+    float fov, int istart, int iend)
 {
     float *gridx = (float *)malloc((ngridx+1)*sizeof(float));
     float *gridy = (float *)malloc((ngridy+1)*sizeof(float));
@@ -62,6 +62,7 @@ sirt(
     float *coory = (float *)malloc((ngridx+ngridy)*sizeof(float));
     float *dist = (float *)malloc((ngridx+ngridy)*sizeof(float));
     int *indi = (int *)malloc((ngridx+ngridy)*sizeof(int));
+    char *mask = fov_mask(ngridx, ngridy, fov);
 
     assert(coordx != NULL && coordy != NULL &&
         ax != NULL && ay != NULL && by != NULL && bx != NULL &&
@@ -106,9 +107,15 @@ sirt(
                 // For each detector pixel 
                 for (d=0; d<dz; d++) 
                 {
+                    // Skip rays that miss the field of view.
+                    yi = -(dz-1)/2.0+d+mov;
+                    if (outside_fov(yi, ngridx, ngridy, fov)) 
+                    {
+                        continue;
+                    }
+
                     // Calculate coordinates
                     xi = -1e6;
-                    yi = -(dz-1)/2.0+d+mov;
                     calc_coords(
                         ngridx, ngridy, xi, yi, sin_p, cos_p, gridx, gridy, 
                         coordx, coordy);
@@ -133,6 +140,9 @@ sirt(
                         ngridx, ngridy, csize, coorx, coory, 
                         indi, dist);
 
+                    // Drop the segments outside the field of view.
+                    csize = trim_fov(csize, indi, dist, mask);
+
                     // Calculate simdata 
                     calc_simdata(p, s, d, ngridx, ngridy, dy, dz,
                         csize, indi, dist, recon,
@@ -188,4 +198,5 @@ sirt(
     free(coory);
     free(dist);
     free(indi);
+    free(mask);
 }
\ No newline at end of file
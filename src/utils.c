@@ -246,4 +246,64 @@ calc_simdata(
     {
         simdata[index_data] += model[indi[n]+index_model]*dist[n];
     }
-}
\ No newline at end of file
+}
+
+
+char *
+fov_mask(int ry, int rz, float fov)
+{
+    // Marks the pixels inside the circular field of view with the 
+    // same geometry as tomopy.misc.corr.circ_mask. A non-positive fov 
+    // marks all pixels.
+
+    int m, n;
+    float x, y, rad;
+    char *mask = (char *)malloc(ry*rz*sizeof(char));
+
+    assert(mask != NULL);
+
+    rad = fov*(ry < rz ? ry : rz)/2.;
+    for (m=0; m<ry; m++) 
+    {
+        y = m-ry/2.;
+        for (n=0; n<rz; n++) 
+        {
+            x = n-rz/2.;
+            mask[n+m*rz] = (fov <= 0 || x*x+y*y <= rad*rad);
+        }
+    }
+    return mask;
+}
+
+
+bool 
+outside_fov(float yi, int ry, int rz, float fov)
+{
+    // True if the ray at distance yi from the grid center misses every 
+    // pixel of the field of view. The margin covers the half-pixel 
+    // offset of the mask and the pixel extent.
+
+    float rad = fov*(ry < rz ? ry : rz)/2.;
+    return (fov > 0 && fabs(yi) > rad+2);
+}
+
+
+int 
+trim_fov(int csize, int *indi, float *dist, char *mask)
+{
+    // Drops the ray segments in pixels outside the field of view and 
+    // returns the new number of intersection points.
+
+    int n, k = 0;
+
+    for (n=0; n<csize-1; n++) 
+    {
+        if (mask[indi[n]]) 
+        {
+            indi[k] = indi[n];
+            dist[k] = dist[n];
+            k++;
+        }
+    }
+    return (csize > 0) ? k+1 : 0;
+}
@@ -96,6 +96,7 @@ art(
     int ngridx,
     int ngridy,
     int num_iter,
+    float fov,
     int istart, 
     int iend);
 
@@ -113,6 +114,7 @@ bart(
     int num_iter,
     int num_block,
     float *ind_block,
+    float fov,
     int istart, 
     int iend);
 
@@ -128,6 +130,25 @@ fbp(
     int ngridx,
     int ngridy,
     char name[16],
+    float *fpar,
+    int nfpar,
+    int istart, 
+    int iend);
+
+void 
+hbp(
+    float *data,
+    int dx, 
+    int dy, 
+    int dz,
+    float *center,
+    float *theta,
+    float *recon,
+    int ngridx,
+    int ngridy,
+    char name[16],
+    float *fpar,
+    int nfpar,
     int istart, 
     int iend);
 
@@ -143,6 +164,7 @@ mlem(
     int ngridx,
     int ngridy,
     int num_iter,
+    float fov,
     int istart, 
     int iend);
 
@@ -160,6 +182,7 @@ osem(
     int num_iter,
     int num_block,
     float *ind_block,
+    float fov,
     int istart, 
     int iend);
 
@@ -178,6 +201,7 @@ ospml_hybrid(
     float *reg_pars,
     int num_block,
     float *ind_block,
+    float fov,
     int istart, 
     int iend);
 
@@ -196,6 +220,7 @@ ospml_quad(
     float *reg_pars,
     int num_block,
     float *ind_block,
+    float fov,
     int istart, 
     int iend);
 
@@ -212,6 +237,7 @@ pml_hybrid(
     int ngridy,
     int num_iter,
     float *reg_pars,
+    float fov,
     int istart, 
     int iend);
 
@@ -228,6 +254,7 @@ pml_quad(
     int ngridy,
     int num_iter,
     float *reg_pars,
+    float fov,
     int istart, 
     int iend);
 
@@ -243,6 +270,7 @@ sirt(
     int ngridx,
     int ngridy,
     int num_iter,
+    float fov,
     int istart, 
     int iend);
 
@@ -302,4 +330,22 @@ calc_simdata(
     float *model, 
     float *simdata);
 
+char *
+fov_mask(
+    int ngridx, int ngridy, 
+    float fov);
+
+bool 
+outside_fov(
+    float yi, 
+    int ngridx, int ngridy, 
+    float fov);
+
+int 
+trim_fov(
+    int csize, 
+    int *indi, 
+    float *dist, 
+    char *mask);
+
 #endif
@@ -73,6 +73,40 @@ def synthetic_data():
     return data
 
 
+def test_circ_mask():
+    arr = np.ones((2, 5, 5))
+    mask = np.ones((5, 5))
+    mask[0, :] = 0
+    mask[:, 0] = 0
+    assert_array_almost_equal(
+        circ_mask(arr.copy(), axis=0),
+        np.tile(mask, (2, 1, 1)))
+    assert_array_almost_equal(
+        circ_mask(np.ones((5, 5, 2)), axis=2, val=2)[:, :, 1],
+        np.where(mask, 1, 2))
+
+
+def test_get_circ_mask():
+    mask = get_circ_mask(5, 5)
+    assert_equals(mask.dtype, np.bool_)
+    assert_equals(mask.flags.writeable, False)
+    assert_array_almost_equal(
+        ~mask, circ_mask(np.ones((1, 5, 5)), axis=0)[0])
+
+
+def test_gaussian_filter():
+    arr = np.ones((4, 6, 8))
+    arr[2, 3, 4] = 2.
+    out = gaussian_filter(arr, sigma=1., axis=None)
+    assert_array_almost_equal(out.sum(), arr.sum(), decimal=4)
+    assert_array_almost_equal(
+        gaussian_filter(arr, sigma=1., axis=0)[1],
+        np.ones((6, 8)))
+    assert_array_almost_equal(
+        gaussian_filter(np.ones((4, 6, 8)), sigma=1., order=1, axis=2),
+        np.zeros((4, 6, 8)))
+
+
 def test_median_filter():
     data = synthetic_data()
     assert_array_almost_equal(
@@ -120,6 +154,11 @@ def test_median_filter():
           [63., 33., 74., 16., 41.],
           [42., 53., 32., 63., 35.]]])
 
+    assert_array_almost_equal(
+        median_filter(data, axis=None)[1, 1:3, 1:4],
+        [[42., 52., 41.],
+         [42., 52., 41.]])
+
 
 def test_remove_neg():
     arr = np.arange(-2, 2, dtype='float32')
@@ -133,6 +172,15 @@ def test_remove_nan():
     assert_equals(np.isnan(out).sum(), 0)
 
 
+def test_sanitize():
+    arr = np.array([[np.nan, -1., 2.], [np.inf, -np.inf, 5.]],
+                   dtype='float32')
+    out, counts = sanitize(arr, val=1., cutoff=3.)
+    assert_array_almost_equal(out, [[1., 1., 2.], [1., 1., 3.]])
+    assert_equals(counts, {'nan': 1, 'inf': 2, 'neg': 1, 'cutoff': 1})
+    assert_equals(out is arr, True)
+
+
 __author__ = "Doga Gursoy"
 __copyright__ = "Copyright (c) 2015, UChicago Argonne, LLC."
 __docformat__ = 'restructuredtext en'
@@ -78,6 +78,25 @@ def test_apply_pad():
         np.ones((4, 8, 23)))
 
 
+def test_binning():
+    arr = np.arange(7 * 6 * 9, dtype='float32').reshape(7, 6, 9)
+    ref = arr[:6, :, :].reshape(3, 2, 3, 2, 3, 3)
+    assert_array_almost_equal(
+        binning(arr, (2, 2, 3), method='sum'), ref.sum(axis=(1, 3, 5)))
+    assert_array_almost_equal(
+        binning(arr, (2, 2, 3)), ref.mean(axis=(1, 3, 5)))
+    out = np.empty((3, 3, 3), dtype='float32')
+    assert_equals(
+        binning(arr, (2, 2, 3), method='max', out=out) is out, True)
+    assert_array_almost_equal(out, ref.max(axis=(1, 3, 5)))
+    arr[1, 0, 4] = np.nan
+    ref = arr[:6, :, :].reshape(3, 2, 3, 2, 3, 3)
+    for method in ('sum', 'mean', 'max'):
+        assert_array_almost_equal(
+            binning(arr, (2, 2, 3), method=method),
+            getattr(ref, method)(axis=(1, 3, 5)))
+
+
 def test_downsample():
     assert_array_almost_equal(
         downsample(np.ones((4, 8, 16)), level=1, axis=0),
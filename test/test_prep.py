@@ -50,7 +50,8 @@ from __future__ import absolute_import, division, print_function
 
 from tomopy.prep import *
 import numpy as np
-from nose.tools import assert_equals
+import h5py
+from nose.tools import assert_equals, assert_raises
 from numpy.testing import assert_array_almost_equal
 
 
@@ -105,6 +106,21 @@ def test_focus_region():
         0)
 
 
+def test_minus_log():
+    assert_array_almost_equal(
+        minus_log(synthetic_data()),
+        -np.log(synthetic_data()))
+    assert_array_almost_equal(
+        minus_log([[[np.nan, -1., 1.]]], floor=np.exp(-2.)),
+        [[[2., 2., 0.]]])
+    tomo = np.array(synthetic_data(), dtype='float32')
+    out = np.empty_like(tomo)
+    assert_equals(minus_log(tomo, out=out) is out, True)
+    assert_array_almost_equal(out, -np.log(tomo))
+    assert_equals(minus_log(tomo) is tomo, True)
+    assert_array_almost_equal(tomo, out)
+
+
 def test_normalize():
     # Synthetic flat field data
     flat = [[[52., 53., 51., 56., 55.],
@@ -137,6 +153,43 @@ def test_normalize():
           [0.8077, 1.0000, 1.0000, 0.2157, 0.8081],
           [1.0000, 0.1980, 0.6392, 1.0000, 0.2772]]], 
           decimal=4)
+    assert_array_almost_equal(
+        normalize(synthetic_data(), flat, dark, cutoff=1., minus_log=True),
+        -np.log(normalize(synthetic_data(), flat, dark, cutoff=1.)))
+    tomo = np.array(synthetic_data(), dtype='float32')
+    assert_equals(normalize(tomo, flat, dark) is tomo, True)
+
+
+def test_normalize_dynamic():
+    y, x = np.mgrid[0:8, 0:10]
+    base = 100. + x
+    mode = np.sin(0.5 * x + 0.3 * y)
+    flat = base + 5. * np.arange(-3, 4)[:, np.newaxis, np.newaxis] * mode
+    trans = np.ones((6, 8, 10))
+    trans[:, 3:5, 4:6] = 0.5
+    tomo = trans * (base + 4. * np.arange(6)[:, np.newaxis, np.newaxis] *
+                    mode)
+    dark = np.zeros((1, 8, 10))
+    assert_array_almost_equal(
+        normalize(tomo, flat, dark, num_eigen=1), trans, decimal=2)
+
+
+def test_reduce_frames():
+    frames = np.ones((7, 4, 5), dtype='uint16')
+    frames[3, 1, 2] = 100
+    assert_array_almost_equal(
+        reduce_frames(frames, method='mean', nrow=3)[1, 2], 100. / 7 + 6. / 7)
+    f = h5py.File('frames.h5', 'w', driver='core', backing_store=False)
+    assert_array_almost_equal(
+        reduce_frames(f.create_dataset('frames', data=frames),
+                      method='mean', nrow=3),
+        np.mean(frames, axis=0))
+    f.close()
+    assert_raises(ValueError, reduce_frames, frames, method='avg')
+    assert_array_almost_equal(
+        reduce_frames(frames, method='median', nrow=3), np.ones((4, 5)))
+    assert_array_almost_equal(
+        reduce_frames(frames, method='clip', nrow=3), np.ones((4, 5)))
 
 
 def test_remove_stripe1():
@@ -146,14 +199,20 @@ def test_remove_stripe1():
     assert_equals(
         np.isnan(remove_stripe1(np.ones((10, 12, 14)))).sum(),
         0)
+    tomo = np.ones((64, 4, 32))
+    tomo[:, :, 15] += 1.
+    tomo = remove_stripe1(tomo)
+    assert_equals(
+        (tomo[:, :, 15] - tomo[:, :, 14]).mean() < 0.2,
+        True)
 
 
 def test_remove_stripe2():
     assert_equals(
-        remove_stripe1(np.ones((10, 12, 14))).shape,
+        remove_stripe2(np.ones((10, 12, 14))).shape,
         (10, 12, 14))
     assert_equals(
-        np.isnan(remove_stripe1(np.ones((10, 12, 14)))).sum(),
+        np.isnan(remove_stripe2(np.ones((10, 12, 14)))).sum(),
         0)
 
 
@@ -164,6 +223,15 @@ def test_remove_zinger():
     assert_equals(
         np.isnan(remove_zinger(np.ones((10, 12, 14)), dif=10)).sum(),
         0)
+    tomo = np.ones((9, 10, 10))
+    tomo[:, 5, 5] = 10.
+    tomo[4, 2, 2] = 10.
+    assert_array_almost_equal(
+        remove_zinger(tomo, dif=1), np.ones((9, 10, 10)))
+    tomo[4, 5, 5] = 1.
+    assert_array_almost_equal(
+        remove_zinger(tomo, dif=1, size=5, nproj=1)[:, 5, 5],
+        [10., 10., 10., 10., 1., 10., 10., 10., 10.])
 
 
 def test_retrieve_phase():
@@ -176,6 +244,22 @@ def test_retrieve_phase():
     assert_equals(
         np.isnan(retrieve_phase(np.ones((10, 12, 14)), pad=False)).sum(),
         0)
+    assert_array_almost_equal(
+        retrieve_phase(np.ones((10, 12, 14)), pad=True),
+        np.ones((10, 12, 14)))
+
+
+def test_retrieve_phase_multi():
+    tomo = np.random.rand(4, 12, 14)
+    assert_array_almost_equal(
+        retrieve_phase_multi(tomo, alpha=[1e-3, 1e-2])[1],
+        retrieve_phase(tomo, alpha=1e-2))
+    assert_array_almost_equal(
+        retrieve_phase_multi([tomo, tomo], dist=[50, 50])[0],
+        retrieve_phase(tomo))
+    assert_equals(
+        retrieve_phase_multi([tomo, tomo], dist=[20, 50], alpha=[1, 2]).shape,
+        (2, 4, 12, 14))
 
 
 if __name__ == '__main__':
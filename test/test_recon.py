@@ -49,11 +49,20 @@
 from __future__ import absolute_import, division, print_function
 
 from tomopy.recon import *
+from tomopy.recon import _find_center_cost, _CACHE
+from tomopy.recon import _init_shared, _art, _mlem, _pml_quad, _sirt
+import tomopy.misc.mproc as mp
+from tomopy.misc.corr import circ_mask, get_circ_mask
+from tomopy.misc.morph import downsample
+from tomopy.io.phantom import shepp2d
+from tomopy.sim import angles, project
 import numpy as np
 import os
 import shutil
-from nose.tools import assert_equals
-from numpy.testing import assert_array_almost_equal
+import h5py
+import tifffile
+from nose.tools import assert_equals, assert_raises
+from numpy.testing import assert_array_almost_equal, assert_almost_equal
 
 
 __author__ = "Doga Gursoy"
@@ -122,6 +131,54 @@ def test_bart():
         decimal=4)
 
 
+def test_find_center():
+    tomo, theta = synthetic_blob(xcoord=5., ycoord=2.)
+    assert_almost_equal(
+        find_center(tomo, theta, init=10., smin=-4., smax=4.), 12., 0)
+    assert_almost_equal(
+        find_center(tomo, theta, init=10., smin=-4., smax=4., level=1),
+        12., 0)
+
+
+def test_find_center_cost():
+    # Candidates are reconstructed in pairs, so neighbouring candidates
+    # must each be scored at their own center.
+    tomo, theta = synthetic_blob(xcoord=5., ycoord=2.)
+    args = (tomo[:, 0:1], theta, np.array([-1.]), np.array([1.]), True,
+            1., None, None)
+    center = 12. + np.arange(-3., 3., 0.5)[:, np.newaxis]
+    set_recon_cache(0)
+    cost = _find_center_cost(center, *args)
+    for m in range(len(center)):
+        assert_array_almost_equal(
+            cost[m], _find_center_cost(center[m:m + 1], *args)[0])
+    set_recon_cache()
+    assert_equals(np.all(cost[0::2] != cost[1::2]), True)
+
+
+def test_find_center_pc():
+    theta = np.linspace(0, np.pi, 25)
+    s = np.arange(24) - 12.
+    d = (s - 2. * np.cos(theta)[:, np.newaxis] +
+         5. * np.sin(theta)[:, np.newaxis])
+    tomo = np.exp(-d * d / 8.)[:, np.newaxis, :].repeat(2, axis=1)
+    assert_array_almost_equal(
+        find_center_pc(tomo, theta), [12., 12.], decimal=1)
+
+
+def test_fit_center():
+    theta = np.linspace(0, np.pi, 25)
+    s = np.arange(24) - 12.
+    tomo = np.zeros((25, 10, 24), dtype='float32')
+    center = 12. + 0.1 * np.arange(10)
+    for m in range(10):
+        d = (s - center[m] + 12. - 2. * np.cos(theta)[:, np.newaxis] +
+             5. * np.sin(theta)[:, np.newaxis])
+        tomo[:, m, :] = np.exp(-d * d / 8.)
+    assert_array_almost_equal(
+        fit_center(tomo, theta, num_slice=5), center, decimal=1)
+
+
 def test_gridrec():
     tomo, theta = synthetic_tomo()
     assert_array_almost_equal(
@@ -141,6 +198,189 @@ def test_gridrec():
         decimal=4)
 
 
+def synthetic_blob(xcoord=0., ycoord=0.):
+    """
+    Return synthetic tomographic data of a Gaussian blob.
+
+    Parameters
+    ----------
+    xcoord, ycoord : float, optional
+        Location of the blob relative to the rotation axis.
+
+    Returns
+    -------
+    ndarray
+        3D tomographic data.
+    array
+        Corresponding projection angles.
+    """
+    theta = np.linspace(0, np.pi, 48, endpoint=False)
+    s = np.arange(24) - 12.
+    tomo = np.zeros((48, 2, 24), dtype='float32')
+    for m in range(48):
+        d = s - ycoord * np.cos(theta[m]) + xcoord * np.sin(theta[m])
+        tomo[m] = np.exp(-d * d / 8.)
+    return tomo, theta
+
+
+def test_gridrec_roi():
+    tomo, theta = synthetic_blob()
+    ref = gridrec(tomo, theta)[:, 6:18, 6:18]
+    tomo, theta = synthetic_blob(xcoord=-2, ycoord=4)
+    rec = gridrec(
+        tomo, theta, num_gridx=12, num_gridy=12, xcoord=-2, ycoord=4)
+    assert_equals(rec.shape, (2, 12, 12))
+    assert_array_almost_equal(rec, ref, decimal=4)
+
+
+def synthetic_blobs(dz):
+    """
+    Return synthetic tomographic data of Gaussian blobs spread over a
+    detector of dz pixels.
+    """
+    theta = np.linspace(0, np.pi, 90, endpoint=False)
+    s = np.arange(dz) - dz / 2.
+    tomo = np.zeros((90, 2, dz), dtype='float32')
+    for x, y in ((-20, 5), (15, -18), (4, 22), (-8, -12), (18, 14)):
+        d = (s - y * np.cos(theta)[:, np.newaxis] +
+             x * np.sin(theta)[:, np.newaxis])
+        tomo += np.exp(-d * d / 8.)[:, np.newaxis, :]
+    return tomo, theta
+
+
+def test_gridrec_roi_offset():
+    # A small ROI away from the center of a large object must not pick
+    # up the rest of the object wrapped around the reconstruction grid.
+    # The reference is cut from a reconstruction of a wider detector,
+    # which keeps the full image free of wrapped filter tails.
+    tomo, theta = synthetic_blobs(128)
+    full = gridrec(tomo, theta)
+    tomo, theta = synthetic_blobs(64)
+    rec = gridrec(
+        tomo, theta, num_gridx=12, num_gridy=12, xcoord=14, ycoord=-10)
+    err = np.abs(rec - full[:, 72:84, 48:60]).max() / full.max()
+    assert_equals(err < 0.04, True)
+
+
+def test_gridrec_accuracy():
+    tomo, theta = synthetic_blob()
+    ref = gridrec(tomo, theta)
+    assert_array_almost_equal(
+        gridrec(tomo, theta, accuracy='high'), ref, decimal=2)
+
+    # The fast preset works at half the sampling rate, so it is
+    # compared on a smooth object, also on odd and even grid sizes.
+    y, x = np.mgrid[0:64, 0:64]
+    obj = np.exp(-((x - 38.) ** 2 + (y - 28.) ** 2) / 50.)
+    obj = (obj + 0.5 * obj[::-1, :])[np.newaxis].astype('float32')
+    theta = angles(90)
+    tomo = project(obj, theta)
+    for nx, ny in ((None, None), (93, 94)):
+        ref = gridrec(tomo, theta, num_gridx=nx, num_gridy=ny)
+        rec = gridrec(tomo, theta, num_gridx=nx, num_gridy=ny,
+                      accuracy='fast')
+        assert_equals(rec.shape, ref.shape)
+        assert_equals(np.abs(rec - ref).max() < 0.04 * ref.max(), True)
+
+
+def test_gridrec_filter():
+    tomo, theta = synthetic_blob()
+    assert_array_almost_equal(
+        gridrec(tomo, theta, filter_name='custom', filter_par=[0., 0.5]),
+        gridrec(tomo, theta, filter_name='ramlak'))
+    assert_raises(
+        ValueError, gridrec, tomo, theta, filter_name='custom',
+        filter_par=[1.])
+    assert_array_almost_equal(
+        gridrec(tomo, theta, filter_name='butterworth',
+                filter_par=[100., 2.]),
+        gridrec(tomo, theta, filter_name='ramlak'))
+
+
+def test_gridrec_center():
+    tomo, theta = synthetic_blob()
+    rec = gridrec(tomo, theta, center=[12., 13.5])
+    assert_array_almost_equal(rec[0], gridrec(tomo, theta, center=12.)[0])
+    assert_array_almost_equal(rec[1], gridrec(tomo, theta, center=13.5)[1])
+    tomo = np.concatenate((tomo, tomo[:, 0:1]), axis=1)
+    rec = gridrec(tomo, theta, center=[12., 13.5, 11.])
+    assert_array_almost_equal(rec[2], gridrec(tomo, theta, center=11.)[2])
+
+
+def test_fbp():
+    tomo, theta = synthetic_blob()
+    rec = fbp(tomo, theta, filter_name='ramlak')
+    assert_array_almost_equal(rec[0], rec[1])
+    assert_array_almost_equal(
+        fbp(tomo, theta, center=[12., 13.], filter_name='ramlak')[0],
+        rec[0])
+    assert_equals(np.unravel_index(rec[0].argmax(), (24, 24)), (11, 12))
+
+
+def test_fbp_filter():
+    tomo, theta = synthetic_blob()
+    assert_array_almost_equal(
+        fbp(tomo, theta, filter_name='custom', filter_par=[0., 0.5]),
+        fbp(tomo, theta, filter_name='ramlak'))
+    assert_equals(
+        np.isnan(fbp(tomo, theta, filter_name='parzen')).sum(), 0)
+
+
+def test_hbp():
+    tomo, theta = synthetic_blob(xcoord=5.)
+    assert_array_almost_equal(
+        hbp(tomo, theta), fbp(tomo, theta), decimal=2)
+
+
+def test_hbp_shepp():
+    obj = downsample(shepp2d(), level=2, axis=1)
+    obj = downsample(obj, level=2, axis=2)
+    theta = angles(128)
+    tomo = project(obj, theta)
+    ref = fbp(tomo, theta)
+    rec = hbp(tomo, theta)
+    inside = ~get_circ_mask(ref.shape[1], ref.shape[2], 0.9)
+    err = rec[:, inside] - ref[:, inside]
+    rms = np.sqrt(np.mean(err ** 2) / np.mean(ref[:, inside] ** 2))
+    assert_equals(rms < 0.2, True)
+    assert_equals(np.abs(err).max() < 0.35 * np.abs(ref).max(), True)
+
+
+def test_recon_transmission():
+    tomo, theta = synthetic_blob()
+    trans = np.exp(-tomo).astype('float32')
+    orig = trans.copy()
+    assert_array_almost_equal(
+        fbp(trans, theta, emission=False), fbp(tomo, theta))
+    assert_array_almost_equal(trans, orig)
+
+
+def test_recon_cache():
+    tomo, theta = synthetic_blob()
+    tomo = tomo[:, 0:1]
+    set_recon_cache(0)
+    set_recon_cache()
+    rec = gridrec(tomo, theta, center=12.5)
+    assert_equals(len(_CACHE), 1)
+    rec[:] = 0
+    assert_array_almost_equal(
+        gridrec(tomo, theta, center=12.5),
+        gridrec(tomo, theta, center=[12.5, 12.5])[0:1])
+    assert_equals(len(_CACHE), 1)
+    # A repeated call returns a copy of the cached image.
+    cached = list(_CACHE.values())[0]
+    cached[:] = 7
+    assert_array_almost_equal(
+        gridrec(tomo, theta, center=12.5), np.full_like(rec, 7))
+    set_recon_cache(0)
+    assert_equals(len(_CACHE), 0)
+    assert_array_almost_equal(
+        gridrec(tomo, theta, center=12.5),
+        gridrec(tomo, theta, center=[12.5, 12.5])[0:1])
+    assert_equals(len(_CACHE), 0)
+    set_recon_cache()
+
+
 def test_mlem():
     tomo, theta = synthetic_tomo()
     assert_array_almost_equal(
@@ -274,6 +514,40 @@ def test_sirt():
         decimal=4)
 
 
+def test_recon_fov():
+    tomo, theta = synthetic_tomo()
+    for func in (art, mlem, pml_quad, sirt):
+        rec = func(tomo, theta, num_iter=2, ratio=1.)
+        assert_array_almost_equal(rec, circ_mask(rec.copy(), axis=0))
+        assert_equals(np.isnan(rec).sum(), 0)
+        assert_equals(rec.sum() > 0, True)
+        assert_raises(ValueError, func, tomo, theta, ratio=0.)
+
+
+def test_recon_fov_solver():
+    # Run the solvers without the final circ_mask: pixels outside of the
+    # field of view must keep their initial value, the others are updated.
+    tomo, theta = synthetic_tomo()
+    tomo = np.array(tomo, dtype='float32')
+    theta = np.array(theta, dtype='float32')
+    dx, dy, dz = tomo.shape
+    center = np.ones(dy, dtype='float32') * dz / 2.
+    inside = circ_mask(np.ones((1, dz, dz)), axis=0, ratio=1.)[0] > 0
+    reg_par = np.ones(10, dtype='float32')
+    for func, par in ((_art, ()), (_mlem, ()), (_sirt, ()),
+                      (_pml_quad, (reg_par,))):
+        for fov, nout in ((1., (~inside).sum()), (0., 0)):
+            init = 1e-6 * np.ones((dy, dz, dz), dtype='float32')
+            _init_shared(tomo)
+            rec = mp.distribute_jobs(
+                init, func=func,
+                args=(theta, center, dz, dz, 2) + par + (fov,),
+                axis=0, ncore=1)
+            assert_equals((rec[:, ~inside] == np.float32(1e-6)).sum(),
+                          dy * nout)
+            assert_equals((rec[:, inside] == np.float32(1e-6)).sum(), 0)
+
+
 def test_write_center():
     tomo, theta = synthetic_tomo()
     dpath = os.path.join('test', 'tmp')
@@ -285,6 +559,40 @@ def test_write_center():
     shutil.rmtree(dpath)
 
 
+def test_write_center_stack():
+    tomo, theta = synthetic_blob()
+    dpath = os.path.join('test', 'tmp')
+    write_center(tomo, theta, dpath, center=[11, 13, 0.5], fmt='stack')
+    with tifffile.TiffFile(os.path.join(dpath, 'center.tiff')) as tif:
+        assert_equals(len(tif.pages), 4)
+    assert_array_almost_equal(
+        np.loadtxt(os.path.join(dpath, 'center.txt')),
+        [11., 11.5, 12., 12.5])
+    shutil.rmtree(dpath)
+
+
+def test_write_center_hdf5():
+    tomo, theta = synthetic_blob()
+    dpath = os.path.join('test', 'tmp')
+    write_center(tomo, theta, dpath, center=[11, 13, 0.5], dtype='uint8',
+                 level=1, fmt='hdf5')
+    f = h5py.File(os.path.join(dpath, 'center.h5'), 'r')
+    assert_equals(f['data'].shape, (4, 12, 12))
+    assert_equals(f['data'].dtype, np.uint8)
+    assert_array_almost_equal(f['center'][:], [11., 11.5, 12., 12.5])
+    f.close()
+    shutil.rmtree(dpath)
+
+
+def test_write_center_invalid():
+    tomo, theta = synthetic_blob()
+    dpath = os.path.join('test', 'tmp')
+    assert_raises(ValueError, write_center, tomo, theta, dpath, fmt='png')
+    assert_raises(ValueError, write_center, tomo, theta, dpath,
+                  dtype='uint16')
+    assert_equals(os.path.exists(dpath), False)
+
+
 if __name__ == '__main__':
     import nose
     nose.runmodule(exit=False)
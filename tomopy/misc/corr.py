@@ -56,7 +56,7 @@ import numpy as np
 import ctypes
 import os
 import tomopy.misc.mproc as mp
-from scipy.ndimage import filters
+from collections import OrderedDict
 from tomopy.util import *
 import logging
 logger = logging.getLogger(__name__)
@@ -65,10 +65,92 @@ logger = logging.getLogger(__name__)
 __author__ = "Doga Gursoy"
 __copyright__ = "Copyright (c) 2015, UChicago Argonne, LLC."
 __docformat__ = 'restructuredtext en'
-__all__ = ['gaussian_filter',
+__all__ = ['circ_mask',
+           'gaussian_filter',
+           'get_circ_mask',
            'median_filter',
            'remove_nan',
-           'remove_neg']
+           'remove_neg',
+           'sanitize']
+
+
+LIB_TOMOPY = import_shared_lib('libtomopy')
+
+
+def circ_mask(arr, axis, ratio=1, val=0., center=None):
+    """
+    Apply circular mask in place to the images of a 3D array along
+    specified axis.
+
+    Parameters
+    ----------
+    arr : ndarray
+        Arbitrary 3D array.
+    axis : int
+        Axis along which the images are stacked.
+    ratio : float, optional
+        Ratio of the mask's diameter in pixels to the smallest edge
+        size of the images.
+    val : float, optional
+        Value for the masked region.
+    center : tuple of floats, optional
+        Row and column coordinates of the circle center. Defaults to
+        the center of the images.
+
+    Returns
+    -------
+    ndarray
+        Masked 3D array.
+    """
+    arr = np.swapaxes(arr, 0, axis)
+    dx, dy, dz = arr.shape
+    arr[:, get_circ_mask(dy, dz, ratio, center)] = val
+    return np.swapaxes(arr, 0, axis)
+
+
+_MASK = OrderedDict()
+
+
+def get_circ_mask(dy, dz, ratio=1, center=None):
+    """
+    Return the boolean image used by :func:`circ_mask`, which is True
+    outside of the circle.
+
+    Recent masks are cached, so the returned array is read-only.
+
+    Parameters
+    ----------
+    dy, dz : int
+        Number of rows and columns of the image.
+    ratio : float, optional
+        Ratio of the mask's diameter in pixels to the smallest edge
+        size of the image.
+    center : tuple of floats, optional
+        Row and column coordinates of the circle center. Defaults to
+        the center of the image.
+
+    Returns
+    -------
+    ndarray
+        2D boolean array of shape (dy, dz).
+    """
+    if center is None:
+        center = (dy / 2., dz / 2.)
+    key = (dy, dz, ratio, tuple(center))
+    if key in _MASK:
+        return _MASK[key]
+
+    rad = min(dy, dz) / 2.
+    y = np.arange(dy) - center[0]
+    x = np.arange(dz) - center[1]
+    mask = (x * x + y[:, np.newaxis] * y[:, np.newaxis] >
+            ratio * ratio * rad * rad)
+    mask.setflags(write=False)
+
+    _MASK[key] = mask
+    if len(_MASK) > 16:
+        _MASK.popitem(last=False)
+    return mask
 
 
 def gaussian_filter(arr, sigma, order=0, axis=0, ncore=None, nchunk=None):
@@ -91,7 +173,8 @@ def gaussian_filter(arr, sigma, order=0, axis=0, ncore=None, nchunk=None):
         derivatives of a Gaussian. Higher order derivatives are not
         implemented
     axis : int, optional
-        Axis along which median filtering is performed.
+        Axis along which median filtering is performed. If None, the
+        whole 3D array is filtered.
     ncore : int, optional
         Number of cores that will be assigned to jobs.
     nchunk : int, optional
@@ -102,29 +185,67 @@ def gaussian_filter(arr, sigma, order=0, axis=0, ncore=None, nchunk=None):
     ndarray
         3D array of same shape as input.
     """
-    arr = as_float32(arr)
-    arr = mp.distribute_jobs(
-        arr,
-        func=_gaussian_filter,
-        args=(sigma, order, axis),
-        axis=axis,
-        ncore=ncore,
-        nchunk=nchunk)
+    arr = np.array(as_float32(arr), order='C')
+    axes = [a for a in range(3) if a != axis]
+    sigma = np.broadcast_to(sigma, (len(axes), )).astype('float64')
+    order = np.broadcast_to(order, (len(axes), )).astype('int')
+
+    # One separable pass per filtered axis, in place.
+    for a, s, o in zip(axes, sigma, order):
+        if s <= 0:
+            continue
+        weights = _gaussian_kernel1d(s, o, int(4. * s + 0.5))[::-1]
+        weights = as_float32(weights.copy())
+        nouter = int(np.prod(arr.shape[:a]))
+        ninner = int(np.prod(arr.shape[a + 1:]))
+        if ninner > 1:
+            nunit = nouter * ((ninner - 1) // 64 + 1)
+        else:
+            nunit = (nouter - 1) // 64 + 1
+        mp.distribute_threads(
+            _correlate_axis,
+            args=(arr, nouter, arr.shape[a], ninner, weights, 64),
+            dims=nunit,
+            ncore=ncore,
+            nchunk=nchunk)
     return arr
 
 
-def _gaussian_filter(sigma, order, axis, istart, iend):
-    arr = mp.SHARED_ARRAY
-    for m in range(istart, iend):
-        if axis == 0:
-            arr[m, :, :] = filters.gaussian_filter(
-                arr[m, :, :], sigma, order)
-        elif axis == 1:
-            arr[:, m, :] = filters.gaussian_filter(
-                arr[:, m, :], sigma, order)
-        elif axis == 2:
-            arr[:, :, m] = filters.gaussian_filter(
-                arr[:, :, m], sigma, order)
+def _gaussian_kernel1d(sigma, order, radius):
+    """
+    Gaussian kernel of given order with 2 * radius + 1 weights. The
+    derivatives are the products of the Gaussian with polynomials.
+    """
+    sigma2 = sigma * sigma
+    x = np.arange(-radius, radius + 1)
+    phi = np.exp(-0.5 / sigma2 * x * x)
+    phi /= phi.sum()
+    if order == 0:
+        return phi
+
+    # Coefficients of the polynomial q with d/dx (q phi) = q' phi.
+    exponents = np.arange(order + 1)
+    q = np.zeros(order + 1)
+    q[0] = 1
+    deriv = np.diag(exponents[1:], 1) + np.diag(
+        np.ones(order) / -sigma2, -1)
+    for i in range(order):
+        q = deriv.dot(q)
+    return (x[:, np.newaxis] ** exponents).dot(q) * phi
+
+
+def _correlate_axis(arr, nouter, n, ninner, weights, nblock, istart, iend):
+    LIB_TOMOPY.correlate_axis.restype = as_c_void_p()
+    LIB_TOMOPY.correlate_axis(
+        as_c_float_p(arr),
+        as_c_int(nouter),
+        as_c_int(n),
+        as_c_int(ninner),
+        as_c_float_p(weights),
+        as_c_int(weights.size),
+        as_c_int(nblock),
+        as_c_int(istart),
+        as_c_int(iend))
 
 
 def median_filter(arr, size=3, axis=0, ncore=None, nchunk=None):
@@ -138,7 +259,8 @@ def median_filter(arr, size=3, axis=0, ncore=None, nchunk=None):
     size : int, optional
         The size of the filter.
     axis : int, optional
-        Axis along which median filtering is performed.
+        Axis along which median filtering is performed. If None, the
+        median is taken over a cube of the given size.
     ncore : int, optional
         Number of cores that will be assigned to jobs.
     nchunk : int, optional
@@ -149,32 +271,37 @@ def median_filter(arr, size=3, axis=0, ncore=None, nchunk=None):
     ndarray
         Median filtered 3D array.
     """
-    arr = as_float32(arr)
-    arr = mp.distribute_jobs(
-        arr,
-        func=_median_filter,
-        args=(size, axis),
-        axis=axis,
+    arr = np.ascontiguousarray(as_float32(arr))
+    box = [size] * 3
+    if axis is not None:
+        box[axis] = 1
+    out = np.empty_like(arr)
+    mp.distribute_threads(
+        _median_box,
+        args=(arr, box, out),
+        dims=arr.shape[0],
         ncore=ncore,
         nchunk=nchunk)
-    return arr
+    return out
 
 
-def _median_filter(size, axis, istart, iend):
-    arr = mp.SHARED_ARRAY
-    for m in range(istart, iend):
-        if axis == 0:
-            arr[m, :, :] = filters.median_filter(
-                arr[m, :, :], (size, size))
-        elif axis == 1:
-            arr[:, m, :] = filters.median_filter(
-                arr[:, m, :], (size, size))
-        elif axis == 2:
-            arr[:, :, m] = filters.median_filter(
-                arr[:, :, m], (size, size))
+def _median_box(arr, box, out, istart, iend):
+    dx, dy, dz = arr.shape
+    LIB_TOMOPY.median_box.restype = as_c_void_p()
+    LIB_TOMOPY.median_box(
+        as_c_float_p(arr),
+        as_c_int(dx),
+        as_c_int(dy),
+        as_c_int(dz),
+        as_c_int(box[0]),
+        as_c_int(box[1]),
+        as_c_int(box[2]),
+        as_c_float_p(out),
+        as_c_int(istart),
+        as_c_int(iend))
 
 
-def remove_nan(arr, val=0.):
+def remove_nan(arr, val=0., ncore=None):
     """
     Replace NaN values in array with a given value.
 
@@ -184,17 +311,21 @@ def remove_nan(arr, val=0.):
         Input data.
     val : float, optional
         Values to be replaced with NaN values in array.
+    ncore : int, optional
+        Number of cores that will be assigned to jobs.
 
     Returns
     -------
     ndarray
        Corrected array.
     """
-    arr[np.isnan(arr)] = val
-    return arr
+    if not _is_native(arr):
+        arr[np.isnan(arr)] = val
+        return arr
+    return sanitize(arr, val, inf=False, neg=False, ncore=ncore)[0]
 
 
-def remove_neg(arr, val=0.):
+def remove_neg(arr, val=0., ncore=None):
     """
     Replace negative values in array with a given value.
 
@@ -204,11 +335,90 @@ def remove_neg(arr, val=0.):
         Input array.
     val : float, optional
         Values to be replaced with negative values in array.
+    ncore : int, optional
+        Number of cores that will be assigned to jobs.
 
     Returns
     -------
     ndarray
        Corrected array.
     """
-    arr[arr < 0.0] = val
-    return arr
+    if not _is_native(arr):
+        arr[arr < 0.0] = val
+        return arr
+    return sanitize(
+        arr, val, nan=False, inf=False, neg=True, ncore=ncore)[0]
+
+
+def sanitize(arr, val=0., nan=True, inf=True, neg=True, cutoff=None,
+             ncore=None, nchunk=None):
+    """
+    Replace NaN, infinite and negative values with a given value and
+    clip values above a cutoff, in a single pass over the array.
+
+    Float32 arrays in C order are corrected in place.
+
+    Parameters
+    ----------
+    arr : ndarray
+        Input array.
+    val : float, optional
+        Value for the replaced NaN, infinite and negative values.
+    nan : bool, optional
+        If True, NaN values are replaced.
+    inf : bool, optional
+        If True, infinite values are replaced.
+    neg : bool, optional
+        If True, negative values are replaced.
+    cutoff : float, optional
+        Permitted maximum value. Larger values are set to the cutoff.
+    ncore : int, optional
+        Number of cores that will be assigned to jobs.
+    nchunk : int, optional
+        Chunk size for each core.
+
+    Returns
+    -------
+    ndarray
+        Corrected array.
+    dict
+        Numbers of replaced values with keys 'nan', 'inf', 'neg' and
+        'cutoff'.
+    """
+    arr = np.ascontiguousarray(as_float32(arr))
+    dx = arr.shape[0] if arr.ndim > 1 else 1
+    val2d = arr.reshape(dx, arr.size // max(dx, 1))
+    if cutoff is None:
+        cutoff = np.inf
+    counts = np.zeros((val2d.shape[0], 4), dtype='int32')
+    mp.distribute_threads(
+        _sanitize,
+        args=(val2d, val, nan, inf, neg, cutoff, counts),
+        dims=val2d.shape[0],
+        ncore=ncore,
+        nchunk=nchunk)
+    counts = counts.sum(axis=0, dtype='int64')
+    return arr, dict(zip(('nan', 'inf', 'neg', 'cutoff'),
+                         (int(c) for c in counts)))
+
+
+def _is_native(arr):
+    return (isinstance(arr, np.ndarray) and arr.dtype == np.float32 and
+            arr.flags.c_contiguous)
+
+
+def _sanitize(arr, val, nan, inf, neg, cutoff, counts, istart, iend):
+    dx, dy = arr.shape
+    LIB_TOMOPY.sanitize.restype = as_c_void_p()
+    LIB_TOMOPY.sanitize(
+        as_c_float_p(arr),
+        as_c_int(dx),
+        as_c_int(dy),
+        as_c_float(val),
+        as_c_int(nan),
+        as_c_int(inf),
+        as_c_int(neg),
+        as_c_float(cutoff),
+        as_c_int_p(counts),
+        as_c_int(istart),
+        as_c_int(iend))
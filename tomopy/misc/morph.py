@@ -63,6 +63,7 @@ __author__ = "Doga Gursoy"
 __copyright__ = "Copyright (c) 2015, UChicago Argonne, LLC."
 __docformat__ = 'restructuredtext en'
 __all__ = ['apply_pad',
+           'binning',
            'downsample',
            'upsample']
 
@@ -115,6 +116,80 @@ def _get_npad(dim, npad):
     return npad
 
 
+def binning(arr, factor=2, method='mean', out=None, ncore=None,
+            nchunk=None):
+    """
+    Bin a 3D array by integer factors along all axes in a single pass.
+
+    Trailing values along an axis that do not fill a bin are dropped.
+    As with the NumPy reductions, a bin holding a NaN is NaN with every
+    method.
+
+    Parameters
+    ----------
+    arr : ndarray
+        3D input array.
+    factor : int or sequence of ints, optional
+        Bin size along each axis, or a single size for all axes. A
+        size of 1 leaves the axis unchanged.
+    method : {'sum', 'mean', 'max'}, optional
+        Reduction applied to the values of each bin.
+    out : ndarray, optional
+        Float32 array in C order of the binned shape to write the
+        result into.
+    ncore : int, optional
+        Number of cores that will be assigned to jobs.
+    nchunk : int, optional
+        Chunk size for each core.
+
+    Returns
+    -------
+    ndarray
+        Binned 3D array.
+    """
+    arr = np.ascontiguousarray(as_float32(arr))
+    factor = [int(f) for f in np.broadcast_to(factor, (3, ))]
+    if min(factor) < 1:
+        raise ValueError('Bin sizes must be positive integers.')
+    methods = ['sum', 'mean', 'max']
+    if method not in methods:
+        raise ValueError('Unknown binning method: %s' % method)
+    shape = tuple(d // f for d, f in zip(arr.shape, factor))
+
+    if out is None:
+        out = np.empty(shape, dtype='float32')
+    elif (out.shape != shape or out.dtype != np.float32 or
+            not out.flags.c_contiguous):
+        raise ValueError(
+            'Output must be a float32 array in C order of shape %s.' %
+            (shape, ))
+
+    mp.distribute_threads(
+        _binning,
+        args=(arr, factor, methods.index(method), out),
+        dims=shape[0],
+        ncore=ncore,
+        nchunk=nchunk)
+    return out
+
+
+def _binning(arr, factor, method, out, istart, iend):
+    dx, dy, dz = arr.shape
+    LIB_TOMOPY.binning.restype = as_c_void_p()
+    LIB_TOMOPY.binning(
+        as_c_float_p(arr),
+        as_c_int(dx),
+        as_c_int(dy),
+        as_c_int(dz),
+        as_c_int(factor[0]),
+        as_c_int(factor[1]),
+        as_c_int(factor[2]),
+        as_c_int(method),
+        as_c_float_p(out),
+        as_c_int(istart),
+        as_c_int(iend))
+
+
 def downsample(arr, level=1, axis=2):
     """
     Downsample along specified axis of a 3D array.
@@ -133,20 +208,9 @@ def downsample(arr, level=1, axis=2):
     ndarray
         Downsampled 3D array.
     """
-    arr = as_float32(arr)
-    dx, dy, dz = arr.shape
-    out = _init_out(arr, axis, arr.shape[axis] / np.power(2, level))
-
-    LIB_TOMOPY.downsample.restype = as_c_void_p()
-    LIB_TOMOPY.downsample(
-        as_c_float_p(arr),
-        as_c_int(dx),
-        as_c_int(dy),
-        as_c_int(dz),
-        as_c_int(level),
-        as_c_int(axis),
-        as_c_float_p(out))
-    return out
+    factor = [1, 1, 1]
+    factor[axis] = np.power(2, level)
+    return binning(arr, factor, method='mean')
 
 
 def upsample(arr, level=1, axis=2):
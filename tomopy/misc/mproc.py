@@ -54,6 +54,7 @@ from __future__ import absolute_import, division, print_function
 
 import numpy as np
 import multiprocessing as mp
+from multiprocessing.pool import ThreadPool
 import ctypes
 from contextlib import closing
 
@@ -61,7 +62,8 @@ from contextlib import closing
 __author__ = "Doga Gursoy"
 __copyright__ = "Copyright (c) 2015, UChicago Argonne, LLC."
 __docformat__ = 'restructuredtext en'
-__all__ = ['distribute_jobs']
+__all__ = ['distribute_jobs',
+           'distribute_threads']
 
 
 def distribute_jobs(arr, func, args, axis, ncore=None, nchunk=None):
@@ -136,6 +138,52 @@ def distribute_jobs(arr, func, args, axis, ncore=None, nchunk=None):
     return shared_arr
 
 
+def distribute_threads(func, args, dims, ncore=None, nchunk=None):
+    """
+    Distribute a range of indices in chunks into threads.
+
+    No data is copied, so the function works on the arrays given in its
+    arguments. This suits C kernels, which release the GIL while they
+    run.
+
+    Parameters
+    ----------
+    func : func
+        Function to be parallelized.
+    args : list
+        Arguments of the function in a list.
+    dims : int
+        Number of indices to distribute.
+    ncore : int, optional
+        Number of threads that will be assigned to jobs.
+    nchunk : int, optional
+        Chunk size for each thread.
+    """
+    # Arrange number of threads.
+    if ncore is None:
+        ncore = mp.cpu_count()
+    ncore = max(min(ncore, dims), 1)
+
+    # Arrange chunk size.
+    if nchunk is None:
+        nchunk = (dims - 1) // ncore + 1
+    nchunk = max(nchunk, 1)
+
+    # Populate arguments for workers.
+    arg = []
+    for istart in range(0, dims, nchunk):
+        iend = min(istart + nchunk, dims)
+        arg.append([func] + list(args) + [istart, iend])
+
+    # Start threads.
+    pool = ThreadPool(ncore)
+    try:
+        pool.map(_arg_parser, arg)
+    finally:
+        pool.close()
+        pool.join()
+
+
 def _arg_parser(args):
     func = args[0]
     func(*args[1::])
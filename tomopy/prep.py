@@ -54,9 +54,11 @@ from __future__ import absolute_import, division, print_function
 
 import numpy as np
 import pywt
+from collections import OrderedDict
 import tomopy.misc.mproc as mp
 from tomopy.util import *
-from scipy.ndimage import filters
+from tomopy.misc.corr import get_circ_mask
+from scipy.linalg import cholesky_banded, cho_solve_banded
 import logging
 logger = logging.getLogger(__name__)
 
@@ -67,11 +69,14 @@ __docformat__ = 'restructuredtext en'
 __all__ = ['circular_roi',
            'correct_air',
            'focus_region',
+           'minus_log',
            'normalize',
+           'reduce_frames',
            'remove_stripe1',
            'remove_stripe2',
            'remove_zinger',
-           'retrieve_phase']
+           'retrieve_phase',
+           'retrieve_phase_multi']
 
 
 BOLTZMANN_CONSTANT = 1.3806488e-16  # [erg/k]
@@ -103,20 +108,10 @@ def circular_roi(tomo, ratio=1, val=None):
         Masked 3D tomographic data.
     """
     dx, dy, dz = tomo.shape
-    ind1 = dy
-    ind2 = dz
-    rad1 = ind1 / 2
-    rad2 = ind2 / 2
-    if dy < dz:
-        r2 = rad1 * rad1
-    else:
-        r2 = rad2 * rad2
-    y, x = np.ogrid[-rad1:rad1, -rad2:rad2]
-    mask = x * x + y * y > ratio * ratio * r2
+    mask = get_circ_mask(dy, dz, ratio)
     if val is None:
         val = np.mean(tomo[:, ~mask])
-    for m in np.arange(0, dx):
-        tomo[m, mask] = val
+    tomo[:, mask] = val
     return tomo
 
 
@@ -198,57 +193,149 @@ def focus_region(
     ndarray
         Modified 3D tomographic tomo.
     """
+    tomo = as_float32(tomo)
     dx, dy, dz = tomo.shape
     if center is None:
         center = dz / 2.
-    if pad:
-        roi = np.ones((dx, dy, dz), dtype='float32')
-    else:
-        roi = np.ones((dx, dy, dia), dtype='float32')
     rad = np.sqrt(xcoord * xcoord + ycoord * ycoord)
     alpha = np.arctan2(xcoord, ycoord)
     l1 = center - dia / 2
     l2 = center - dia / 2 + rad
     delphi = PI / dx
-    for m in np.arange(0, dx):
-        ind1 = np.ceil(np.cos(alpha - m * delphi) * (l2 - l1) + l1)
-        ind2 = np.floor(np.cos(alpha - m * delphi) * (l2 - l1) + l1 + dia)
-        if ind1 < 0:
-            ind1 = 0
-        if ind2 < 0:
-            ind2 = 0
-        if ind1 > dz:
-            ind1 = dz
-        if ind2 > dz:
-            ind2 = dz
-        arr = np.expand_dims(tomo[m, :, ind1:ind2], axis=0)
-        if pad:
-            if corr:
-                roi[m, :, ind1:ind2] = correct_air(arr.copy(), air=1)
-            else:
-                roi[m, :, ind1:ind2] = arr
-        else:
-            if corr:
-                roi[m, :, 0:(ind2 - ind1)] = correct_air(arr, air=1)
-            else:
-                roi[m, :, 0:(ind2 - ind1)] = arr
+
+    # Detector range of the ROI in each projection.
+    shift = np.cos(alpha - np.arange(dx) * delphi) * (l2 - l1) + l1
+    ind1 = np.clip(np.ceil(shift), 0, dz).astype('int')
+    ind2 = np.clip(np.floor(shift + dia), 0, dz).astype('int')
+
+    # Detector columns of the output taken from each projection.
+    if pad:
+        col = np.arange(dz) + np.zeros((dx, 1), dtype='int')
+    else:
+        col = np.arange(dia) + ind1[:, np.newaxis]
+    inside = (col >= ind1[:, np.newaxis]) & (col < ind2[:, np.newaxis])
+    col = np.where(inside, col, 0)
+    roi = tomo[np.arange(dx)[:, np.newaxis, np.newaxis],
+               np.arange(dy)[np.newaxis, :, np.newaxis],
+               col[:, np.newaxis, :]]
+
+    if corr:
+        # Air correction of each row with its end values in the ROI.
+        m = np.arange(dx)[:, np.newaxis]
+        n = np.arange(dy)
+        left = tomo[m, n, np.minimum(ind1, dz - 1)[:, np.newaxis]]
+        right = tomo[m, n, np.maximum(ind2 - 1, 0)[:, np.newaxis]]
+        left = np.where(left <= 0, 1, left)[:, :, np.newaxis]
+        right = np.where(right <= 0, 1, right)[:, :, np.newaxis]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            width = (ind2 - ind1 - 1)[:, np.newaxis, np.newaxis]
+            slope = (right - left) / width
+            pos = (col - ind1[:, np.newaxis])[:, np.newaxis, :]
+            roi = roi / (left + slope * pos)
+    roi = np.where(inside[:, np.newaxis, :], roi, 1).astype('float32')
     return roi
 
 
-def normalize(tomo, flat, dark, cutoff=None, ncore=None, nchunk=None):
+def minus_log(tomo, floor=None, out=None, ncore=None, nchunk=None):
+    """
+    Computation of the minus log of a given array.
+
+    Without ``out`` a float32 array in C order is overwritten with the
+    result, other arrays are converted first.
+
+    Parameters
+    ----------
+    tomo : ndarray
+        3D stack of projections.
+    floor : float, optional
+        Permitted minimum value before taking the logarithm. Smaller
+        values and NaNs are set to it, which keeps the result finite.
+    out : ndarray, optional
+        Float32 array in C order of the input shape to write the result
+        into, leaving the input unchanged.
+    ncore : int, optional
+        Number of cores that will be assigned to jobs.
+    nchunk : int, optional
+        Chunk size for each core.
+
+    Returns
+    -------
+    ndarray
+        Minus-log of the input data.
+    """
+    tomo = np.ascontiguousarray(as_float32(tomo))
+    floor = _get_bound(floor, -np.inf)
+
+    if out is None:
+        out = tomo
+    elif (out.shape != tomo.shape or out.dtype != np.float32 or
+            not out.flags.c_contiguous):
+        raise ValueError(
+            'Output must be a float32 array in C order of shape %s.' %
+            (tomo.shape, ))
+
+    mp.distribute_threads(
+        _minus_log,
+        args=(tomo, floor, out),
+        dims=tomo.shape[0],
+        ncore=ncore,
+        nchunk=nchunk)
+    return out
+
+
+def _minus_log(tomo, floor, out, istart, iend):
+    dx, dy, dz = tomo.shape
+
+    LIB_TOMOPY.minus_log.restype = as_c_void_p()
+    LIB_TOMOPY.minus_log(
+        as_c_float_p(tomo),
+        as_c_int(dx),
+        as_c_int(dy),
+        as_c_int(dz),
+        as_c_float(floor),
+        as_c_float_p(out),
+        as_c_int(istart),
+        as_c_int(iend))
+
+
+def normalize(
+        tomo, flat, dark, cutoff=None, minus_log=False, floor=None,
+        num_eigen=0, ncore=None, nchunk=None):
     """
     Normalize raw projection data using the flat and dark field projections.
 
+    The normalization, the clamping of the values and optionally the
+    minus log are done in a single pass over the data. A float32 array
+    in C order is overwritten with the result, other arrays are
+    converted first. The result of ``minus_log=True`` can be
+    reconstructed with ``emission=True``.
+
+    With ``num_eigen`` greater than zero a dynamic flat field is used
+    for each projection :cite:`Nieuwenhove:15`. The leading eigen flat
+    fields of the flat stack are found with a randomized SVD and their
+    weights for each projection are fitted by linear least squares
+    against the dark-subtracted projection.
+
     Parameters
     ----------
     tomo : ndarray
         3D tomographic data.
     flat : ndarray
-        3D flat field data.
+        3D flat field data, or a 2D flat field already reduced with
+        :func:`reduce_frames`.
     dark : ndarray
-        3D dark field data.
+        3D dark field data, or a 2D dark field already reduced with
+        :func:`reduce_frames`.
     cutoff : float, optional
         Permitted maximum vaue for the normalized data.
+    minus_log : bool, optional
+        If ``True``, return the minus log of the normalized data.
+    floor : float, optional
+        Permitted minimum value for the normalized data. Smaller values
+        and NaNs are set to it.
+    num_eigen : int, optional
+        Number of eigen flat fields of the dynamic flat-field correction.
+        Requires a 3D flat field.
     ncore : int, optional
         Number of cores that will be assigned to jobs.
     nchunk : int, optional
@@ -259,36 +346,182 @@ def normalize(tomo, flat, dark, cutoff=None, ncore=None, nchunk=None):
     ndarray
         Normalized 3D tomographic data.
     """
-    tomo = as_float32(tomo)
-    flat = as_float32(flat)
-    dark = as_float32(dark)
+    tomo = np.ascontiguousarray(as_float32(tomo))
+    cutoff = _get_bound(cutoff, np.inf)
+    floor = _get_bound(floor, -np.inf)
+
+    # Eigen flat fields for dynamic flat-field correction.
+    eigen = None
+    if num_eigen > 0:
+        eigen = _eigen_flats(flat, num_eigen)
 
     # Calculate average flat and dark fields for normalization.
-    flat = flat.mean(axis=0)
-    dark = dark.mean(axis=0)
+    if np.ndim(flat) == 3:
+        flat = reduce_frames(flat, ncore=ncore)
+    if np.ndim(dark) == 3:
+        dark = reduce_frames(dark, ncore=ncore)
+    flat = as_float32(flat)
+    dark = as_float32(dark)
 
-    arr = mp.distribute_jobs(
-        tomo,
-        func=_normalize,
-        args=(flat, dark, cutoff),
-        axis=0,
+    mp.distribute_threads(
+        _normalize,
+        args=(tomo, flat, dark, eigen, cutoff, minus_log, floor),
+        dims=tomo.shape[0],
         ncore=ncore,
         nchunk=nchunk)
-    return arr
+    return tomo
 
 
-def _normalize(flat, dark, cutoff, istart, iend):
-    tomo = mp.SHARED_ARRAY
+def _get_bound(val, default):
+    if val is None:
+        val = default
+    return as_float32(val)
+
+
+def _eigen_flats(flat, num_eigen, niter=2, seed=0):
+    """
+    Leading right singular vectors of the mean-subtracted flat stack,
+    found with a randomized SVD, as 3D array of eigen flat fields.
+    """
+    flat = as_float32(flat)
+    nflat, dy, dz = flat.shape
+    arr = (flat - flat.mean(axis=0)).reshape(nflat, -1)
+    num_eigen = min(num_eigen, nflat - 1)
+
+    # Range of the flats in pixel space with a few oversampled random
+    # directions and power iterations.
+    rng = np.random.RandomState(seed)
+    q = arr.T.dot(rng.standard_normal(
+        (nflat, min(nflat, num_eigen + 10))).astype('float32'))
+    for n in range(niter):
+        q = np.linalg.qr(q)[0]
+        q = arr.T.dot(arr.dot(q))
+    q = np.linalg.qr(q)[0]
+    vt = np.linalg.svd(arr.dot(q), full_matrices=False)[2]
+    eigen = q.dot(vt[:num_eigen].T).T
+    return np.ascontiguousarray(eigen.reshape(num_eigen, dy, dz))
+
+
+def _normalize(tomo, flat, dark, eigen, cutoff, minus_log, floor, istart,
+               iend):
+    if eigen is None:
+        _normalize_flat(tomo, flat, dark, cutoff, minus_log, floor,
+                        istart, iend)
+        return
+
+    # The dark-subtracted projections are fitted as a sum of the mean
+    # flat and the eigen flats. The eigen flat weights, relative to
+    # that of the mean flat, give the flat field of each projection.
+    neigen = eigen.shape[0]
+    base = np.concatenate(((flat - dark)[np.newaxis], eigen))
+    base = base.reshape(neigen + 1, -1)
+    proj = np.linalg.pinv(base.dot(base.T).astype('float64')).dot(base)
+    proj = proj.astype('float32')
+    for m0 in range(istart, iend, 64):
+        m1 = min(m0 + 64, iend)
+        w = (tomo[m0:m1] - dark).reshape(m1 - m0, -1).dot(proj.T)
+        w = w[:, 1:] / np.where(w[:, :1] > 0, w[:, :1], np.inf)
+        dflat = flat + np.tensordot(w, eigen, axes=1)
+        for m in range(m0, m1):
+            _normalize_flat(tomo, dflat[m - m0], dark, cutoff, minus_log,
+                            floor, m, m + 1)
+
+
+def _normalize_flat(tomo, flat, dark, cutoff, minus_log, floor, istart, iend):
+    dx, dy, dz = tomo.shape
+    flat = np.ascontiguousarray(flat, dtype='float32')
 
-    # Avoid zero division in normalization
-    denom = flat - dark
-    denom[denom == 0] = 1e-6
+    LIB_TOMOPY.normalize.restype = as_c_void_p()
+    LIB_TOMOPY.normalize(
+        as_c_float_p(tomo),
+        as_c_int(dx),
+        as_c_int(dy),
+        as_c_int(dz),
+        as_c_float_p(flat),
+        as_c_float_p(dark),
+        as_c_float(cutoff),
+        as_c_float(floor),
+        as_c_int(minus_log),
+        as_c_int(istart),
+        as_c_int(iend))
+
+
+def reduce_frames(
+        frames, method='mean', sigma=3., nrow=None, ncore=None, nchunk=None):
+    """
+    Reduce a stack of flat or dark field frames to a single frame.
+
+    The frames are read in blocks of detector rows, so only one block
+    is held in memory at a time and the frames can be given as an
+    HDF5 dataset that is read block by block. The rows of each block
+    are reduced in parallel.
+
+    Parameters
+    ----------
+    frames : ndarray or h5py.Dataset
+        3D stack of frames, indexed as [frame, row, column].
+    method : {'mean', 'median', 'clip'}, optional
+        Mean, median or sigma-clipped mean of the frames. The clipped
+        mean ignores values further than ``sigma`` robust standard
+        deviations from the median, such as zingers in single frames.
+    sigma : float, optional
+        Clipping threshold of the clipped mean.
+    nrow : int, optional
+        Number of detector rows read at a time. Blocks of about 256 MB
+        are used by default.
+    ncore : int, optional
+        Number of cores that will be assigned to jobs.
+    nchunk : int, optional
+        Chunk size for each core.
 
-    for m in range(istart, iend):
-        proj = np.divide(tomo[m, :, :] - dark, denom)
-        if cutoff is not None:
-            proj[proj > cutoff] = cutoff
-        tomo[m, :, :] = proj
+    Returns
+    -------
+    ndarray
+        2D reduced frame.
+    """
+    if method not in ('mean', 'median', 'clip'):
+        raise ValueError('Unknown reduction method: %s' % method)
+    if not hasattr(frames, 'shape'):
+        frames = np.asarray(frames)
+    dx, dy, dz = frames.shape
+
+    # In-memory means need no blocks and no float32 copy of the data.
+    if method == 'mean' and isinstance(frames, np.ndarray):
+        return np.mean(frames, axis=0, dtype='float32')
+
+    if nrow is None:
+        nrow = max(1, 2 ** 28 // (4 * dx * dz))
+    out = np.zeros((dy, dz), dtype='float32')
+    for r0 in range(0, dy, nrow):
+        block = as_float32(frames[:, r0:r0 + nrow, :])
+        block = mp.distribute_jobs(
+            block,
+            func=_reduce_frames,
+            args=(method, sigma),
+            axis=1,
+            ncore=ncore,
+            nchunk=nchunk)
+        out[r0:r0 + nrow] = block[0]
+    return out
+
+
+def _reduce_frames(method, sigma, istart, iend):
+    frames = mp.SHARED_ARRAY
+    block = frames[:, istart:iend, :]
+
+    # The result of each row is put into the first frame.
+    if method == 'mean':
+        frames[0, istart:iend, :] = block.mean(axis=0)
+    elif method == 'median':
+        frames[0, istart:iend, :] = np.median(block, axis=0)
+    elif method == 'clip':
+        med = np.median(block, axis=0)
+        dev = np.abs(block - med)
+        mad = 1.4826 * np.median(dev, axis=0)
+        keep = dev <= sigma * mad
+        num = keep.sum(axis=0)
+        frames[0, istart:iend, :] = np.where(
+            num > 0, (block * keep).sum(axis=0) / np.maximum(num, 1), med)
 
 
 def remove_stripe1(
@@ -339,43 +572,57 @@ def _remove_stripe1(level, wname, sigma, pad, istart, iend):
     dx, dy, dz = tomo.shape
     nx = dx
     if pad:
-        nx = dx + dx / 8
+        nx = dx + dx // 8
     xshift = int((nx - dx) / 2.)
-    sli = np.zeros((nx, dz), dtype='float32')
 
-    for m in range(istart, iend):
-        sli[xshift:dx + xshift, :] = tomo[:, m, :]
+    # Sinograms are transformed together in blocks of about 32 MB.
+    nblock = max(1, 2 ** 23 // (nx * dz))
+    damp = {}
+    for m0 in range(istart, iend, nblock):
+        m1 = min(m0 + nblock, iend)
+        sli = np.zeros((m1 - m0, nx, dz), dtype='float32')
+        sli[:, xshift:dx + xshift, :] = np.swapaxes(tomo[:, m0:m1, :], 0, 1)
 
         # Wavelet decomposition.
         cH = []
         cV = []
         cD = []
         for n in range(level):
-            sli, (cHt, cVt, cDt) = pywt.dwt2(sli, wname)
+            sli, (cHt, cVt, cDt) = pywt.dwt2(sli, wname, axes=(1, 2))
             cH.append(cHt)
             cV.append(cVt)
             cD.append(cDt)
 
-        # FFT transform of horizontal frequency bands.
+        # Damping of ring artifact information in the vertical bands,
+        # with real FFTs along the projection axis.
         for n in range(level):
-            # FFT
-            fcV = np.fft.fftshift(np.fft.fft(cV[n], axis=0))
-            my, mx = fcV.shape
-
-            # Damping of ring artifact information.
-            y_hat = (np.arange(-my, my, 2, dtype='float') + 1) / 2
-            damp = 1 - np.exp(-np.power(y_hat, 2) / (2 * np.power(sigma, 2)))
-            fcV = np.multiply(fcV, np.transpose(np.tile(damp, (mx, 1))))
-
-            # Inverse FFT.
-            cV[n] = np.real(np.fft.ifft(np.fft.ifftshift(fcV), axis=0))
+            my = cV[n].shape[1]
+            if my not in damp:
+                damp[my] = _stripe_damping(my, sigma)
+            fcV = np.fft.rfft(cV[n], axis=1)
+            fcV *= damp[my][:, np.newaxis]
+            cV[n] = np.fft.irfft(fcV, my, axis=1)
 
         # Wavelet reconstruction.
         for n in range(level)[::-1]:
-            sli = sli[0:cH[n].shape[0], 0:cH[n].shape[1]]
-            sli = pywt.idwt2((sli, (cH[n], cV[n], cD[n])), wname)
+            sli = sli[:, 0:cH[n].shape[1], 0:cH[n].shape[2]]
+            sli = pywt.idwt2((sli, (cH[n], cV[n], cD[n])), wname, axes=(1, 2))
 
-        tomo[:, m, :] = sli[xshift:dx + xshift, 0:dz]
+        tomo[:, m0:m1, :] = np.swapaxes(sli[:, xshift:dx + xshift, 0:dz], 0, 1)
+
+
+def _stripe_damping(my, sigma):
+    """
+    Damping filter of the vertical wavelet bands of length ``my`` for
+    the non-negative frequencies of a real FFT. Only the even part of
+    the filter acts on real data.
+    """
+    y_hat = (np.arange(-my, my, 2, dtype='float') + 1) / 2
+    damp = 1 - np.exp(-np.power(y_hat, 2) / (2 * np.power(sigma, 2)))
+
+    # Frequency k is at index k + my // 2 of the centered filter.
+    k = np.arange(my // 2 + 1)
+    return (damp[(k + my // 2) % my] + damp[(my // 2 - k) % my]) / 2
 
 
 def remove_stripe2(tomo, nblock=0, alpha=1.5, ncore=None, nchunk=None):
@@ -413,20 +660,24 @@ def remove_stripe2(tomo, nblock=0, alpha=1.5, ncore=None, nchunk=None):
 
 def _remove_stripe2(nblock, alpha, istart, iend):
     tomo = mp.SHARED_ARRAY
-    for m in range(istart, iend):
-        sino = tomo[:, m, :]
+    dx, dy, dz = tomo.shape
+
+    # Sinograms are corrected together in blocks of about 32 MB.
+    nsino = max(1, 2 ** 23 // (dx * dz))
+    for m0 in range(istart, iend, nsino):
+        m1 = min(m0 + nsino, iend)
+        sino = np.swapaxes(tomo[:, m0:m1, :], 0, 1)
         if (nblock == 0):
             d1 = _ring(sino, 1, 1)
             d2 = _ring(sino, 2, 1)
-            p = d1 * d2
-            d = np.sqrt(p + alpha * np.abs(p.min()))
         else:
-            size = int(sino.shape[0] / nblock)
+            size = int(dx / nblock)
             d1 = _ringb(sino, 1, 1, size)
             d2 = _ringb(sino, 2, 1, size)
-            p = d1 * d2
-            d = np.sqrt(p + alpha * np.fabs(p.min()))
-        tomo[:, m, :] = d
+        p = d1 * d2
+        pmin = p.min(axis=(1, 2), keepdims=True)
+        d = np.sqrt(p + alpha * np.abs(pmin))
+        tomo[:, m0:m1, :] = np.swapaxes(d, 0, 1)
 
 
 def _kernel(m, n):
@@ -440,93 +691,96 @@ def _kernel(m, n):
 
 
 def _ringMatXvec(h, x):
-    s = np.convolve(x, np.flipud(h))
-    u = s[np.size(h) - 1:np.size(x)]
-    y = np.convolve(u, h)
+    # Applies D^T D along the last axis, where D is the valid
+    # correlation with the kernel h.
+    nh = np.size(h)
+    nu = x.shape[-1] - nh + 1
+    y = np.zeros(x.shape)
+    if nu < 1:
+        return y
+    u = np.zeros(x.shape[:-1] + (nu, ))
+    for k in range(nh):
+        u += h[k] * x[..., k:k + nu]
+    for k in range(nh):
+        y[..., k:k + nu] += h[k] * u
     return y
 
 
-def _ringCGM(h, alpha, f):
-    x0 = np.zeros(np.size(f))
-    r = f - (_ringMatXvec(h, x0) + alpha * x0)
-    w = -r
-    z = _ringMatXvec(h, w) + alpha * w
-    a = np.dot(r, w) / np.dot(w, z)
-    x = x0 + np.dot(a, w)
-    B = 0
-    for i in range(1000000):
-        r = r - np.dot(a, z)
-        if (np.linalg.norm(r) < 0.0000001):
-            break
-        B = np.dot(r, z) / np.dot(w, z)
-        w = -r + np.dot(B, w)
-        z = _ringMatXvec(h, w) + alpha * w
-        a = np.dot(r, w) / np.dot(w, z)
-        x = x + np.dot(a, w)
+_RING_BAND = {}
+
+
+def _ringBand(h, R):
+    """
+    Upper band of D^T D for a detector row of length R, as used by
+    :func:`scipy.linalg.cholesky_banded`.
+    """
+    key = (R, tuple(h))
+    if key not in _RING_BAND:
+        nh = np.size(h)
+        i = np.arange(R)
+        band = np.zeros((nh, R))
+        for d in range(nh):
+            diag = np.zeros(R - d)
+            for k in range(nh - d):
+                row = i[:R - d] - k
+                valid = (row >= 0) & (row <= R - nh)
+                diag += h[k] * h[k + d] * valid
+            band[nh - 1 - d, d:] = diag
+        _RING_BAND[key] = band
+    return _RING_BAND[key]
+
+
+def _ringSolve(h, alpha, f):
+    # Solves (D^T D + alpha I) x = f for each row of f. Rows sharing
+    # the same alpha are solved with one factorization.
+    band = _ringBand(h, f.shape[-1])
+    x = np.zeros(f.shape)
+    for a in np.unique(alpha[np.isfinite(alpha)]):
+        ind = np.where(alpha == a)[0]
+        ab = band.copy()
+        ab[-1] += a
+        c = cholesky_banded(ab, lower=False)
+        x[ind] = cho_solve_banded((c, False), f[ind].T).T
     return x
 
 
 def _ring(sino, m, n):
-    mysino = np.transpose(sino)
-    R = np.size(mysino, 0)
-    N = np.size(mysino, 1)
-
     # Remove NaN.
-    pos = np.where(np.isnan(mysino) is True)
-    mysino[pos] = 0
+    mysino = np.where(np.isnan(sino), 0, sino)
 
     # Parameter.
-    alpha = 1 / (2 * (mysino.sum(0).max() - mysino.sum(0).min()))
+    total = mysino.sum(2)
+    with np.errstate(divide='ignore'):
+        alpha = 1 / (2 * (total.max(1) - total.min(1)))
 
     # Mathematical correction.
     pp = mysino.mean(1)
     h = _kernel(m, n)
     f = -_ringMatXvec(h, pp)
-    q = _ringCGM(h, alpha, f)
+    q = _ringSolve(h, alpha, f)
 
     # Update sinogram.
-    q.shape = (R, 1)
-    K = np.kron(q, np.ones((1, N)))
-    new = np.add(mysino, K)
-    newsino = new.astype(np.float32)
-    return np.transpose(newsino)
+    new = mysino + q[:, np.newaxis, :]
+    return new.astype(np.float32)
 
 
 def _ringb(sino, m, n, step):
-    mysino = np.transpose(sino)
-    R = np.size(mysino, 0)
-    N = np.size(mysino, 1)
-
-    # Remove NaN.
-    pos = np.where(np.isnan(mysino) is True)
-    mysino[pos] = 0
-
-    # Kernel & regularization parameter.
-    h = _kernel(m, n)
-
-    # Mathematical correction by blocks.
-    nblock = int(N / step)
-    new = np.ones((R, N))
+    # Mathematical correction by blocks of projections.
+    nblock = int(sino.shape[1] / step)
+    new = np.ones(sino.shape, dtype=np.float32)
     for k in range(0, nblock):
-        sino_block = mysino[:, k * step:(k + 1) * step]
-        alpha = 1 / (2 * (sino_block.sum(0).max() - sino_block.sum(0).min()))
-        pp = sino_block.mean(1)
-
-        f = -_ringMatXvec(h, pp)
-        q = _ringCGM(h, alpha, f)
+        new[:, k * step:(k + 1) * step] = _ring(
+            sino[:, k * step:(k + 1) * step], m, n)
+    return new
 
-        # Update sinogram.
-        q.shape = (R, 1)
-        K = np.kron(q, np.ones((1, step)))
-        new[:, k * step:(k + 1) * step] = np.add(sino_block, K)
-    newsino = new.astype(np.float32)
-    return np.transpose(newsino)
 
-
-def remove_zinger(tomo, dif, size=3, ncore=None, nchunk=None):
+def remove_zinger(tomo, dif, size=3, nproj=0, ncore=None, nchunk=None):
     """
     Remove high intensity bright spots from 3D tomographic data.
 
+    Values that exceed the median of the ``size`` x ``size`` window
+    around them by at least ``dif`` are replaced with that median.
+
     Parameters
     ----------
     tomo : ndarray
@@ -536,34 +790,50 @@ def remove_zinger(tomo, dif, size=3, ncore=None, nchunk=None):
         the median filtered raw measurement.
     size : int, optional
         Size of the median filter.
+    nproj : int, optional
+        Number of neighbouring projections on each side to compare
+        with. If positive, a value is only replaced if it also exceeds
+        the median of the same pixel over these projections by ``dif``,
+        so that features that persist in time are kept.
     ncore : int, optional
-        Number of cores that will be assigned to jobs.
+        Number of threads that will be assigned to jobs.
     nchunk : int, optional
-        Chunk size for each core.
+        Chunk size for each thread.
 
     Returns
     -------
     ndarray
         Corrected 3D tomographic data.
     """
-    arr = mp.distribute_jobs(
-        tomo,
-        func=_remove_zinger,
-        args=(dif, size),
-        axis=0,
+    tomo = np.ascontiguousarray(as_float32(tomo))
+    out = np.empty_like(tomo)
+
+    # The kernel reads the input and writes a separate output, so
+    # threads can share both arrays without copies.
+    mp.distribute_threads(
+        _remove_zinger,
+        args=(tomo, dif, size, nproj, out),
+        dims=tomo.shape[0],
         ncore=ncore,
         nchunk=nchunk)
-    return arr
+    return out
 
 
-def _remove_zinger(dif, size, istart, iend):
-    tomo = mp.SHARED_ARRAY
+def _remove_zinger(tomo, dif, size, nproj, out, istart, iend):
     dx, dy, dz = tomo.shape
-    mask = np.zeros((1, dy, dz))
-    for m in range(istart, iend):
-        tmp = filters.median_filter(tomo[m, :, :], (size, size))
-        mask = ((tomo[m, :, :] - tmp) >= dif).astype(int)
-        tomo[m, :, :] = tmp * mask + tomo[m, :, :] * (1 - mask)
+
+    LIB_TOMOPY.remove_zinger.restype = as_c_void_p()
+    LIB_TOMOPY.remove_zinger(
+        as_c_float_p(tomo),
+        as_c_int(dx),
+        as_c_int(dy),
+        as_c_int(dz),
+        as_c_float(dif),
+        as_c_int(size),
+        as_c_int(nproj),
+        as_c_float_p(out),
+        as_c_int(istart),
+        as_c_int(iend))
 
 
 def retrieve_phase(
@@ -597,90 +867,214 @@ def retrieve_phase(
     ndarray
         Approximated 3D tomographic phase data.
     """
-    # Compute the filter.
-    H, xshift, yshift, prj = _paganin_filter(
-        tomo, psize, dist, energy, alpha, pad)
+    return _retrieve_phase_stack(
+        [tomo], psize, [dist], energy, [alpha], pad, ncore, nchunk)[0]
+
+
+def retrieve_phase_multi(
+        tomo, psize=1e-4, dist=50, energy=20,
+        alpha=1e-3, pad=True, ncore=None, nchunk=None):
+    """
+    Perform single-step phase retrieval :cite:`Paganin:02` for several
+    propagation distances and regularization parameters at once.
+
+    Each projection is Fourier transformed once and all filters are
+    applied to the same transform. Measurements at several distances
+    are combined in Fourier space as the least-squares estimate of the
+    phase data that agrees with all of them.
+
+    Parameters
+    ----------
+    tomo : ndarray or list of ndarrays
+        3D tomographic data, or a sequence of 3D tomographic data
+        measured at each of the distances in ``dist``.
+    psize : float, optional
+        Detector pixel size in cm.
+    dist : float or sequence of floats, optional
+        Propagation distances of the wavefront in cm.
+    energy : float, optional
+        Energy of incident wave in keV.
+    alpha : float or sequence of floats, optional
+        Regularization parameters.
+    pad : bool, optional
+        If True, extend the size of the projections by padding.
+    ncore : int, optional
+        Number of cores that will be assigned to jobs.
+    nchunk : int, optional
+        Chunk size for each core.
+
+    Returns
+    -------
+    ndarray
+        Approximated 3D tomographic phase data for each regularization
+        parameter, stacked along the first axis.
+    """
+    dist = [float(d) for d in np.atleast_1d(dist)]
+    alpha = [float(a) for a in np.atleast_1d(alpha)]
+    if np.ndim(tomo[0]) == 2:
+        tomo = [tomo]
+    if len(tomo) != len(dist):
+        raise ValueError('Expected data for each of the %d distances, '
+                         'got %d.' % (len(dist), len(tomo)))
+    return _retrieve_phase_stack(
+        tomo, psize, dist, energy, alpha, pad, ncore, nchunk)
+
+
+def _retrieve_phase_stack(
+        tomo, psize, dist, energy, alpha, pad, ncore, nchunk):
+    ndist = len(dist)
+    nalpha = len(alpha)
+    dx, dy, dz = np.shape(tomo[0])
+    nx, ny = _paganin_shape(dy, dz, psize, max(dist), energy, pad)
+
+    # Data for each distance, with room for a result per alpha.
+    arr = np.zeros((max(ndist, nalpha), dx, dy, dz), dtype='float32')
+    val = []
+    for j in range(ndist):
+        arr[j] = tomo[j]
+        if pad:
+            val.append(float(np.mean(
+                (arr[j, :, :, 0] + arr[j, :, :, dz - 1]) / 2)))
+        else:
+            val.append(0.)
+
+    # The filters are computed and cached before the workers start, so
+    # that they inherit them instead of receiving a copy per job.
+    for d in dist:
+        for a in alpha:
+            _paganin_filter(nx, ny, psize, d, energy, a)
 
     arr = mp.distribute_jobs(
-        tomo,
+        arr,
         func=_retrieve_phase,
-        args=(H, xshift, yshift, prj, pad),
-        axis=0,
+        args=(nx, ny, psize, dist, energy, alpha, val),
+        axis=1,
         ncore=ncore,
         nchunk=nchunk)
-    return arr
+    return arr[:nalpha]
 
 
-def _retrieve_phase(H, xshift, yshift, prj, pad, istart, iend):
+def _retrieve_phase(nx, ny, psize, dist, energy, alpha, val, istart, iend):
     tomo = mp.SHARED_ARRAY
-    dx, dy, dz = tomo.shape
-    for m in range(istart, iend):
-        proj = tomo[m, :, :]
-        if pad:
-            prj[xshift:dy + xshift, yshift:dz + yshift] = proj
-            fproj = np.fft.fft2(prj)
-            filtproj = np.multiply(H, fproj)
-            tmp = np.real(np.fft.ifft2(filtproj)) / np.max(H)
-            proj = tmp[xshift:dy + xshift, yshift:dz + yshift]
-        elif not pad:
-            fproj = np.fft.fft2(proj)
-            filtproj = np.multiply(H, fproj)
-            proj = np.real(np.fft.ifft2(filtproj)) / np.max(H)
-        tomo[m, :, :] = proj
+    ndist = len(dist)
+    dx, dy, dz = tomo.shape[1:]
+    xshift = (nx - dy) // 2
+    yshift = (ny - dz) // 2
+    G = [_paganin_combine(nx, ny, psize, dist, energy, a) for a in alpha]
+
+    # Projections are filtered together in blocks of about 32 MB.
+    nblock = max(1, 2 ** 23 // (ndist * nx * ny))
+    for m0 in range(istart, iend, nblock):
+        m1 = min(m0 + nblock, iend)
+        fprj = []
+        for j in range(ndist):
+            prj = np.full((m1 - m0, nx, ny), val[j], dtype='float32')
+            prj[:, xshift:dy + xshift, yshift:dz + yshift] = tomo[j, m0:m1]
+            fprj.append(np.fft.rfft2(prj))
+        for n in range(len(alpha)):
+            f = G[n][0] * fprj[0]
+            for j in range(1, ndist):
+                f += G[n][j] * fprj[j]
+            prj = np.fft.irfft2(f, s=(nx, ny))
+            tomo[n, m0:m1] = prj[:, xshift:dy + xshift, yshift:dz + yshift]
+
+
+def _paganin_combine(nx, ny, psize, dist, energy, alpha):
+    """
+    Weights of the measurements at each distance in Fourier space.
+
+    The measurement at each distance is modelled as the phase data
+    divided by the Paganin filter of that distance, and the weights give
+    the least-squares estimate of the phase data. For a single distance
+    the weight is the filter itself.
+    """
+    H = [_paganin_filter(nx, ny, psize, d, energy, alpha) for d in dist]
+    if len(H) == 1:
+        return H
+    norm = sum(1 / np.square(h) for h in H)
+    return [1 / (h * norm) for h in H]
 
 
-def _paganin_filter(tomo, psize, dist, energy, alpha, pad):
+def _paganin_shape(dy, dz, psize, dist, energy, pad):
     """
-    Calculate Paganin-type 2D filter to be used for phase retrieval.
+    Size of the projections in Fourier space.
 
     Parameters
     ----------
-    tomo : ndarray
-        3D tomographic data.
+    dy, dz : int
+        Size of the projections.
     psize : float
         Detector pixel size in cm.
     dist : float
         Propagation distance of the wavefront in cm.
     energy : float
         Energy of incident wave in keV.
-    alpha : float
-        Regularization parameter.
     pad : bool
-        If True, extend the size of the projections by padding with zeros.
+        If True, extend the size of the projections by padding.
 
     Returns
     -------
-    ndarray
-        2D Paganin filter.
-    int
-        Pad amount in projection axis.
-    int
-        Pad amount in sinogram axis.
-    ndarray
-        Padded 2D projection image.
+    tuple
+        Padded size of the projections.
     """
-    dx, dy, dz = tomo.shape
+    if not pad:
+        return dy, dz
     wavelen = 2 * PI * PLANCK_CONSTANT * SPEED_OF_LIGHT / energy
+    padpix = int(np.ceil(PI * wavelen * dist / psize ** 2))
+    return _next_fast_len(dy + padpix), _next_fast_len(dz + padpix)
 
-    if pad:
-        # Find pad values.
-        val = np.mean((tomo[:, :, 0] + tomo[:, :, dz - 1]) / 2)
 
-        # Fourier pad in powers of 2.
-        padpix = np.ceil(PI * wavelen * dist / psize ** 2)
+def _next_fast_len(n):
+    """
+    Smallest length not less than n that factors into 2, 3 and 5.
+    """
+    best = 2 * n
+    p5 = 1
+    while p5 < best:
+        p35 = p5
+        while p35 < best:
+            p = p35
+            while p < n:
+                p *= 2
+            best = min(best, p)
+            p35 *= 3
+        p5 *= 5
+    return max(best, 1)
 
-        nx = pow(2, np.ceil(np.log2(dy + padpix)))
-        ny = pow(2, np.ceil(np.log2(dz + padpix)))
-        xshift = int((nx - dy) / 2.)
-        yshift = int((ny - dz) / 2.)
 
-        # Template pad image.
-        prj = val * np.ones((nx, ny), dtype='float32')
+_PAGANIN_FILTER = OrderedDict()
 
-    elif not pad:
-        nx, ny = dy, dz
-        xshift, yshift, prj = None, None, None
-        prj = np.ones((dy, dz), dtype='float32')
+
+def _paganin_filter(nx, ny, psize, dist, energy, alpha):
+    """
+    Calculate Paganin-type 2D filter to be used for phase retrieval.
+
+    The filter is normalized to a maximum of one and given for the
+    frequencies of a real 2D FFT. Recent filters are cached.
+
+    Parameters
+    ----------
+    nx, ny : int
+        Size of the projections in Fourier space.
+    psize : float
+        Detector pixel size in cm.
+    dist : float
+        Propagation distance of the wavefront in cm.
+    energy : float
+        Energy of incident wave in keV.
+    alpha : float
+        Regularization parameter.
+
+    Returns
+    -------
+    ndarray
+        2D Paganin filter.
+    """
+    key = (nx, ny, psize, dist, energy, alpha)
+    if key in _PAGANIN_FILTER:
+        return _PAGANIN_FILTER[key]
+
+    wavelen = 2 * PI * PLANCK_CONSTANT * SPEED_OF_LIGHT / energy
 
     # Sampling in reciprocal space.
     indx = (1 / ((nx - 1) * psize)) * np.arange(-(nx - 1) * 0.5, nx * 0.5)
@@ -690,5 +1084,13 @@ def _paganin_filter(tomo, psize, dist, energy, alpha, pad):
 
     # Filter in Fourier space.
     H = 1 / (wavelen * dist * w2 / (4 * PI) + alpha)
-    H = np.fft.fftshift(H)
-    return H, xshift, yshift, prj
+    H = np.fft.fftshift(H) / np.max(H)
+
+    # Only the even part of the filter acts on real projections.
+    H = (H + np.roll(np.roll(H[::-1, ::-1], 1, axis=0), 1, axis=1)) / 2
+    H = H[:, :ny // 2 + 1]
+
+    _PAGANIN_FILTER[key] = H
+    if len(_PAGANIN_FILTER) > 8:
+        _PAGANIN_FILTER.popitem(last=False)
+    return H
@@ -55,14 +55,20 @@ from __future__ import absolute_import, division, print_function
 from skimage import io as sio
 import warnings
 import numpy as np
-from scipy.optimize import minimize
 from scipy import ndimage
+import h5py
 import shutil
 import tomopy.misc.mproc as mp
 from tomopy.util import *
+from tomopy.misc.corr import circ_mask
+from tomopy.misc.morph import binning, downsample
+from tomopy.prep import minus_log
 import multiprocessing
+from multiprocessing.pool import ThreadPool
 import ctypes
 import os
+import hashlib
+from collections import OrderedDict
 import logging
 logger = logging.getLogger(__name__)
 
@@ -71,10 +77,13 @@ __author__ = "Doga Gursoy"
 __copyright__ = "Copyright (c) 2015, UChicago Argonne, LLC."
 __docformat__ = 'restructuredtext en'
 __all__ = ['find_center',
+           'find_center_pc',
+           'fit_center',
            'art',
            'bart',
            'fbp',
            'gridrec',
+           'hbp',
            'mlem',
            'osem',
            'ospml_hybrid',
@@ -82,6 +91,7 @@ __all__ = ['find_center',
            'pml_hybrid',
            'pml_quad',
            'sirt',
+           'set_recon_cache',
            'write_center']
 
 
@@ -97,9 +107,67 @@ def _init_shared(arr):
 LIB_TOMOPY = import_shared_lib('libtomopy')
 
 
+# Single-slice reconstructions, least recently used first.
+_CACHE = OrderedDict()
+_CACHE_NBYTES = 0
+_CACHE_MAXBYTES = 256 * 2 ** 20
+
+
+def set_recon_cache(maxbytes=256 * 2 ** 20):
+    """
+    Set the memory limit of the single-slice reconstruction cache.
+
+    Reconstructions of a single slice, as made by :func:`find_center`,
+    :func:`fit_center`, :func:`write_center` and :func:`gridrec` with a
+    single sinogram, are cached by the data, the center and the other
+    reconstruction parameters. Repeating one of them during interactive
+    tuning returns the cached image. The least recently used images are
+    dropped when the limit is exceeded.
+
+    Parameters
+    ----------
+    maxbytes : int, optional
+        Maximum memory held by the cached images in bytes. Zero disables
+        the cache and frees the cached images.
+    """
+    global _CACHE_MAXBYTES
+    _CACHE_MAXBYTES = int(maxbytes)
+    _cache_trim()
+
+
+def _cache_hash(arr):
+    return hashlib.sha1(np.ascontiguousarray(arr)).hexdigest()
+
+
+def _cache_get(key):
+    rec = _CACHE.pop(key, None)
+    if rec is not None:
+        _CACHE[key] = rec
+    return rec
+
+
+def _cache_put(key, rec):
+    global _CACHE_NBYTES
+    if rec.nbytes > _CACHE_MAXBYTES:
+        return
+    old = _CACHE.pop(key, None)
+    if old is not None:
+        _CACHE_NBYTES -= old.nbytes
+    _CACHE[key] = rec
+    _CACHE_NBYTES += rec.nbytes
+    _cache_trim()
+
+
+def _cache_trim():
+    global _CACHE_NBYTES
+    while _CACHE_NBYTES > _CACHE_MAXBYTES:
+        key, rec = _CACHE.popitem(last=False)
+        _CACHE_NBYTES -= rec.nbytes
+
+
 def art(tomo, theta, center=None, emission=True,
         recon=None, num_gridx=None, num_gridy=None, num_iter=1,
-        ncore=None, nchunk=None):
+        ratio=None, ncore=None, nchunk=None):
     """
     Reconstruct object from projection data using algebraic reconstruction
     technique (ART) :cite:`Kak:98`.
@@ -120,6 +188,10 @@ def art(tomo, theta, center=None, emission=True,
         Number of pixels along x- and y-axes in the reconstruction grid.
     num_iter : int, optional
         Number of algorithm iterations performed.
+    ratio : float, optional
+        If given, the ratio of the diameter of the circular field of
+        view to the smallest edge of the reconstructed image. Rays and
+        pixels outside of it are skipped and the pixels are set to zero.
     ncore : int, optional
         Number of cores that will be assigned to jobs.
     nchunk : int, optional
@@ -143,7 +215,7 @@ def art(tomo, theta, center=None, emission=True,
     if num_gridy is None:
         num_gridy = dz
     if emission is False:
-        tomo = -np.log(tomo)
+        tomo = _transmission_to_absorption(tomo, ncore)
     if recon is None:
         recon = 1e-6 * np.ones((dy, num_gridx, num_gridy), dtype='float32')
 
@@ -153,18 +225,21 @@ def art(tomo, theta, center=None, emission=True,
     num_gridy = as_int32(num_gridy)
     num_iter = as_int32(num_iter)
 
+    fov = _get_fov(ratio)
     _init_shared(tomo)
     arr = mp.distribute_jobs(
         recon,
         func=_art,
-        args=(theta, center, num_gridx, num_gridy, num_iter),
+        args=(theta, center, num_gridx, num_gridy, num_iter, fov),
         axis=0,
         ncore=ncore,
         nchunk=nchunk)
+    if ratio is not None:
+        arr = circ_mask(arr, axis=0, ratio=ratio)
     return arr
 
 
-def _art(theta, center, num_gridx, num_gridy, num_iter, istart, iend):
+def _art(theta, center, num_gridx, num_gridy, num_iter, fov, istart, iend):
     tomo = SHARED_TOMO
     recon = mp.SHARED_ARRAY
     dx, dy, dz = tomo.shape
@@ -181,6 +256,7 @@ def _art(theta, center, num_gridx, num_gridy, num_iter, istart, iend):
         as_c_int(num_gridx),
         as_c_int(num_gridy),
         as_c_int(num_iter),
+        as_c_float(fov),
         as_c_int(istart),
         as_c_int(iend))
 
@@ -189,7 +265,7 @@ def bart(
         tomo, theta, center=None, emission=True,
         recon=None, num_gridx=None, num_gridy=None, num_iter=1,
         num_block=1, ind_block=None,
-        ncore=None, nchunk=None):
+        ratio=None, ncore=None, nchunk=None):
     """
     Reconstruct object from projection data using block algebraic
     reconstruction technique (BART).
@@ -214,6 +290,10 @@ def bart(
         Number of data blocks for intermediate updating the object.
     ind_block : array of int, optional
         Order of projections to be used for updating.
+    ratio : float, optional
+        If given, the ratio of the diameter of the circular field of
+        view to the smallest edge of the reconstructed image. Rays and
+        pixels outside of it are skipped and the pixels are set to zero.
     ncore : int, optional
         Number of cores that will be assigned to jobs.
     nchunk : int, optional
@@ -237,7 +317,7 @@ def bart(
     if num_gridy is None:
         num_gridy = dz
     if emission is False:
-        tomo = -np.log(tomo)
+        tomo = _transmission_to_absorption(tomo, ncore)
     if recon is None:
         recon = 1e-6 * np.ones((dy, num_gridx, num_gridy), dtype='float32')
     if ind_block is None:
@@ -251,21 +331,24 @@ def bart(
     num_block = as_int32(num_block)
     ind_block = as_float32(ind_block)
 
+    fov = _get_fov(ratio)
     _init_shared(tomo)
     arr = mp.distribute_jobs(
         recon,
         func=_bart,
         args=(theta, center, num_gridx, num_gridy,
-              num_iter, num_block, ind_block),
+              num_iter, num_block, ind_block, fov),
         axis=0,
         ncore=ncore,
         nchunk=nchunk)
+    if ratio is not None:
+        arr = circ_mask(arr, axis=0, ratio=ratio)
     return arr
 
 
 def _bart(
         theta, center, num_gridx, num_gridy,
-        num_iter, num_block, ind_block, istart, iend):
+        num_iter, num_block, ind_block, fov, istart, iend):
     tomo = SHARED_TOMO
     recon = mp.SHARED_ARRAY
     dx, dy, dz = tomo.shape
@@ -284,6 +367,7 @@ def _bart(
         as_c_int(num_iter),
         as_c_int(num_block),
         as_c_float_p(ind_block),
+        as_c_float(fov),
         as_c_int(istart),
         as_c_int(iend))
 
@@ -291,14 +375,15 @@ def _bart(
 def fbp(
         tomo, theta, center=None, emission=True,
         num_gridx=None, num_gridy=None, filter_name='shepp',
-        ncore=None, nchunk=None):
+        filter_par=None, ncore=None, nchunk=None):
     """
     Reconstruct object from projection data using filtered back
     projection (FBP).
 
-    Warning
-    -------
-    Filter not implemented yet.
+    The projections are filtered in the Fourier domain and
+    back-projected pixel by pixel with linear interpolation between
+    detector pixels. Slices with the same rotation center are
+    back-projected together.
 
     Parameters
     ----------
@@ -314,6 +399,15 @@ def fbp(
         Number of pixels along x- and y-axes in the reconstruction grid.
     filter_name : str, optional
         Filter name for weighting. 'shepp', 'hann', 'hamming', 'ramlak',
+        'cosine', 'parzen', 'butterworth', 'custom' or 'none'.
+    filter_par : list, optional
+        Filter parameters. For 'parzen' the cutoff frequency, and for
+        'butterworth' the cutoff frequency and the order, with
+        frequencies in cycles per detector pixel (0.5 is the Nyquist
+        frequency). Defaults are a cutoff of 0.5 and an order of 2.
+        For 'custom' the filter values sampled uniformly from zero to
+        the Nyquist frequency, which are interpolated to the frequencies
+        of the padded projections.
     ncore : int, optional
         Number of cores that will be assigned to jobs.
     nchunk : int, optional
@@ -337,8 +431,9 @@ def fbp(
     if num_gridy is None:
         num_gridy = dz
     if emission is False:
-        tomo = -np.log(tomo)
+        tomo = _transmission_to_absorption(tomo, ncore)
     recon = 1e-6 * np.ones((dy, num_gridx, num_gridy), dtype='float32')
+    filter_par = _get_filter_par(filter_name, filter_par)
     filter_name = np.array(filter_name, dtype=(str, 16))
 
     center = as_float32(center)
@@ -349,14 +444,42 @@ def fbp(
     arr = mp.distribute_jobs(
         recon,
         func=_fbp,
-        args=(theta, center, num_gridx, num_gridy, filter_name),
+        args=(theta, center, num_gridx, num_gridy, filter_name,
+              filter_par),
         axis=0,
         ncore=ncore,
         nchunk=nchunk)
     return arr
 
 
-def _fbp(theta, center, num_gridx, num_gridy, filter_name, istart, iend):
+def _transmission_to_absorption(tomo, ncore):
+    # Minus log into a new array in one pass, keeping the input intact.
+    return minus_log(
+        tomo, out=np.empty(np.shape(tomo), dtype='float32'), ncore=ncore)
+
+
+def _get_fov(ratio):
+    # The solvers take a non-positive field of view as the whole grid.
+    if ratio is None:
+        return 0.
+    if ratio <= 0:
+        raise ValueError('The field of view ratio must be positive.')
+    return float(ratio)
+
+
+def _get_filter_par(filter_name, filter_par):
+    if filter_par is None:
+        filter_par = []
+    filter_par = as_float32(filter_par).ravel()
+    if filter_name == 'custom' and filter_par.size < 2:
+        raise ValueError(
+            'A custom filter needs at least two samples in filter_par.')
+    return filter_par
+
+
+def _fbp(
+        theta, center, num_gridx, num_gridy, filter_name, filter_par,
+        istart, iend):
     tomo = SHARED_TOMO
     recon = mp.SHARED_ARRAY
     dx, dy, dz = tomo.shape
@@ -373,20 +496,32 @@ def _fbp(theta, center, num_gridx, num_gridy, filter_name, istart, iend):
         as_c_int(num_gridx),
         as_c_int(num_gridy),
         as_c_char_p(filter_name),
+        as_c_float_p(filter_par),
+        as_c_int(filter_par.size),
         as_c_int(istart),
         as_c_int(iend))
 
 
 def find_center(
         tomo, theta, ind=None, emission=True, init=None,
-        tol=0.5, mask=True, ratio=1.):
+        tol=0.5, mask=True, ratio=1., smin=-20., smax=20., step=1.,
+        level=0, ncore=None, nchunk=None):
     """
     Find rotation axis location.
 
     The function exploits systematic artifacts in reconstructed images
     due to shifts in the rotation center. It uses image entropy
-    as the error metric and ''Nelder-Mead'' routine (of the scipy
-    optimization module) as the optimizer :cite:`Donath:06`.
+    as the error metric :cite:`Donath:06`. The best of the candidate
+    centers on a coarse grid around ``init`` is refined by repeatedly
+    halving the search bracket. The candidates of each step are
+    reconstructed in a single batched gridrec call.
+
+    With ``level`` greater than zero the search becomes multiscale and
+    runs once per level. It starts with the coarse grid on a copy of
+    the sinogram binned by ``2**level`` along the detector, using
+    every ``2**level``-th projection. Each finer level skips the coarse
+    grid and only halves a bracket of one binned pixel around the
+    previous estimate, down to the full resolution data.
 
     Parameters
     ----------
@@ -408,6 +543,16 @@ def find_center(
     ratio : float, optional
         The ratio of the radius of the circular mask to the edge of the
         reconstructed image.
+    smin, smax : float, optional
+        Range of the coarse search relative to ``init``.
+    step : float, optional
+        Step of the coarse search.
+    level : int, optional
+        Number of coarser levels of the multiscale search.
+    ncore : int, optional
+        Number of cores that will be assigned to jobs.
+    nchunk : int, optional
+        Chunk size for each core.
 
     Returns
     -------
@@ -419,71 +564,308 @@ def find_center(
 
     dx, dy, dz = tomo.shape
     if ind is None:
-        ind = dy / 2
+        ind = dy // 2
     if init is None:
         init = dz / 2
 
+    sino = tomo[:, ind:ind + 1, :]
+    if emission is False:
+        sino = _transmission_to_absorption(sino, ncore)
+
+    # Multiscale search from the coarsest level down. Binned pixel k
+    # covers the pixels from k * b to k * b + b - 1.
+    for lev in range(level, 0, -1):
+        b = 2 ** lev
+        _sino = np.ascontiguousarray(sino[::b, :, :dz - dz % b])
+        _sino = downsample(_sino, level=lev, axis=2)
+        init = b * _find_center_entropy(
+            _sino, theta[::b], (init - (b - 1) / 2.) / b, 0.5, mask,
+            ratio, smin / b, smax / b, step, ncore, nchunk)[0] + (b - 1) / 2.
+
+        # The finer levels only refine within a bracket of one binned
+        # pixel on each side of the estimate.
+        smin, smax, step = -b / 2., b / 2., None
+
+    return _find_center_entropy(
+        sino, theta, init, tol, mask, ratio, smin, smax, step,
+        ncore, nchunk)[0]
+
+
+def _find_center_entropy(
+        sino, theta, init, tol, mask, ratio, smin, smax, step,
+        ncore, nchunk):
+    """
+    Entropy based center search on each slice of a sinogram stack.
+    All slices are searched together, so that every gridrec call
+    reconstructs one candidate center for each slice. Without a
+    ``step`` the coarse search is skipped and the refinement starts
+    from the bracket given by ``smin`` and ``smax``.
+    """
+    dx, ns, dz = sino.shape
+    init = np.ones(ns) * init
+
     # Make an initial reconstruction to adjust histogram limits.
-    rec = gridrec(tomo[:, ind:ind + 1, :], theta, emission=emission)
+    rec = np.zeros((ns, dz, dz), dtype='float32')
+    for m in range(ns):
+        rec[m] = _sweep_center(
+            sino[:, m, :], theta, init[m:m + 1], ncore=ncore,
+            nchunk=nchunk)[0]
 
     # Apply circular mask.
     if mask is True:
-        rec = _circ_mask(dz / 2, rec, ratio)
+        rec = circ_mask(rec, axis=0, ratio=ratio)
 
     # Adjust histogram boundaries according to reconstruction.
-    hmin = np.min(rec)
-    if hmin < 0:
-        hmin = 2 * hmin
-    elif hmin >= 0:
-        hmin = 0.5 * hmin
-    hmax = np.max(rec)
-    if hmax < 0:
-        hmax = 0.5 * hmax
-    elif hmax >= 0:
-        hmax = 2 * hmax
-
-    # Magic is ready to happen...
-    res = minimize(
-        _find_center_cost, init,
-        args=(tomo, rec, theta, ind, hmin, hmax, mask, ratio, emission),
-        method='Nelder-Mead',
-        tol=tol)
-    return res.x
-
-
-def _circ_mask(rad, rec, ratio):
-    y, x = np.ogrid[-rad:rad, -rad:rad]
-    msk = x * x + y * y > ratio * ratio * rad * rad
-    rec[0, msk] = 0.
-    return rec
+    hmin = np.min(rec, axis=(1, 2))
+    hmin = np.where(hmin < 0, 2 * hmin, 0.5 * hmin)
+    hmax = np.max(rec, axis=(1, 2))
+    hmax = np.where(hmax < 0, 0.5 * hmax, 2 * hmax)
+
+    args = (sino, theta, hmin, hmax, mask, ratio, ncore, nchunk)
+
+    # Coarse search over all candidates at once.
+    if step is None:
+        best = init + (smin + smax) / 2.
+        half = np.ones(ns) * (smax - smin) / 2.
+        fbest = _find_center_cost(best[np.newaxis], *args)[0]
+    else:
+        cen = init + np.arange(smin, smax + step / 2., step)[:, np.newaxis]
+        cost = _find_center_cost(cen, *args)
+        k = np.argmin(cost, axis=0)
+        best = cen[k, np.arange(ns)]
+        fbest = cost[k, np.arange(ns)]
+        half = np.ones(ns) * step
+
+    # Refine by halving the bracket around the best candidate. The
+    # two new points of each step are reconstructed together.
+    while np.max(2 * half) > tol:
+        half = half / 2.
+        cen = np.array([best - half, best, best + half])
+        cost = _find_center_cost(cen[0::2], *args)
+        cost = np.array([cost[0], fbest, cost[1]])
+        k = np.argmin(cost, axis=0)
+        best = cen[k, np.arange(ns)]
+        fbest = cost[k, np.arange(ns)]
+    return best
 
 
 def _find_center_cost(
-        center, tomo, rec, theta, ind, hmin, hmax, mask, ratio, emission):
+        center, sino, theta, hmin, hmax, mask, ratio, ncore, nchunk):
     """
-    Cost function used for the ``find_center`` routine.
+    Cost function used for the ``find_center`` routine. Each slice of
+    the sinogram stack is reconstructed once for each row of given
+    centers and the entropies of the reconstructions are returned.
+    """
+    center = as_float32(center)
+    cost = np.zeros(center.shape, dtype='float32')
+    for m in range(sino.shape[1]):
+        rec = _sweep_center(
+            sino[:, m, :], theta, center[:, m], ncore=ncore, nchunk=nchunk)
+
+        # Apply circular mask.
+        if mask is True:
+            rec = circ_mask(rec, axis=0, ratio=ratio)
+        cost[:, m] = _entropy(
+            rec, np.tile(hmin[m], center.shape[0]),
+            np.tile(hmax[m], center.shape[0]))
+    return cost
+
+
+def _entropy(rec, hmin, hmax, nbins=64):
+    rec = as_float32(rec)
+    hmin = as_float32(hmin)
+    hmax = as_float32(hmax)
+    dy, ngridx, ngridy = rec.shape
+    ent = np.zeros(dy, dtype='float32')
+
+    LIB_TOMOPY.image_entropy.restype = as_c_void_p()
+    LIB_TOMOPY.image_entropy(
+        as_c_float_p(rec),
+        as_c_int(dy),
+        as_c_int(ngridx),
+        as_c_int(ngridy),
+        as_c_float_p(hmin),
+        as_c_float_p(hmax),
+        as_c_int(nbins),
+        as_c_float_p(ent),
+        as_c_int(0),
+        as_c_int(dy))
+    return ent
+
+
+def find_center_pc(tomo, theta, ind=None, tol=None):
     """
-    print('Trying center: ', center)
-    center = np.array(center, dtype='float32')
-    rec = gridrec(tomo[:, ind:ind + 1, :], theta, center, emission)
+    Find rotation axis location by registering the first projection
+    with the mirror image of the projection acquired 180 degrees later.
+
+    The two projections are cross-correlated row by row with FFTs, so
+    all slices are handled at once without any reconstruction. The
+    correlation peak is located to sub-pixel accuracy by a parabolic
+    fit. Both 0-180 and 0-360 degree scans are supported as long as a
+    projection at 180 degrees from the first one exists.
+
+    Parameters
+    ----------
+    tomo : ndarray
+        3D tomographic data.
+    theta : array
+        Projection angles in radian.
+    ind : int or array of int, optional
+        Indices of the slices to be used. All slices by default.
+    tol : float, optional
+        Largest accepted deviation in radian of the opposite
+        projection from 180 degrees. Half of the mean angular step by
+        default.
+
+    Returns
+    -------
+    ndarray
+        Rotation axis location for each selected slice.
+    """
+    tomo = as_float32(tomo)
+    theta = np.array(theta, dtype='float64')
+
+    dx, dy, dz = tomo.shape
+    if ind is None:
+        ind = np.arange(dy)
+    ind = np.atleast_1d(ind)
+    if tol is None:
+        tol = 0.5 * np.pi / max(dx - 1, 1)
+
+    # Projection closest to 180 degrees from the first one.
+    dev = np.abs(np.mod(theta - theta[0], 2 * np.pi) - np.pi)
+    opp = np.argmin(dev)
+    if dev[opp] > tol:
+        logger.warning(
+            'No projection at 180 degrees from the first one. '
+            'Closest is off by %.3g radian.', dev[opp])
+
+    # Zero-padded cross-correlation of the mean-subtracted rows.
+    prj0 = tomo[0, ind, :]
+    prj1 = tomo[opp, ind, ::-1]
+    prj0 = prj0 - prj0.mean(axis=1)[:, np.newaxis]
+    prj1 = prj1 - prj1.mean(axis=1)[:, np.newaxis]
+    n = 2 * dz
+    corr = np.fft.irfft(
+        np.fft.rfft(prj1, n) * np.conj(np.fft.rfft(prj0, n)), n)
+
+    # Parabolic fit around the peak.
+    row = np.arange(ind.size)
+    peak = np.argmax(corr, axis=1)
+    c0 = corr[row, peak]
+    cm = corr[row, peak - 1]
+    cp = corr[row, (peak + 1) % n]
+    den = cm - 2 * c0 + cp
+    den[den == 0] = -1
+    shift = peak + 0.5 * (cm - cp) / den
+    shift[shift > n / 2] -= n
+
+    # The mirrored projection is shifted by dz-1-2*center.
+    return (dz - 1 - shift) / 2.
+
+
+def fit_center(
+        tomo, theta, ind=None, num_slice=8, deg=1, method='pc',
+        emission=True, init=None, tol=0.5, ncore=None, nchunk=None):
+    """
+    Estimate the rotation axis location for every slice.
+
+    The center is found on a sparse subset of slices and a polynomial
+    in the slice index is fitted to these estimates, which also
+    captures a tilted rotation axis. Slices that deviate from the fit
+    by more than three robust standard deviations are rejected and the
+    fit is repeated.
+
+    Parameters
+    ----------
+    tomo : ndarray
+        3D tomographic data.
+    theta : array
+        Projection angles in radian.
+    ind : array of int, optional
+        Indices of the slices used for the estimation. By default
+        ``num_slice`` slices evenly spread over the detector height.
+    num_slice : int, optional
+        Number of slices used for the estimation.
+    deg : int, optional
+        Degree of the fitted polynomial.
+    method : str, optional
+        'pc' registers opposite projections with :func:`find_center_pc`
+        and 'entropy' runs the search of :func:`find_center` on all
+        selected slices together.
+    emission : bool, optional
+        Determines whether data is emission or transmission type.
+        Only used by the 'entropy' method.
+    init : float, optional
+        Initial guess for the center. Only used by the 'entropy'
+        method.
+    tol : scalar, optional
+        Desired sub-pixel accuracy. Deviations from the fit below this
+        value are never rejected.
+    ncore : int, optional
+        Number of cores that will be assigned to jobs.
+    nchunk : int, optional
+        Chunk size for each core.
+
+    Returns
+    -------
+    ndarray
+        Rotation axis location for each slice.
+    """
+    tomo = as_float32(tomo)
+    theta = as_float32(theta)
+
+    dx, dy, dz = tomo.shape
+    if ind is None:
+        ind = np.unique(np.round(np.linspace(0, dy - 1, num_slice)))
+    ind = np.atleast_1d(ind).astype('int')
+
+    if method == 'entropy':
+        if init is None:
+            init = dz / 2
+        sino = tomo[:, ind, :]
+        if emission is False:
+            sino = _transmission_to_absorption(sino, ncore)
+        cen = _find_center_entropy(
+            sino, theta, init, tol, True, 1., -20., 20., 1.,
+            ncore, nchunk)
+    else:
+        cen = find_center_pc(tomo, theta, ind)
+    return _fit_center(ind, cen, dy, deg, tol)
 
-    # Apply circular mask.
-    if mask is True:
-        rec = _circ_mask(dz / 2, rec, ratio)
 
-    hist, e = np.histogram(rec, bins=64, range=[hmin, hmax])
-    hist = hist.astype('float32') / rec.size + 1e-12
-    return -np.dot(hist, np.log2(hist))
+def _fit_center(ind, cen, dy, deg, tol, nsigma=3., num_iter=5):
+    deg = min(deg, ind.size - 1)
+    keep = np.ones(ind.size, dtype='bool')
+    for m in range(num_iter):
+        coef = np.polyfit(ind[keep], cen[keep], deg)
+        res = np.abs(cen - np.polyval(coef, ind))
+
+        # Robust estimate of the standard deviation.
+        sigma = 1.4826 * np.median(res[keep])
+        new = res <= max(nsigma * sigma, tol)
+        if new.sum() <= deg or np.array_equal(new, keep):
+            break
+        keep = new
+    return np.polyval(coef, np.arange(dy)).astype('float32')
 
 
 def gridrec(
         tomo, theta, center=None, emission=True,
         num_gridx=None, num_gridy=None, filter_name='shepp',
+        filter_par=None, xcoord=0., ycoord=0., zoom=1., accuracy='normal',
         ncore=None, nchunk=None):
     """
     Reconstruct object from projection data using gridrec algorithm
     :cite:`Dowd:99`.
 
+    A region of interest (ROI) can be reconstructed by giving the
+    location of its center with ``xcoord`` and ``ycoord`` and its size
+    with ``num_gridx`` and ``num_gridy``. The ROI matches the same region
+    of the full reconstruction. Its frequency grid still spans the whole
+    slice, so that the object outside the ROI does not wrap into it, but
+    only the ROI is corrected and copied out.
+
     Parameters
     ----------
     tomo : ndarray
@@ -498,7 +880,30 @@ def gridrec(
         Number of pixels along x- and y-axes in the reconstruction grid.
     filter_name : str, optional
         Filter name for weighting. 'shepp', 'hann', 'hamming', 'ramlak',
-        'cosine' or 'none'.
+        'cosine', 'parzen', 'butterworth', 'custom' or 'none'.
+    filter_par : list, optional
+        Filter parameters. For 'parzen' the cutoff frequency, and for
+        'butterworth' the cutoff frequency and the order, with
+        frequencies in cycles per detector pixel (0.5 is the Nyquist
+        frequency). Defaults are a cutoff of 0.5 and an order of 2.
+        For 'custom' the filter values sampled uniformly from zero to
+        the Nyquist frequency, which are interpolated to the frequencies
+        of the padded projections.
+    xcoord, ycoord : float, optional
+        x- and y-coordinates of the center of the reconstructed region
+        relative to the center of the full reconstruction, in detector
+        pixels. x and y run along the second and third axes of the
+        output respectively.
+    zoom : float, optional
+        Sampling rate of the reconstruction grid in pixels per detector
+        pixel. Values larger than one give a magnified image.
+    accuracy : str, optional
+        Trade-off between speed and accuracy of the gridding. 'fast'
+        is meant for quick previews: it uses a narrow convolving
+        function and reconstructs at half the sampling rate, then
+        interpolates linearly to the requested grid, which blurs fine
+        detail. 'normal' is the default, and 'high' uses a wider
+        convolving function on a twice oversampled grid.
     ncore : int, optional
         Number of cores that will be assigned to jobs.
     nchunk : int, optional
@@ -514,6 +919,19 @@ def gridrec(
 
     dx, dy, dz = tomo.shape
 
+    # Single slices are served from the reconstruction cache.
+    key = None
+    if dy == 1:
+        key = (
+            'gridrec', _cache_hash(tomo), _cache_hash(theta),
+            None if center is None else float(np.ravel(center)[0]),
+            emission, num_gridx, num_gridy, filter_name,
+            None if filter_par is None else tuple(np.ravel(filter_par)),
+            float(xcoord), float(ycoord), float(zoom), accuracy)
+        rec = _cache_get(key)
+        if rec is not None:
+            return rec.copy()
+
     # Gridrec accepts even number of slices.
     is_odd = False
     if tomo.shape[1] % 2 != 0:
@@ -526,18 +944,35 @@ def gridrec(
         center = np.ones(dy, dtype='float32') * dz / 2.
     elif np.array(center).size == 1:
         center = np.ones(dy, dtype='float32') * center
+    elif is_odd:
+        center = np.append(center, center[-1])
     if num_gridx is None:
         num_gridx = dz
     if num_gridy is None:
         num_gridy = dz
     if emission is False:
-        tomo = -np.log(tomo)
+        tomo = _transmission_to_absorption(tomo, ncore)
+
+    # The fast preset samples the image at half the rate, which
+    # quarters the 2D FFT, and interpolates it to the requested grid.
+    shape = None
+    if accuracy == 'fast':
+        shape = (num_gridx, num_gridy)
+        num_gridx = (num_gridx + 1) // 2
+        num_gridy = (num_gridy + 1) // 2
+        zoom = 0.5 * zoom
+
     recon = 1e-6 * np.ones((dy, num_gridx, num_gridy), dtype='float32')
+    filter_par = _get_filter_par(filter_name, filter_par)
     filter_name = np.array(filter_name, dtype=(str, 16))
 
     center = as_float32(center)
     num_gridx = as_int32(num_gridx)
     num_gridy = as_int32(num_gridy)
+    xcoord = as_float32(xcoord)
+    ycoord = as_float32(ycoord)
+    zoom = as_float32(zoom)
+    accuracy = np.array(accuracy, dtype=(str, 16))
 
     # Chunk size can't be smaller than two for gridrec.
     if ncore is None:
@@ -553,7 +988,8 @@ def gridrec(
     arr = mp.distribute_jobs(
         recon,
         func=_gridrec,
-        args=(theta, center, num_gridx, num_gridy, filter_name),
+        args=(theta, center, num_gridx, num_gridy, filter_name,
+              filter_par, xcoord, ycoord, zoom, accuracy),
         axis=0,
         ncore=ncore,
         nchunk=nchunk)
@@ -561,10 +997,42 @@ def gridrec(
     # Dump last slice if original number of sice was even.
     if is_odd:
         arr = arr[0:-1, :, :]
+    if shape is not None:
+        arr = _upsample_grid(arr, shape)
+    if key is not None:
+        _cache_put(key, arr.copy())
     return arr
 
 
-def _gridrec(theta, center, num_gridx, num_gridy, filter_name, istart, iend):
+def _upsample_grid(arr, shape):
+    """
+    Linear interpolation of gridrec images sampled at half the rate to
+    images of ``shape``. Pixel j of a grid of n pixels lies at
+    j - ceil(n / 2) samples from the center, and the first image axis
+    is flipped.
+    """
+    nx, ny = shape
+    hx, hy = arr.shape[1:]
+    cx = -(-nx // 2) - 2 * -(-hx // 2)
+    cy = -(-ny // 2) - 2 * -(-hy // 2)
+    arr = _upsample_axis(arr, nx, nx + 1 - 2 * hx - cx, axis=1)
+    return _upsample_axis(arr, ny, cy, axis=2)
+
+
+def _upsample_axis(arr, n, shift, axis):
+    # Samples at (j - shift) / 2 for j < n, repeating the edge values.
+    u = np.clip((np.arange(n) - shift) / 2., 0, arr.shape[axis] - 1)
+    i0 = np.floor(u).astype('int')
+    i1 = np.minimum(i0 + 1, arr.shape[axis] - 1)
+    w = np.reshape((u - i0).astype('float32'),
+                   [n if m == axis else 1 for m in range(arr.ndim)])
+    a0 = np.take(arr, i0, axis=axis)
+    return a0 + w * (np.take(arr, i1, axis=axis) - a0)
+
+
+def _gridrec(
+        theta, center, num_gridx, num_gridy, filter_name, filter_par,
+        xcoord, ycoord, zoom, accuracy, istart, iend):
     tomo = SHARED_TOMO
     recon = mp.SHARED_ARRAY
     dx, dy, dz = tomo.shape
@@ -581,6 +1049,198 @@ def _gridrec(theta, center, num_gridx, num_gridy, filter_name, istart, iend):
         as_c_int(num_gridx),
         as_c_int(num_gridy),
         as_c_char_p(filter_name),
+        as_c_float_p(filter_par),
+        as_c_int(filter_par.size),
+        as_c_float(xcoord),
+        as_c_float(ycoord),
+        as_c_float(zoom),
+        as_c_char_p(accuracy),
+        as_c_int(istart),
+        as_c_int(iend))
+
+
+def _sweep_center(
+        sino, theta, center, filter_name='shepp', ncore=None, nchunk=None):
+    """
+    Reconstruct a single sinogram with each of the given centers. The
+    projections are filtered only once and the centers are gridded
+    together, which is much cheaper than separate gridrec calls. Only
+    the centers missing from the reconstruction cache are computed.
+    """
+    sino = as_float32(sino)
+    theta = as_float32(theta)
+    center = as_float32(center).ravel()
+
+    dx, dz = sino.shape
+    key = ('sweep', _cache_hash(sino), _cache_hash(theta), filter_name)
+    recon = np.zeros((center.size, dz, dz), dtype='float32')
+    todo = []
+    for m in range(center.size):
+        rec = _cache_get(key + (float(center[m]),))
+        if rec is None:
+            todo.append(m)
+        else:
+            recon[m] = rec
+    if len(todo) == 0:
+        return recon
+
+    arr = _sweep_center_job(
+        sino, theta, center[todo], filter_name, ncore, nchunk)
+    for n, m in enumerate(todo):
+        recon[m] = arr[n]
+        _cache_put(key + (float(center[m]),), arr[n].copy())
+    return recon
+
+
+def _sweep_center_job(sino, theta, center, filter_name, ncore, nchunk):
+    dx, dz = sino.shape
+    recon = np.zeros((center.size, dz, dz), dtype='float32')
+    filter_par = _get_filter_par(filter_name, None)
+    filter_name = np.array(filter_name, dtype=(str, 16))
+    accuracy = np.array('normal', dtype=(str, 16))
+
+    # Keep pairs of centers in the same chunk.
+    if ncore is None:
+        ncore = multiprocessing.cpu_count()
+    if nchunk is None:
+        nchunk = (center.size - 1) // ncore + 1
+    nchunk += nchunk % 2
+
+    _init_shared(sino)
+    arr = mp.distribute_jobs(
+        recon,
+        func=_gridrec_sweep,
+        args=(theta, center, filter_name, filter_par, accuracy),
+        axis=0,
+        ncore=ncore,
+        nchunk=nchunk)
+    return arr
+
+
+def _gridrec_sweep(
+        theta, center, filter_name, filter_par, accuracy, istart, iend):
+    sino = SHARED_TOMO
+    recon = mp.SHARED_ARRAY
+    dx, dz = sino.shape
+    ncen, num_gridx, num_gridy = recon.shape
+
+    LIB_TOMOPY.gridrec_sweep.restype = as_c_void_p()
+    LIB_TOMOPY.gridrec_sweep(
+        as_c_float_p(sino),
+        as_c_int(dx),
+        as_c_int(dz),
+        as_c_float_p(center),
+        as_c_float_p(theta),
+        as_c_float_p(recon),
+        as_c_int(num_gridx),
+        as_c_int(num_gridy),
+        as_c_char_p(filter_name),
+        as_c_float_p(filter_par),
+        as_c_int(filter_par.size),
+        as_c_char_p(accuracy),
+        as_c_int(istart),
+        as_c_int(iend))
+
+
+def hbp(
+        tomo, theta, center=None, emission=True,
+        num_gridx=None, num_gridy=None, filter_name='shepp',
+        filter_par=None, ncore=None, nchunk=None):
+    """
+    Reconstruct object from projection data using hierarchical
+    filtered back projection (HBP) :cite:`Basu:00`.
+
+    The image is recursively split into quadrants. For each quadrant
+    the filtered projections are shifted to its center, cropped to its
+    footprint and, since a smaller image needs fewer views, adjacent
+    angles are merged pairwise. The cost grows as O(N^2 log N) per
+    slice instead of the O(N^3) of :func:`fbp`. The price is an
+    approximation error that is largest at sharp edges, so use
+    :func:`fbp` where accuracy matters more than speed. Angles are
+    assumed to be in increasing order.
+
+    Parameters
+    ----------
+    tomo : ndarray
+        3D tomographic data.
+    theta : array
+        Projection angles in radian.
+    center: array, optional
+        Location of rotation axis.
+    emission : bool, optional
+        Determines whether data is emission or transmission type.
+    num_gridx, num_gridy : int, optional
+        Number of pixels along x- and y-axes in the reconstruction grid.
+    filter_name : str, optional
+        Filter name for weighting. 'shepp', 'hann', 'hamming', 'ramlak',
+        'cosine', 'parzen', 'butterworth', 'custom' or 'none'.
+    filter_par : list, optional
+        Filter parameters as in :func:`fbp`.
+    ncore : int, optional
+        Number of cores that will be assigned to jobs.
+    nchunk : int, optional
+        Chunk size for each core.
+
+    Returns
+    -------
+    ndarray
+        Reconstructed 3D object.
+    """
+    tomo = as_float32(tomo)
+    theta = as_float32(theta)
+
+    dx, dy, dz = tomo.shape
+    if center is None:
+        center = np.ones(dy, dtype='float32') * dz / 2.
+    elif np.array(center).size == 1:
+        center = np.ones(dy, dtype='float32') * center
+    if num_gridx is None:
+        num_gridx = dz
+    if num_gridy is None:
+        num_gridy = dz
+    if emission is False:
+        tomo = _transmission_to_absorption(tomo, ncore)
+    recon = 1e-6 * np.ones((dy, num_gridx, num_gridy), dtype='float32')
+    filter_par = _get_filter_par(filter_name, filter_par)
+    filter_name = np.array(filter_name, dtype=(str, 16))
+
+    center = as_float32(center)
+    num_gridx = as_int32(num_gridx)
+    num_gridy = as_int32(num_gridy)
+
+    _init_shared(tomo)
+    arr = mp.distribute_jobs(
+        recon,
+        func=_hbp,
+        args=(theta, center, num_gridx, num_gridy, filter_name,
+              filter_par),
+        axis=0,
+        ncore=ncore,
+        nchunk=nchunk)
+    return arr
+
+
+def _hbp(
+        theta, center, num_gridx, num_gridy, filter_name, filter_par,
+        istart, iend):
+    tomo = SHARED_TOMO
+    recon = mp.SHARED_ARRAY
+    dx, dy, dz = tomo.shape
+
+    LIB_TOMOPY.hbp.restype = as_c_void_p()
+    LIB_TOMOPY.hbp(
+        as_c_float_p(tomo),
+        as_c_int(dx),
+        as_c_int(dy),
+        as_c_int(dz),
+        as_c_float_p(center),
+        as_c_float_p(theta),
+        as_c_float_p(recon),
+        as_c_int(num_gridx),
+        as_c_int(num_gridy),
+        as_c_char_p(filter_name),
+        as_c_float_p(filter_par),
+        as_c_int(filter_par.size),
         as_c_int(istart),
         as_c_int(iend))
 
@@ -588,7 +1248,7 @@ def _gridrec(theta, center, num_gridx, num_gridy, filter_name, istart, iend):
 def mlem(
         tomo, theta, center=None, emission=True,
         recon=None, num_gridx=None, num_gridy=None, num_iter=1,
-        ncore=None, nchunk=None):
+        ratio=None, ncore=None, nchunk=None):
     """
     Reconstruct object from projection data using maximum-likelihood
     expectation-maximization algorithm. (ML-EM) :cite:`Dempster:77`.
@@ -609,6 +1269,10 @@ def mlem(
         Number of pixels along x- and y-axes in the reconstruction grid.
     num_iter : int, optional
         Number of algorithm iterations performed.
+    ratio : float, optional
+        If given, the ratio of the diameter of the circular field of
+        view to the smallest edge of the reconstructed image. Rays and
+        pixels outside of it are skipped and the pixels are set to zero.
     ncore : int, optional
         Number of cores that will be assigned to jobs.
     nchunk : int, optional
@@ -632,7 +1296,7 @@ def mlem(
     if num_gridy is None:
         num_gridy = dz
     if emission is False:
-        tomo = -np.log(tomo)
+        tomo = _transmission_to_absorption(tomo, ncore)
     if recon is None:
         recon = 1e-6 * np.ones((dy, num_gridx, num_gridy), dtype='float32')
 
@@ -642,18 +1306,21 @@ def mlem(
     num_gridy = as_int32(num_gridy)
     num_iter = as_int32(num_iter)
 
+    fov = _get_fov(ratio)
     _init_shared(tomo)
     arr = mp.distribute_jobs(
         recon,
         func=_mlem,
-        args=(theta, center, num_gridx, num_gridy, num_iter),
+        args=(theta, center, num_gridx, num_gridy, num_iter, fov),
         axis=0,
         ncore=ncore,
         nchunk=nchunk)
+    if ratio is not None:
+        arr = circ_mask(arr, axis=0, ratio=ratio)
     return arr
 
 
-def _mlem(theta, center, num_gridx, num_gridy, num_iter, istart, iend):
+def _mlem(theta, center, num_gridx, num_gridy, num_iter, fov, istart, iend):
     tomo = SHARED_TOMO
     recon = mp.SHARED_ARRAY
     dx, dy, dz = tomo.shape
@@ -670,6 +1337,7 @@ def _mlem(theta, center, num_gridx, num_gridy, num_iter, istart, iend):
         as_c_int(num_gridx),
         as_c_int(num_gridy),
         as_c_int(num_iter),
+        as_c_float(fov),
         as_c_int(istart),
         as_c_int(iend))
 
@@ -678,7 +1346,7 @@ def osem(
         tomo, theta, center=None, emission=True,
         recon=None, num_gridx=None, num_gridy=None, num_iter=1,
         num_block=1, ind_block=None,
-        ncore=None, nchunk=None):
+        ratio=None, ncore=None, nchunk=None):
     """
     Reconstruct object from projection data using ordered-subset
     expectation-maximization (OS-EM) :cite:`Hudson:94`.
@@ -703,6 +1371,10 @@ def osem(
         Number of data blocks for intermediate updating the object.
     ind_block : array of int, optional
         Order of projections to be used for updating.
+    ratio : float, optional
+        If given, the ratio of the diameter of the circular field of
+        view to the smallest edge of the reconstructed image. Rays and
+        pixels outside of it are skipped and the pixels are set to zero.
     ncore : int, optional
         Number of cores that will be assigned to jobs.
     nchunk : int, optional
@@ -726,7 +1398,7 @@ def osem(
     if num_gridy is None:
         num_gridy = dz
     if emission is False:
-        tomo = -np.log(tomo)
+        tomo = _transmission_to_absorption(tomo, ncore)
     if recon is None:
         recon = 1e-6 * np.ones((dy, num_gridx, num_gridy), dtype='float32')
     if ind_block is None:
@@ -740,21 +1412,24 @@ def osem(
     num_block = as_int32(num_block)
     ind_block = as_float32(ind_block)
 
+    fov = _get_fov(ratio)
     _init_shared(tomo)
     arr = mp.distribute_jobs(
         recon,
         func=_osem,
         args=(theta, center, num_gridx, num_gridy,
-              num_iter, num_block, ind_block),
+              num_iter, num_block, ind_block, fov),
         axis=0,
         ncore=ncore,
         nchunk=nchunk)
+    if ratio is not None:
+        arr = circ_mask(arr, axis=0, ratio=ratio)
     return arr
 
 
 def _osem(
         theta, center, num_gridx, num_gridy, num_iter,
-        num_block, ind_block, istart, iend):
+        num_block, ind_block, fov, istart, iend):
     tomo = SHARED_TOMO
     recon = mp.SHARED_ARRAY
     dx, dy, dz = tomo.shape
@@ -773,6 +1448,7 @@ def _osem(
         as_c_int(num_iter),
         as_c_int(num_block),
         as_c_float_p(ind_block),
+        as_c_float(fov),
         as_c_int(istart),
         as_c_int(iend))
 
@@ -781,7 +1457,7 @@ def ospml_hybrid(
         tomo, theta, center=None, emission=True,
         recon=None, num_gridx=None, num_gridy=None, num_iter=1,
         reg_par=None, num_block=1, ind_block=None,
-        ncore=None, nchunk=None):
+        ratio=None, ncore=None, nchunk=None):
     """
     Reconstruct object from projection data using ordered-subset
     penalized maximum likelihood algorithm with weighted linear and
@@ -809,6 +1485,10 @@ def ospml_hybrid(
         Number of data blocks for intermediate updating the object.
     ind_block : array of int, optional
         Order of projections to be used for updating.
+    ratio : float, optional
+        If given, the ratio of the diameter of the circular field of
+        view to the smallest edge of the reconstructed image. Rays and
+        pixels outside of it are skipped and the pixels are set to zero.
     ncore : int, optional
         Number of cores that will be assigned to jobs.
     nchunk : int, optional
@@ -832,7 +1512,7 @@ def ospml_hybrid(
     if num_gridy is None:
         num_gridy = dz
     if emission is False:
-        tomo = -np.log(tomo)
+        tomo = _transmission_to_absorption(tomo, ncore)
     if recon is None:
         recon = 1e-6 * np.ones((dy, num_gridx, num_gridy), dtype='float32')
     if reg_par is None:
@@ -849,21 +1529,24 @@ def ospml_hybrid(
     num_block = as_int32(num_block)
     ind_block = as_float32(ind_block)
 
+    fov = _get_fov(ratio)
     _init_shared(tomo)
     arr = mp.distribute_jobs(
         recon,
         func=_ospml_hybrid,
         args=(theta, center, num_gridx, num_gridy,
-              num_iter, reg_par, num_block, ind_block),
+              num_iter, reg_par, num_block, ind_block, fov),
         axis=0,
         ncore=ncore,
         nchunk=nchunk)
+    if ratio is not None:
+        arr = circ_mask(arr, axis=0, ratio=ratio)
     return arr
 
 
 def _ospml_hybrid(
         theta, center, num_gridx, num_gridy, num_iter,
-        reg_par, num_block, ind_block, istart, iend):
+        reg_par, num_block, ind_block, fov, istart, iend):
     tomo = SHARED_TOMO
     recon = mp.SHARED_ARRAY
     dx, dy, dz = tomo.shape
@@ -883,6 +1566,7 @@ def _ospml_hybrid(
         as_c_float_p(reg_par),
         as_c_int(num_block),
         as_c_float_p(ind_block),
+        as_c_float(fov),
         as_c_int(istart),
         as_c_int(iend))
 
@@ -891,7 +1575,7 @@ def ospml_quad(
         tomo, theta, center=None, emission=True,
         recon=None, num_gridx=None, num_gridy=None, num_iter=1,
         reg_par=None, num_block=1, ind_block=None,
-        ncore=None, nchunk=None):
+        ratio=None, ncore=None, nchunk=None):
     """
     Reconstruct object from projection data using ordered-subset
     penalized maximum likelihood algorithm with quadratic penalty.
@@ -918,6 +1602,10 @@ def ospml_quad(
         Number of data blocks for intermediate updating the object.
     ind_block : array of int, optional
         Order of projections to be used for updating.
+    ratio : float, optional
+        If given, the ratio of the diameter of the circular field of
+        view to the smallest edge of the reconstructed image. Rays and
+        pixels outside of it are skipped and the pixels are set to zero.
     ncore : int, optional
         Number of cores that will be assigned to jobs.
     nchunk : int, optional
@@ -941,7 +1629,7 @@ def ospml_quad(
     if num_gridy is None:
         num_gridy = dz
     if emission is False:
-        tomo = -np.log(tomo)
+        tomo = _transmission_to_absorption(tomo, ncore)
     if recon is None:
         recon = 1e-6 * np.ones((dy, num_gridx, num_gridy), dtype='float32')
     if reg_par is None:
@@ -958,21 +1646,24 @@ def ospml_quad(
     num_block = as_int32(num_block)
     ind_block = as_float32(ind_block)
 
+    fov = _get_fov(ratio)
     _init_shared(tomo)
     arr = mp.distribute_jobs(
         recon,
         func=_ospml_quad,
         args=(theta, center, num_gridx, num_gridy,
-              num_iter, reg_par, num_block, ind_block),
+              num_iter, reg_par, num_block, ind_block, fov),
         axis=0,
         ncore=ncore,
         nchunk=nchunk)
+    if ratio is not None:
+        arr = circ_mask(arr, axis=0, ratio=ratio)
     return arr
 
 
 def _ospml_quad(
         theta, center, num_gridx, num_gridy, num_iter,
-        reg_par, num_block, ind_block, istart, iend):
+        reg_par, num_block, ind_block, fov, istart, iend):
     tomo = SHARED_TOMO
     recon = mp.SHARED_ARRAY
     dx, dy, dz = tomo.shape
@@ -992,6 +1683,7 @@ def _ospml_quad(
         as_c_float_p(reg_par),
         as_c_int(num_block),
         as_c_float_p(ind_block),
+        as_c_float(fov),
         as_c_int(istart),
         as_c_int(iend))
 
@@ -999,7 +1691,7 @@ def _ospml_quad(
 def pml_hybrid(
         tomo, theta, center=None, emission=True,
         recon=None, num_gridx=None, num_gridy=None, num_iter=1,
-        reg_par=None, ncore=None, nchunk=None):
+        reg_par=None, ratio=None, ncore=None, nchunk=None):
     """
     Reconstruct object from projection data using penalized maximum
     likelihood algorithm with weighted linear and quadratic penalties
@@ -1027,6 +1719,10 @@ def pml_hybrid(
         Number of data blocks for intermediate updating the object.
     ind_block : array of int, optional
         Order of projections to be used for updating.
+    ratio : float, optional
+        If given, the ratio of the diameter of the circular field of
+        view to the smallest edge of the reconstructed image. Rays and
+        pixels outside of it are skipped and the pixels are set to zero.
     ncore : int, optional
         Number of cores that will be assigned to jobs.
     nchunk : int, optional
@@ -1050,7 +1746,7 @@ def pml_hybrid(
     if num_gridy is None:
         num_gridy = dz
     if emission is False:
-        tomo = -np.log(tomo)
+        tomo = _transmission_to_absorption(tomo, ncore)
     if recon is None:
         recon = 1e-6 * np.ones((dy, num_gridx, num_gridy), dtype='float32')
     if reg_par is None:
@@ -1063,19 +1759,23 @@ def pml_hybrid(
     num_iter = as_int32(num_iter)
     reg_par = as_float32(reg_par)
 
+    fov = _get_fov(ratio)
     _init_shared(tomo)
     arr = mp.distribute_jobs(
         recon,
         func=_pml_hybrid,
-        args=(theta, center, num_gridx, num_gridy, num_iter, reg_par),
+        args=(theta, center, num_gridx, num_gridy, num_iter, reg_par, fov),
         axis=0,
         ncore=ncore,
         nchunk=nchunk)
+    if ratio is not None:
+        arr = circ_mask(arr, axis=0, ratio=ratio)
     return arr
 
 
 def _pml_hybrid(
-        theta, center, num_gridx, num_gridy, num_iter, reg_par, istart, iend):
+        theta, center, num_gridx, num_gridy, num_iter, reg_par, fov,
+        istart, iend):
     tomo = SHARED_TOMO
     recon = mp.SHARED_ARRAY
     dx, dy, dz = tomo.shape
@@ -1093,6 +1793,7 @@ def _pml_hybrid(
         as_c_int(num_gridy),
         as_c_int(num_iter),
         as_c_float_p(reg_par),
+        as_c_float(fov),
         as_c_int(istart),
         as_c_int(iend))
 
@@ -1100,7 +1801,7 @@ def _pml_hybrid(
 def pml_quad(
         tomo, theta, center=None, emission=True,
         recon=None, num_gridx=None, num_gridy=None, num_iter=1,
-        reg_par=None, ncore=None, nchunk=None):
+        reg_par=None, ratio=None, ncore=None, nchunk=None):
     """
     Reconstruct object from projection data using penalized maximum
     likelihood algorithm with quadratic penalty.
@@ -1124,6 +1825,10 @@ def pml_quad(
         Number of algorithm iterations performed.
     reg_par : float, optional
         Regularization parameter for smoothing.
+    ratio : float, optional
+        If given, the ratio of the diameter of the circular field of
+        view to the smallest edge of the reconstructed image. Rays and
+        pixels outside of it are skipped and the pixels are set to zero.
     ncore : int, optional
         Number of cores that will be assigned to jobs.
     nchunk : int, optional
@@ -1147,7 +1852,7 @@ def pml_quad(
     if num_gridy is None:
         num_gridy = dz
     if emission is False:
-        tomo = -np.log(tomo)
+        tomo = _transmission_to_absorption(tomo, ncore)
     if recon is None:
         recon = 1e-6 * np.ones((dy, num_gridx, num_gridy), dtype='float32')
     if reg_par is None:
@@ -1160,19 +1865,23 @@ def pml_quad(
     num_iter = as_int32(num_iter)
     reg_par = as_float32(reg_par)
 
+    fov = _get_fov(ratio)
     _init_shared(tomo)
     arr = mp.distribute_jobs(
         recon,
         func=_pml_quad,
-        args=(theta, center, num_gridx, num_gridy, num_iter, reg_par),
+        args=(theta, center, num_gridx, num_gridy, num_iter, reg_par, fov),
         axis=0,
         ncore=ncore,
         nchunk=nchunk)
+    if ratio is not None:
+        arr = circ_mask(arr, axis=0, ratio=ratio)
     return arr
 
 
 def _pml_quad(
-        theta, center, num_gridx, num_gridy, num_iter, reg_par, istart, iend):
+        theta, center, num_gridx, num_gridy, num_iter, reg_par, fov,
+        istart, iend):
     tomo = SHARED_TOMO
     recon = mp.SHARED_ARRAY
     dx, dy, dz = tomo.shape
@@ -1190,6 +1899,7 @@ def _pml_quad(
         as_c_int(num_gridy),
         as_c_int(num_iter),
         as_c_float_p(reg_par),
+        as_c_float(fov),
         as_c_int(istart),
         as_c_int(iend))
 
@@ -1197,7 +1907,7 @@ def _pml_quad(
 def sirt(
         tomo, theta, center=None, emission=True,
         recon=None, num_gridx=None, num_gridy=None, num_iter=1,
-        ncore=None, nchunk=None):
+        ratio=None, ncore=None, nchunk=None):
     """
     Reconstruct object from projection data using simultaneous
     iterative reconstruction technique (SIRT).
@@ -1218,6 +1928,10 @@ def sirt(
         Number of pixels along x- and y-axes in the reconstruction grid.
     num_iter : int, optional
         Number of algorithm iterations performed.
+    ratio : float, optional
+        If given, the ratio of the diameter of the circular field of
+        view to the smallest edge of the reconstructed image. Rays and
+        pixels outside of it are skipped and the pixels are set to zero.
     ncore : int, optional
         Number of cores that will be assigned to jobs.
     nchunk : int, optional
@@ -1241,7 +1955,7 @@ def sirt(
     if num_gridy is None:
         num_gridy = dz
     if emission is False:
-        tomo = -np.log(tomo)
+        tomo = _transmission_to_absorption(tomo, ncore)
     if recon is None:
         recon = 1e-6 * np.ones((dy, num_gridx, num_gridy), dtype='float32')
 
@@ -1251,19 +1965,22 @@ def sirt(
     num_gridy = as_int32(num_gridy)
     num_iter = as_int32(num_iter)
 
+    fov = _get_fov(ratio)
     _init_shared(tomo)
     arr = mp.distribute_jobs(
         recon,
         func=_sirt,
-        args=(theta, center, num_gridx, num_gridy, num_iter),
+        args=(theta, center, num_gridx, num_gridy, num_iter, fov),
         axis=0,
         ncore=ncore,
         nchunk=nchunk)
+    if ratio is not None:
+        arr = circ_mask(arr, axis=0, ratio=ratio)
     return arr
 
 
 def _sirt(
-        theta, center, num_gridx, num_gridy, num_iter, istart, iend):
+        theta, center, num_gridx, num_gridy, num_iter, fov, istart, iend):
     tomo = SHARED_TOMO
     recon = mp.SHARED_ARRAY
     dx, dy, dz = tomo.shape
@@ -1280,13 +1997,15 @@ def _sirt(
         as_c_int(num_gridx),
         as_c_int(num_gridy),
         as_c_int(num_iter),
+        as_c_float(fov),
         as_c_int(istart),
         as_c_int(iend))
 
 
 def write_center(
         tomo, theta, dpath='tmp/center', center=None, ind=None,
-        emission=True, mask=True, ratio=1., dmin=None, dmax=None):
+        emission=True, mask=True, ratio=1., dmin=None, dmax=None,
+        dtype='float32', level=0, fmt='tiff', nwriter=None, ncore=None):
     """
     Save images reconstructed with a range of rotation centers.
 
@@ -1295,6 +2014,10 @@ def write_center(
     images are put into a specified folder and are named by the
     center position corresponding to the image.
 
+    The centers are reconstructed in small batches and each image is
+    handed to a pool of writer threads as soon as its batch is ready,
+    so the first images can be browsed while the sweep is running.
+
     Parameters
     ----------
     tomo : ndarray
@@ -1317,41 +2040,123 @@ def write_center(
         reconstructed image.
     dmin, dmax : float, optional
         Mininum and maximum values to adjust float-to-int conversion range.
+        If not given, the range of each image is used.
+    dtype : {'float32', 'uint8'}, optional
+        Data type of the saved images.
+    level : int, optional
+        Downsampling level of the saved images in powers of two.
+    fmt : {'tiff', 'stack', 'hdf5'}, optional
+        Save one TIFF file per center, a single multi-page TIFF file
+        (``center.tiff``) with the center of each page listed in
+        ``center.txt``, or a single HDF5 file (``center.h5``) holding
+        the ``data`` and ``center`` datasets.
+    nwriter : int, optional
+        Number of writer threads. Single-file formats always use one.
+    ncore : int, optional
+        Number of cores that will be assigned to jobs.
     """
+    if fmt not in ('tiff', 'stack', 'hdf5'):
+        raise ValueError('Unknown output format: %s' % fmt)
+    if dtype not in ('float32', 'uint8'):
+        raise ValueError('Unsupported output data type: %s' % dtype)
+
     tomo = as_float32(tomo)
     theta = as_float32(theta)
 
     dx, dy, dz = tomo.shape
     if ind is None:
-        ind = dy / 2
+        ind = dy // 2
     if center is None:
         center = np.arange(dz / 2 - 5, dz / 2 + 5, 0.5)
     else:
-        center = np.arange(center[0], center[1], center[2] / 2.)
-    stack = np.zeros((dx, len(center), dz))
-    for m in range(len(center)):
-        stack[:, m, :] = tomo[:, ind, :]
-
-    # Reconstruct the same slice with a range of centers.
-    rec = gridrec(stack, theta, center, emission)
-
-    # Apply circular mask.
-    if mask is True:
-        rad = dz / 2.
-        y, x = np.ogrid[-rad:rad, -rad:rad]
-        msk = x * x + y * y > ratio * ratio * rad * rad
-        for m in range(center.size):
-            rec[m, msk] = 0
+        center = np.arange(center[0], center[1], center[2])
+    sino = tomo[:, ind, :]
+    if emission is False:
+        sino = _transmission_to_absorption(sino, ncore)
+    if ncore is None:
+        ncore = multiprocessing.cpu_count()
+    if fmt != 'tiff':
+        nwriter = 1
+    elif nwriter is None:
+        nwriter = ncore
 
     # Save images to a temporary folder.
     if os.path.isdir(dpath):
         shutil.rmtree(dpath)
     os.makedirs(dpath)
-    for m in range(len(center)):
-        if m % 2 == 0:  # 2 slices same bec of gridrec.
-            fname = os.path.join(dpath, str('%.02f' % center[m]) + '.tiff')
-            arr = rec[m, :, :]
-
-            with warnings.catch_warnings():
-                warnings.simplefilter("ignore")
-                sio.imsave(fname, arr, plugin='tifffile')
+
+    out = None
+    if fmt == 'stack':
+        out = os.path.join(dpath, 'center.tiff')
+        np.savetxt(os.path.join(dpath, 'center.txt'), center, fmt='%.02f')
+    elif fmt == 'hdf5':
+        out = h5py.File(os.path.join(dpath, 'center.h5'), 'w')
+        out.create_dataset('center', data=center)
+        out = out.create_dataset(
+            'data', (center.size, dz >> level, dz >> level), dtype=dtype)
+
+    # Reconstruct one pair of centers per core at a time and queue the
+    # images for writing while the next batch is being reconstructed.
+    nbatch = 2 * ncore
+    pool = ThreadPool(nwriter)
+    jobs = []
+    try:
+        for m0 in range(0, center.size, nbatch):
+            rec = _sweep_center(
+                sino, theta, center[m0:m0 + nbatch], ncore=ncore)
+
+            # Apply circular mask.
+            if mask is True:
+                rec = circ_mask(rec, axis=0, ratio=ratio)
+
+            rec = _center_preview(rec, level, dtype, dmin, dmax)
+            for m in range(rec.shape[0]):
+                if fmt == 'tiff':
+                    fname = os.path.join(
+                        dpath, str('%.02f' % center[m0 + m]) + '.tiff')
+                    jobs.append(pool.apply_async(
+                        _save_center_image, (fname, rec[m])))
+                elif fmt == 'stack':
+                    jobs.append(pool.apply_async(
+                        _save_center_image, (out, rec[m], True)))
+                elif fmt == 'hdf5':
+                    jobs.append(pool.apply_async(
+                        _store_center_image, (out, m0 + m, rec[m])))
+    finally:
+        pool.close()
+        pool.join()
+        if fmt == 'hdf5':
+            out.file.close()
+
+    # Raise any error of the writer threads.
+    for job in jobs:
+        job.get()
+
+
+def _center_preview(rec, level, dtype, dmin, dmax):
+    if level > 0:
+        size = (rec.shape[1] >> level) << level
+        rec = np.ascontiguousarray(rec[:, :size, :size])
+        rec = binning(rec, (1, 2 ** level, 2 ** level))
+    if dtype == 'uint8':
+        lo = rec.min(axis=(1, 2)) if dmin is None else np.full(len(rec), dmin)
+        hi = rec.max(axis=(1, 2)) if dmax is None else np.full(len(rec), dmax)
+        scale = 255. / np.where(hi > lo, hi - lo, 1.)
+        rec = (rec - lo[:, np.newaxis, np.newaxis]) * \
+            scale[:, np.newaxis, np.newaxis]
+        rec = np.clip(rec, 0, 255).astype('uint8')
+    return rec
+
+
+def _save_center_image(fname, arr, append=False):
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        if append:
+            sio.imsave(fname, arr, plugin='tifffile', append=True,
+                       photometric='minisblack')
+        else:
+            sio.imsave(fname, arr, plugin='tifffile')
+
+
+def _store_center_image(dset, m, arr):
+    dset[m] = arr
@@ -67,6 +67,8 @@ __all__ = ['import_shared_lib',
            'as_float32',
            'as_int32',
            'as_c_float_p',
+           'as_c_int_p',
+           'as_c_float',
            'as_c_int',
            'as_c_char_p',
            'as_c_void_p']
@@ -114,6 +116,15 @@ def as_c_float_p(arr):
     return arr.ctypes.data_as(c_float_p)
 
 
+def as_c_int_p(arr):
+    c_int_p = ctypes.POINTER(ctypes.c_int)
+    return arr.ctypes.data_as(c_int_p)
+
+
+def as_c_float(arr):
+    return ctypes.c_float(arr)
+
+
 def as_c_int(arr):
     return ctypes.c_int(arr)
 